@@ -2,9 +2,21 @@
 import math as m
 import neighbor as nval
 import toolkit as util
-#from mpi4py import MPI
+import pareto
+import multiprocessing as mp
+import asyncio
+import concurrent.futures
+import time
 
-def DDS_serial(objfunc_name,exe_name,modeldir,to_max,DV,sinitial,its,maxiter):
+# Neighbours with at most this many selected DVs are perturbed one DV at a time
+# (the array functions in neighbor only pay off for larger selections)
+SCALAR_PERTURB_MAX = 8
+
+# Weights of the surrogate prediction against the distance to evaluated points
+# when screening candidates, cycled through one evaluation after another (DYCORS)
+SCREEN_WEIGHTS = (0.3, 0.5, 0.8, 0.95)
+
+def DDS_serial(objfunc_name,exe_name,modeldir,to_max,DV,sinitial,its,maxiter,batch_size=1,slave_index=0,pre_empt_flag=0,eval_backend=0,cache=None,checkpoint=None,resume=None,out=None,record=None,profiler=None,metrics=None,surrogate=None,num_candidates=100,portfolio=None,rng=None,pn_offset=0):
     # ==========================================================================
     # Definitions
     # ==========================================================================
@@ -17,26 +29,43 @@ def DDS_serial(objfunc_name,exe_name,modeldir,to_max,DV,sinitial,its,maxiter):
     S_range = DV['S_max'] - DV['S_min']                        # array of DV ranges
     ileft = maxiter - its                                      # number of iterations
     # its = number of function evaluations to initialize the DDS algorithm
-    solution = np.empty((maxiter,num_dec+3),dtype=float)       # solution storage array
+    # pn_offset = evaluations of earlier runs this trial continues (warm start): 
+    # the neighbourhood size schedule (Pn) carries on from there
+    # solution storage array (+1 column flagging pre-empted evaluations if pre-emption is enabled),
+    # or out (e.g. a trial block of util.RunArchive) so rows are written to file as they are produced.
+    # With a util.CompactRecord it is the record's trace and DVs are only kept for selected rows
+    if record is not None:
+        solution = record.trace
+    else:
+        solution = np.empty((maxiter,num_dec+3+(pre_empt_flag>0)),dtype=float) if out is None else out
+    # optional util.EvalCache answering repeated candidates - count this trial's hits/misses
+    cache_stats = (cache.hits,cache.misses) if cache is not None else (0,0)
+    # objective function resolved once for the whole trial
+    evaluator = util.get_evaluator(modeldir,objfunc_name,exe_name,slave_index,eval_backend)
+    # optional util.MetricsStream reporting the progress of the trial
+    if metrics is not None:
+        metrics.start_trial(maxiter,0 if resume is None else resume['solution'].shape[0])
+    # random numbers of the trial: a util.RandomStream, or the global np.random state
+    if rng is None:
+        rng = np.random
     
     # ==========================================================================
-    # Initial Solution Processing
+    # Initial Solution Processing (skipped when resuming from a checkpoint)
     # ==========================================================================  
-    for i in range(its):
-        if its>1:
-            if Discrete_flag.all() == 0:# handling continuous variables  
-                # return continuous uniform random samples 
-                stest = DV['S_min'] +S_range*np.random.random(num_dec)  
-            else: # handling discrete case
-                for j in range(0,num_dec):
-                    # return random integers from the discrete uniform dist'n
-                    stest[j] = np.random.randit([DV['S_min'][j], DV['S_max'][j]],size =1) 
-        else: # know its=1, using a user supplied initial solution.
-            # get initial solution from the input file
-            stest=sinitial
+    for i in range(its if resume is None else 0):
+        stest = initial_solution(DV,sinitial,rng)
 
         # Call obj function 
-        Jtest = to_max*util.get_objfunc(stest,modeldir,objfunc_name,exe_name,0)  
+        y = None if cache is None else cache.get(stest)
+        if y is None:
+            if pre_empt_flag == 0:
+                y = evaluator(stest)
+            else:
+                # no best solution yet: the model runs to the end (no threshold)
+                y = evaluator.preempt(stest,None,to_max,pre_empt_flag)[0]
+            if cache is not None:
+                cache.put(stest,y)
+        Jtest = to_max*y
             
         # Update current best
         if i==0:
@@ -44,40 +73,79 @@ def DDS_serial(objfunc_name,exe_name,modeldir,to_max,DV,sinitial,its,maxiter):
         if Jtest <= Jbest:
             Jbest = Jtest 
             np.copyto(sbest,stest) 
+            it_sbest = i
                 
         # Store initial sol. data in Master solution array    
         solution[i,0] = i 
         solution[i,1] = to_max*Jbest 
         solution[i,2] = to_max*Jtest
-        solution[i,3:3+num_dec] = stest
+        if record is None:
+            solution[i,3:3+num_dec] = stest
+        else:
+            record.store(i,stest,True)
+        if pre_empt_flag > 0:
+            solution[i,-1] = 0
+        if surrogate is not None:
+            surrogate.add(stest,Jtest)
    
+    i_start = 0
+    if resume is not None:
+        # continue bit-for-bit from a checkpoint (util.Checkpoint) of this trial
+        i_start = resume['solution'].shape[0] - its
+        solution[:its+i_start] = resume['solution']
+        np.copyto(sbest,resume['sbest'])
+        Jbest = resume['Jbest']
+        it_sbest = resume['it_sbest']
+        rng.set_state(resume['rng'])
+        if record is not None:
+            record.set_state(resume['record'])
+        if surrogate is not None:
+            surrogate = resume['surrogate']
+
     # ==========================================================================
     # Main Algorithm Loop
     # ==========================================================================
-    for i in range(ileft):
+    if batch_size > 1:
+        # Batch mode: k neighbours of sbest per step, scored in one objective call
+        output = _DDS_batch_loop(objfunc_name,exe_name,modeldir,to_max,DV,its,maxiter,batch_size,slave_index,eval_backend,cache,solution,sbest,Jbest,it_sbest,i_start,checkpoint,record,profiler,metrics,rng,pn_offset)
+        return _cache_summary(_record_rows(output,record),cache,cache_stats)
+
+    for i in range(i_start,ileft):
+        if profiler is not None:
+            t_0 = time.perf_counter()
         # probability of being selected as neighbour
-        Pn=1.0-m.log1p(i)/m.log(ileft)  
-        # counter for how many decision variables vary in neighbour
-        dvn_count=0 
-        # define stest initially as current (sbest for greedy)
-        np.copyto(stest,sbest)
-        # Generate array of random uniformly distributed numbers for neighborhood inclusion
-        randnums=np.random.random(num_dec)
-        
-        for j in range(num_dec):
-            # then j th DV selected to vary in neighbour
-            if randnums[j]< Pn: 
-                dvn_count=dvn_count+1
-                stest[j] = nval.perturb_type(sbest[j], DV['S_min'][j], DV['S_max'][j],DV['Discrete_flag'][j])
-     
-        # no DVs selected at random, so select ONE   
-        if dvn_count==0: 
-            # which dec var to modify for neighbour 
-            dec_var=int(m.floor((num_dec)*np.random.random(1)))
-            stest[dec_var] = nval.perturb_type(sbest[dec_var], DV['S_min'][dec_var], DV['S_max'][dec_var],DV['Discrete_flag'][dec_var])
+        Pn=1.0-m.log1p(i+pn_offset)/m.log(ileft+pn_offset)  
+        if surrogate is None:
+            # generate neighbour of current best (sbest for greedy)
+            stest = neighbour(sbest,DV,Pn,rng)
+        else:
+            # screen num_candidates neighbours on the surrogate (i.e. surrogate.RBF of
+            # the evaluated candidates) and evaluate only the most promising one
+            stests = neighbours(sbest,DV,Pn,num_candidates,rng)
+            stest = stests[_screen(surrogate,stests,SCREEN_WEIGHTS[i % len(SCREEN_WEIGHTS)])]
+        if profiler is not None:
+            t_1 = time.perf_counter()
     
-        # Get ojective function value
-        Jtest = to_max*util.get_objfunc(stest,modeldir,objfunc_name,exe_name,0)
+        # Get ojective function value (repeated candidates are answered from the cache)
+        y = None if cache is None else cache.get(stest)
+        preempted = False
+        if y is None:
+            if pre_empt_flag == 0:
+                y = evaluator(stest)
+            else:
+                # pass the current best (in model units) so a hopeless candidate can be pre-empted
+                y, preempted = evaluator.preempt(stest,to_max*Jbest,to_max,pre_empt_flag)
+            # pre-empted values are only partial objectives, so they are not cached
+            if cache is not None and not preempted:
+                cache.put(stest,y)
+        Jtest = to_max*y
+        if profiler is not None:
+            t_2 = time.perf_counter()
+        if pre_empt_flag > 0:
+            solution[i+its,-1] = preempted
+        # pre-empted values are only partial objectives, so they are not fitted
+        if surrogate is not None and not preempted:
+            surrogate.add(stest,Jtest)
 
         # Update current best
         if Jtest<=Jbest:
@@ -91,12 +159,671 @@ def DDS_serial(objfunc_name,exe_name,modeldir,to_max,DV,sinitial,its,maxiter):
         solution[i+its,0]=i+its
         solution[i+its,1]=to_max*Jbest
         solution[i+its,2]=to_max*Jtest
-        solution[i+its,3:3+num_dec]=stest
+        if record is None:
+            solution[i+its,3:3+num_dec]=stest
+        else:
+            record.store(i+its,stest,it_sbest == i+its)
+
+        # periodic checkpoint of the trial state
+        if checkpoint is not None and checkpoint.due(i+its+1):
+            checkpoint.save_trial(_trial_state(solution,i+its+1,sbest,Jbest,it_sbest,rng,record,surrogate),i+its+1)
+        if profiler is not None:
+            profiler.record(i+its,to_max*Jtest,to_max*Jbest,t_1-t_0,t_2-t_1,time.perf_counter()-t_2)
+        if metrics is not None and metrics.due():
+            metrics.progress(i+its+1,to_max*Jbest,it_sbest)
+        # portfolio mode: the trial ends here once util.Portfolio cuts it (see DDS_portfolio)
+        if portfolio is not None and portfolio.cut(i+its+1,Jbest,it_sbest):
+            solution = solution[:i+its+1]
+            break
 
     # Return dict: {Master, best iteration #, best solution, best param set}
+    return _cache_summary(_record_rows({'Master':solution,'Best_iter':it_sbest,'Best_sol':sbest,'F_Best':Jbest},record),cache,cache_stats)
+
+
+def _trial_state(solution,evals,sbest,Jbest,it_sbest,rng,record=None,surrogate=None):
+    # State of a DDS_serial trial after evals evaluations, for util.Checkpoint
+    return {'solution':np.array(solution[:evals]),'sbest':sbest.copy(),'Jbest':Jbest,'it_sbest':it_sbest,'rng':rng.get_state(),
+            'record':None if record is None else record.get_state(),'surrogate':surrogate}
+
+
+def _screen(surrogate,stests,weight):
+    # Index of the most promising row of stests (DYCORS): weighted sum of the
+    # scaled surrogate prediction and the scaled closeness to the evaluated
+    # points, candidates that were evaluated before are only taken last
+    s, dist = surrogate.predict(stests)
+    score = np.zeros(stests.shape[0])
+    if s.max() > s.min():
+        score += weight*(s - s.min())/(s.max() - s.min())
+    if dist.max() > dist.min():
+        score += (1.0 - weight)*(dist.max() - dist)/(dist.max() - dist.min())
+    score[dist == 0] = np.inf
+    return int(np.argmin(score))
+
+
+def _profile_step(profiler,i_first,Jtests,Jbests,t_0,t_1,t_2):
+    # Records a step of several candidates (batch or slaves) with util.Profiler,
+    # the phase times of the step split evenly over its candidates
+    num = Jtests.shape[0]
+    t_3 = time.perf_counter()
+    for k in range(num):
+        profiler.record(i_first+k,Jtests[k],Jbests[k],(t_1-t_0)/num,(t_2-t_1)/num,(t_3-t_2)/num)
+
+
+def _record_rows(output,record):
+    # Adds the DV rows kept by a util.CompactRecord (Master layout) to a DDS output dict
+    if record is not None:
+        output['Rows'] = record.rows()
+    return output
+
+
+def _cache_summary(output,cache,cache_stats):
+    # Adds the evaluation cache hits/misses of this trial to a DDS output dict
+    if cache is not None:
+        output['Cache_hits'] = cache.hits - cache_stats[0]
+        output['Cache_misses'] = cache.misses - cache_stats[1]
+    return output
+
+
+def _cached_objfunc_batch(stests,cache,objfunc_batch):
+    # Objective values of the rows of stests: cached rows are looked up and 
+    # only the others are passed (as one array) to objfunc_batch
+    if cache is None:
+        return np.asarray(objfunc_batch(stests),dtype=float)
+    ys = np.array([cache.get(stest) for stest in stests],dtype=float)
+    missing = np.flatnonzero(np.isnan(ys))
+    if missing.shape[0] > 0:
+        ys[missing] = objfunc_batch(stests[missing])
+        for k in missing:
+            cache.put(stests[k],ys[k])
+    return ys
+
+
+def _DDS_batch_loop(objfunc_name,exe_name,modeldir,to_max,DV,its,maxiter,batch_size,slave_index,eval_backend,cache,solution,sbest,Jbest,it_sbest,i_start,checkpoint,record,profiler=None,metrics=None,rng=np.random,pn_offset=0):
+    # ==========================================================================
+    # Batch-evaluation main loop of DDS_serial: every step generates
+    # batch_size neighbours of sbest (each with Pn of its own iteration
+    # number), scores them with a single Evaluator.batch call and then
+    # updates sbest/Jbest and the Master matrix row-by-row, as if the
+    # candidates had been evaluated one at a time.
+    # ==========================================================================
+    num_dec = DV['S_min'].shape[0]
+    ileft = maxiter - its
+    evaluator = util.get_evaluator(modeldir,objfunc_name,exe_name,slave_index,eval_backend)
+    for i0 in range(i_start,ileft,batch_size):
+        if profiler is not None:
+            t_0 = time.perf_counter()
+        stests = np.array([neighbour(sbest,DV,1.0-m.log1p(i+pn_offset)/m.log(ileft+pn_offset),rng) for i in range(i0,min(i0+batch_size,ileft))])
+        if profiler is not None:
+            t_1 = time.perf_counter()
+        Jtests = to_max*_cached_objfunc_batch(stests,cache,evaluator.batch)
+        if profiler is not None:
+            t_2 = time.perf_counter()
+            Jbests = np.empty(stests.shape[0])
+        for k in range(stests.shape[0]):
+            i = i0 + k
+            # Update current best
+            if Jtests[k]<=Jbest:
+                Jbest = Jtests[k]
+                np.copyto(sbest,stests[k])
+                it_sbest=i+its
+            # accumulate results in Master output matrix
+            solution[i+its,0]=i+its
+            solution[i+its,1]=to_max*Jbest
+            solution[i+its,2]=to_max*Jtests[k]
+            if record is None:
+                solution[i+its,3:3+num_dec]=stests[k]
+            else:
+                record.store(i+its,stests[k],it_sbest == i+its)
+            if profiler is not None:
+                Jbests[k] = Jbest
+
+        # periodic checkpoint of the trial state (at step boundaries)
+        if checkpoint is not None and checkpoint.due(i+its+1):
+            checkpoint.save_trial(_trial_state(solution,i+its+1,sbest,Jbest,it_sbest,rng,record),i+its+1)
+        if profiler is not None:
+            _profile_step(profiler,i0+its,to_max*Jtests,to_max*Jbests,t_0,t_1,t_2)
+        if metrics is not None and metrics.due():
+            metrics.progress(i+its+1,to_max*Jbest,it_sbest)
+
     return {'Master':solution,'Best_iter':it_sbest,'Best_sol':sbest,'F_Best':Jbest}
 
 
-def DDS_MPI(objfunc_name,exe_name,modeldir,to_max,DV,sinitial,its,maxiter,num_slaves):
+def DDS_portfolio(objfunc_name,exe_name,modeldir,to_max,DV,sinitial,its,maxiter,portfolio,slave_index=0,pre_empt_flag=0,eval_backend=0,cache=None,out=None,profiler=None,metrics=None,surrogate=None,num_candidates=100,rng=None):
+    # ==========================================================================
+    # One DDS trial in portfolio mode: DDS_serial runs until portfolio 
+    # (util.Portfolio) cuts it. The rest of the budget is then spent on 
+    # restarts of DDS from a random solution (portfolio.mode 2) or from the
+    # best solution found so far by any trial (mode 3), which may
+    # be cut again in turn. Restart rows continue the Master matrix with Jbest
+    # carried over; Best_iter, Best_sol and F_Best are those of the whole 
+    # trial and output['Cuts'] lists the cuts of this trial.
+    # ==========================================================================
+    num_dec = DV['S_min'].shape[0]
+    solution = np.empty((maxiter,num_dec+3+(pre_empt_flag>0)),dtype=float) if out is None else out
+    num_cuts = len(portfolio.cuts)
+    output = None
+    start = 0
+    while start < maxiter:
+        if start == 0:
+            seg_init, seg_its = sinitial, its
+        elif portfolio.mode == 3:
+            # restart from the leading solution
+            seg_init, seg_its = portfolio.leader, 1
+        else:
+            seg_init, seg_its = np.array([]), int(max(5,np.around(0.005*(maxiter-start))))
+        portfolio.start(start,np.inf if output is None else output['F_Best'])
+        seg = DDS_serial(objfunc_name,exe_name,modeldir,to_max,DV,seg_init,seg_its,maxiter-start,1,slave_index,pre_empt_flag,eval_backend,cache,
+                         None,None,solution[start:],None,profiler,metrics if start == 0 else None,surrogate,num_candidates,portfolio,rng)
+        num = seg['Master'].shape[0]
+        portfolio.offer(seg['Best_sol'],seg['F_Best'])
+        if output is None:
+            output = {'Best_iter':seg['Best_iter'],'Best_sol':seg['Best_sol'],'F_Best':seg['F_Best']}
+        else:
+            # restart rows: trial iteration numbers, Jbest of the whole trial
+            rows = solution[start:start+num]
+            rows[:,0] += start
+            rows[:,1] = to_max*np.minimum(to_max*rows[:,1],output['F_Best'])
+            if seg['F_Best'] <= output['F_Best']:
+                output.update(Best_iter=seg['Best_iter']+start,Best_sol=seg['Best_sol'],F_Best=seg['F_Best'])
+        if 'Cache_hits' in seg:
+            output['Cache_hits'] = output.get('Cache_hits',0) + seg['Cache_hits']
+            output['Cache_misses'] = output.get('Cache_misses',0) + seg['Cache_misses']
+        start += num
+    output['Master'] = solution
+    output['Cuts'] = portfolio.cuts[num_cuts:]
+    return output
 
-    return 
\ No newline at end of file
+
+def DDS_pareto(objfunc_name,exe_name,modeldir,to_max,DV,sinitial,its,maxiter,num_obj,slave_index=0,eval_backend=0,metrics=None,rng=None):
+    # ==========================================================================
+    # Pareto archived DDS (PA-DDS, Asadzadeh and Tolson, 2013) for objective
+    # functions returning num_obj values: every iteration perturbs the current
+    # solution as in DDS_serial. A candidate that no archived solution 
+    # dominates enters the archive (pareto.ParetoArchive) and becomes the 
+    # current solution, else the next current solution is drawn from the 
+    # archive by its contribution to the front (sparse regions first).
+    # Master rows are [iter #, archive size, Ftest (num_obj), DVs]. F_Best is
+    # the final archive size and Best_iter the last iteration it changed;
+    # Best_sol is the archived solution nearest to the ideal point. 
+    # output['Pareto_F'] / ['Pareto_X'] / ['Pareto_iter'] hold the front.
+    # ==========================================================================
+    num_dec = DV['S_min'].shape[0]                             # number of DVs
+    ileft = maxiter - its                                      # number of iterations
+    solution = np.empty((maxiter,num_obj+2+num_dec),dtype=float)
+    evaluator = util.get_evaluator(modeldir,objfunc_name,exe_name,slave_index,eval_backend)
+    archive = pareto.ParetoArchive(num_obj,num_dec)
+    if rng is None:
+        rng = np.random
+    if metrics is not None:
+        metrics.start_trial(maxiter)
+    it_change = 0
+
+    for i in range(maxiter):
+        if i < its:
+            # Initial Solution Processing
+            stest = initial_solution(DV,sinitial,rng)
+        else:
+            # neighbour of the current solution, probability of being selected as neighbour as in DDS_serial
+            stest = neighbour(scurrent,DV,1.0-m.log1p(i-its)/m.log(ileft),rng)
+        Ftest = to_max*np.asarray(evaluator(stest),dtype=float).reshape(-1)
+        assert Ftest.shape[0] == num_obj, 'Objective function returned %i values, %i objectives expected.' % (Ftest.shape[0], num_obj)
+        if archive.add(stest,Ftest,i):
+            it_change = i
+            scurrent = stest
+        elif i >= its - 1:
+            scurrent = archive.member(archive.select(rng))
+        # [col 0: iter # col 1: archive size col 2..: Ftest, param set (xtest)]
+        solution[i,0] = i
+        solution[i,1] = archive.n
+        solution[i,2:2+num_obj] = to_max*Ftest
+        solution[i,2+num_obj:] = stest
+        if metrics is not None and metrics.due():
+            metrics.progress(i+1,archive.n,it_change)
+
+    F, X, it = archive.front()
+    return {'Master':solution,'Best_iter':it_change,'Best_sol':archive.member(archive.compromise()),'F_Best':archive.n,
+            'Pareto_F':to_max*F,'Pareto_X':X,'Pareto_iter':it}
+
+
+def DDS_MPI(objfunc_name,exe_name,modeldir,to_max,DV,sinitial,its,maxiter,num_slaves,pre_empt_flag=0,eval_backend=0,cache=None,out=None,record=None,profiler=None,metrics=None,rng=None,pn_offset=0):
+    # ==========================================================================
+    # Parallel DDS (PDDS): every step the master generates one neighbour of
+    # sbest per slave, the slaves evaluate them concurrently on a local process
+    # pool, and the master then updates sbest/Jbest in candidate order.
+    # Every pool worker is one slave k (1..num_slaves) for the whole run and
+    # evaluates in its own model directory (modeldir + '_' + k). Repeated
+    # candidates found in the optional cache are not sent to the slaves.
+    # The master draws the candidates from rng; a util.RandomStream also 
+    # seeds np.random of every slave with a substream of its own. Pn continues
+    # from pn_offset earlier evaluations as in DDS_serial.
+    # ==========================================================================
+    num_dec = DV['S_min'].shape[0]                             # number of DVs
+    sbest = np.empty(num_dec,dtype=float)                      # best solution array
+    ileft = maxiter - its                                      # number of iterations
+    # solution storage array (+1 column flagging pre-empted evaluations if pre-emption is enabled),
+    # or out (e.g. a trial block of util.RunArchive) so rows are written to file as they are produced.
+    # With a util.CompactRecord it is the record's trace and DVs are only kept for selected rows
+    if record is not None:
+        solution = record.trace
+    else:
+        solution = np.empty((maxiter,num_dec+3+(pre_empt_flag>0)),dtype=float) if out is None else out
+    if rng is None:
+        rng = np.random
+    pool = mp.Pool(processes=num_slaves,initializer=_init_slave,initargs=(mp.Value('i',0),_slave_seeds(rng,num_slaves)))
+    cache_stats = (cache.hits,cache.misses) if cache is not None else (0,0)
+    # seconds each slave spent evaluating (utilisation in the metrics stream, idle time in the output)
+    slave_busy = np.zeros(num_slaves)
+    t_start = time.perf_counter()
+    if metrics is not None:
+        metrics.start_trial(maxiter)
+
+    try:
+        # ======================================================================
+        # Initial Solution Processing - one initial solution per slave
+        # ======================================================================
+        for i0 in range(0,its,num_slaves):
+            stests = [initial_solution(DV,sinitial,rng) for i in range(i0,min(i0+num_slaves,its))]
+            Jtests = _slave_map(pool,stests,cache,(modeldir,objfunc_name,exe_name,None,to_max,pre_empt_flag,eval_backend))
+            _add_busy(slave_busy,Jtests)
+            for k in range(len(stests)):
+                i = i0 + k
+                Jtest = to_max*Jtests[k][0]
+                # Update current best
+                if i==0 or Jtest <= Jbest:
+                    Jbest = Jtest
+                    np.copyto(sbest,stests[k])
+                    it_sbest = i
+                # Store initial sol. data in Master solution array
+                solution[i,0] = i
+                solution[i,1] = to_max*Jbest
+                solution[i,2] = to_max*Jtest
+                if record is None:
+                    solution[i,3:3+num_dec] = stests[k]
+                else:
+                    record.store(i,stests[k],True)
+                if pre_empt_flag > 0:
+                    solution[i,-1] = 0
+
+        # ======================================================================
+        # Main Algorithm Loop - one candidate per slave per step
+        # ======================================================================
+        for i0 in range(0,ileft,num_slaves):
+            if profiler is not None:
+                t_0 = time.perf_counter()
+            # probability of being selected as neighbour is based on the
+            # global evaluation count of each candidate
+            stests = [neighbour(sbest,DV,1.0-m.log1p(i+pn_offset)/m.log(ileft+pn_offset),rng) for i in range(i0,min(i0+num_slaves,ileft))]
+            if profiler is not None:
+                t_1 = time.perf_counter()
+            # every slave gets the current best as its pre-emption threshold
+            Jtests = _slave_map(pool,stests,cache,(modeldir,objfunc_name,exe_name,to_max*Jbest,to_max,pre_empt_flag,eval_backend))
+            _add_busy(slave_busy,Jtests)
+            if profiler is not None:
+                t_2 = time.perf_counter()
+                Jbests = np.empty(len(stests))
+            for k in range(len(stests)):
+                i = i0 + k
+                Jtest = to_max*Jtests[k][0]
+                # Update current best
+                if Jtest<=Jbest:
+                    Jbest = Jtest
+                    np.copyto(sbest,stests[k])
+                    it_sbest=i+its
+                # accumulate results in Master output matrix
+                solution[i+its,0]=i+its
+                solution[i+its,1]=to_max*Jbest
+                solution[i+its,2]=to_max*Jtest
+                if record is None:
+                    solution[i+its,3:3+num_dec]=stests[k]
+                else:
+                    record.store(i+its,stests[k],it_sbest == i+its)
+                if pre_empt_flag > 0:
+                    solution[i+its,-1] = Jtests[k][1]
+                if profiler is not None:
+                    Jbests[k] = Jbest
+            if profiler is not None:
+                _profile_step(profiler,i0+its,to_max*np.array([result[0] for result in Jtests]),to_max*Jbests,t_0,t_1,t_2)
+            if metrics is not None and metrics.due():
+                metrics.progress(i+its+1,to_max*Jbest,it_sbest,slave_busy.tolist())
+    finally:
+        pool.close()
+        pool.join()
+
+    # Return dict: {Master, best iteration #, best solution, best param set, seconds each slave waited}
+    output = _record_rows({'Master':solution,'Best_iter':it_sbest,'Best_sol':sbest,'F_Best':Jbest},record)
+    output['Slave_idle'] = time.perf_counter() - t_start - slave_busy
+    return _cache_summary(output,cache,cache_stats)
+
+
+def DDS_async(objfunc_name,exe_name,modeldir,to_max,DV,sinitial,its,maxiter,num_slaves,pre_empt_flag=0,eval_backend=0,cache=None,out=None,record=None,metrics=None,rng=None,pn_offset=0):
+    # ==========================================================================
+    # Asynchronous parallel DDS for models with very different run times: no
+    # slave waits for the slowest model of a step as in DDS_MPI. Each time a
+    # slave returns a result the master updates sbest/Jbest at once and gives
+    # that slave a new neighbour of the current best, with Pn based on the
+    # global number of candidates generated so far. Master rows are stored in
+    # the order the results come back. External models run once per 
+    # evaluation (eval_backend 0) are driven as asyncio subprocesses in the 
+    # slave model directories (modeldir + '_' + k), Python objectives and 
+    # persistent models are evaluated on a process pool as in DDS_MPI.
+    # output['Slave_idle'] holds the seconds each slave spent without work.
+    # Random numbers and pn_offset as in DDS_MPI.
+    # ==========================================================================
+    return asyncio.run(_DDS_async_loop(objfunc_name,exe_name,modeldir,to_max,DV,sinitial,its,maxiter,num_slaves,pre_empt_flag,eval_backend,cache,out,record,metrics,rng,pn_offset))
+
+
+async def _DDS_async_loop(objfunc_name,exe_name,modeldir,to_max,DV,sinitial,its,maxiter,num_slaves,pre_empt_flag,eval_backend,cache,out,record,metrics,rng,pn_offset):
+    num_dec = DV['S_min'].shape[0]                             # number of DVs
+    sbest = np.empty(num_dec,dtype=float)                      # best solution array
+    ileft = maxiter - its                                      # number of iterations
+    # solution storage array as in DDS_MPI
+    if record is not None:
+        solution = record.trace
+    else:
+        solution = np.empty((maxiter,num_dec+3+(pre_empt_flag>0)),dtype=float) if out is None else out
+    if rng is None:
+        rng = np.random
+    if np.size(exe_name) > 0 and eval_backend == 0:
+        # one asyncio subprocess per slave, run from this process
+        pool = None
+        evaluators = [util.get_evaluator(modeldir,objfunc_name,exe_name,k,eval_backend) for k in range(1,num_slaves+1)]
+    else:
+        pool = mp.Pool(processes=num_slaves,initializer=_init_slave,initargs=(mp.Value('i',0),_slave_seeds(rng,num_slaves)))
+        evaluators = [None]*num_slaves
+    cache_stats = (cache.hits,cache.misses) if cache is not None else (0,0)
+    slave_busy = np.zeros(num_slaves)
+    t_start = time.perf_counter()
+    if metrics is not None:
+        metrics.start_trial(maxiter)
+    eval_args = (modeldir,objfunc_name,exe_name,to_max,pre_empt_flag,eval_backend)
+    running = {}                                               # evaluation task: (slave k, candidate)
+
+    try:
+        # the first slaves start on the initial solutions (there is no sbest yet),
+        # the others once all initial solutions are sent and the first result
+        # is back (with a given initial solution, its = 1, it is run only once)
+        for k in range(min(num_slaves,its,maxiter)):
+            stest = initial_solution(DV,sinitial,rng)
+            running[asyncio.ensure_future(_async_evaluate(pool,evaluators[k],k+1,cache,stest,None,eval_args))] = (k,stest)
+        num_sent = len(running)
+        idle = list(range(num_sent,num_slaves))                # slaves without work yet
+        i = 0                                                  # number of results received
+        while running:
+            done, _ = await asyncio.wait(running,return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                k, stest = running.pop(task)
+                y, preempted, slave_index, seconds = task.result()
+                if slave_index > 0:
+                    slave_busy[slave_index-1] += seconds
+                Jtest = to_max*y
+                # Update current best
+                if i == 0 or Jtest <= Jbest:
+                    Jbest = Jtest
+                    np.copyto(sbest,stest)
+                    it_sbest = i
+                # accumulate results in Master output matrix (in order of arrival)
+                solution[i,0] = i
+                solution[i,1] = to_max*Jbest
+                solution[i,2] = to_max*Jtest
+                if record is None:
+                    solution[i,3:3+num_dec] = stest
+                else:
+                    record.store(i,stest,i < its or it_sbest == i)
+                if pre_empt_flag > 0:
+                    solution[i,-1] = preempted
+                i += 1
+                if metrics is not None and metrics.due():
+                    metrics.progress(i,to_max*Jbest,it_sbest,slave_busy.tolist())
+
+                # next candidate for this slave (and the idle slaves once there is an sbest)
+                free = [k]
+                while free and num_sent < maxiter:
+                    k = free.pop(0)
+                    if num_sent < its:
+                        stest, threshold = initial_solution(DV,sinitial,rng), None
+                    else:
+                        stest, threshold = neighbour(sbest,DV,1.0-m.log1p(num_sent-its+pn_offset)/m.log(ileft+pn_offset),rng), to_max*Jbest
+                    running[asyncio.ensure_future(_async_evaluate(pool,evaluators[k],k+1,cache,stest,threshold,eval_args))] = (k,stest)
+                    num_sent += 1
+                    if num_sent >= its:
+                        free += idle
+                        idle = []
+    finally:
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.wait(running)
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    # Return dict: {Master, best iteration #, best solution, best param set, seconds each slave waited}
+    output = _record_rows({'Master':solution,'Best_iter':it_sbest,'Best_sol':sbest,'F_Best':Jbest},record)
+    output['Slave_idle'] = time.perf_counter() - t_start - slave_busy
+    return _cache_summary(output,cache,cache_stats)
+
+
+def DDS_lockstep(objfunc_name,exe_name,modeldir,to_max,DV,sinitial,its,maxiter,num_trials,full_master=True,eval_backend=0):
+    # ==========================================================================
+    # Trial-vectorized DDS: all num_trials trials advance together as the rows
+    # (lanes) of 2-D arrays. Every iteration draws the neighbourhood masks and
+    # perturbations of all trials in one go and calls the objective function
+    # once for all trials (Evaluator.batch), so it pays off for cheap
+    # vectorized objectives. sinitial is either empty or a matrix with one
+    # initial solution per trial. Returns a list with one DDS_serial-style
+    # output dict per trial; with full_master = False the Master matrices
+    # only hold the first 3 columns (iter #, Jbest, Jtest).
+    # ==========================================================================
+    num_dec = DV['S_min'].shape[0]                             # number of DVs
+    S_min = np.broadcast_to(DV['S_min'],(num_trials,num_dec))  # DV lower bounds per lane
+    S_max = np.broadcast_to(DV['S_max'],(num_trials,num_dec))  # DV upper bounds per lane
+    Discrete_flag = np.broadcast_to(DV['Discrete_flag'],(num_trials,num_dec))
+    sbest = np.empty((num_trials,num_dec),dtype=float)         # best solution of each trial
+    Jbest = np.empty(num_trials,dtype=float)                   # best objective of each trial
+    it_sbest = np.zeros(num_trials,dtype=int)                  # iteration # of each best
+    lanes = np.arange(num_trials)
+    ileft = maxiter - its                                      # number of iterations
+    # solution storage array, one Master matrix per trial
+    solution = np.empty((num_trials,maxiter,num_dec+3 if full_master else 3),dtype=float)
+    evaluator = util.get_evaluator(modeldir,objfunc_name,exe_name,0,eval_backend)
+
+    # ==========================================================================
+    # Initial Solution Processing
+    # ==========================================================================
+    for i in range(its):
+        if np.size(sinitial) == 0:
+            stest = np.empty((num_trials,num_dec),dtype=float)
+            for t in range(num_trials):
+                stest[t] = initial_solution(DV,sinitial)
+        else:
+            stest = np.array(sinitial,dtype=float).reshape(num_trials,num_dec)
+        Jtest = to_max*evaluator.batch(stest)
+
+        # Update current best of every lane
+        improved = Jtest <= Jbest if i > 0 else np.ones(num_trials,dtype=bool)
+        Jbest[improved] = Jtest[improved]
+        sbest[improved] = stest[improved]
+        it_sbest[improved] = i
+
+        # Store initial sol. data in Master solution arrays
+        solution[:,i,0] = i
+        solution[:,i,1] = to_max*Jbest
+        solution[:,i,2] = to_max*Jtest
+        if full_master:
+            solution[:,i,3:3+num_dec] = stest
+
+    # ==========================================================================
+    # Main Algorithm Loop
+    # ==========================================================================
+    for i in range(ileft):
+        # probability of being selected as neighbour (same schedule in every lane)
+        Pn=1.0-m.log1p(i)/m.log(ileft)
+        # neighbourhood inclusion of every DV in every lane
+        selected = np.random.random((num_trials,num_dec)) < Pn
+        # lanes with no DVs selected at random get exactly ONE
+        empty = ~selected.any(axis=1)
+        if empty.any():
+            selected[lanes[empty],np.floor(num_dec*np.random.random(np.count_nonzero(empty))).astype(int)] = True
+        # perturb the selected DVs of all lanes at once
+        stest = sbest.copy()
+        stest[selected] = nval.perturb_array(sbest[selected],S_min[selected],S_max[selected],Discrete_flag[selected])
+
+        # Get objective function values of all lanes in one call
+        Jtest = to_max*evaluator.batch(stest)
+
+        # Update current best of every lane
+        improved = Jtest <= Jbest
+        Jbest[improved] = Jtest[improved]
+        sbest[improved] = stest[improved]
+        it_sbest[improved] = i+its
+
+        # accumulate results in Master output matrices
+        solution[:,i+its,0]=i+its
+        solution[:,i+its,1]=to_max*Jbest
+        solution[:,i+its,2]=to_max*Jtest
+        if full_master:
+            solution[:,i+its,3:3+num_dec]=stest
+
+    # Return one dict per trial: {Master, best iteration #, best solution, best param set}
+    return [{'Master':solution[t],'Best_iter':it_sbest[t],'Best_sol':sbest[t],'F_Best':Jbest[t]} for t in range(num_trials)]
+
+
+# Slave index of a DDS_MPI pool worker (set once per worker process)
+_slave_index = 0
+
+def _init_slave(counter,seeds=None):
+    # Gives every pool worker its own slave index (and model directory), and
+    # with seeds its own np.random seed (i.e. for stochastic objectives)
+    global _slave_index
+    with counter.get_lock():
+        counter.value += 1
+        _slave_index = counter.value
+    if seeds is not None:
+        np.random.seed(seeds[_slave_index-1])
+    # shut down this slave's persistent models when the worker exits
+    mp.util.Finalize(None,util.close_pipe_models,exitpriority=10)
+
+
+def _slave_seeds(rng,num_slaves):
+    # np.random seeds of the pool slaves: substreams of a util.RandomStream,
+    # none (slaves keep their inherited state) for np.random
+    return rng.seeds(num_slaves) if isinstance(rng,util.RandomStream) else None
+
+
+def _slave_map(pool,stests,cache,eval_args):
+    # Evaluates the candidates stests on the pool slaves, answering repeated
+    # candidates from the cache. eval_args = (modeldir,objfunc_name,exe_name,
+    # threshold,to_max,pre_empt_flag,eval_backend); returns 
+    # [(y, preempted, slave index, seconds)], slave index 0 for cached values
+    results = [None]*len(stests)
+    if cache is not None:
+        for k in range(len(stests)):
+            y = cache.get(stests[k])
+            if y is not None:
+                results[k] = (y,False,0,0.0)
+    todo = [k for k in range(len(stests)) if results[k] is None]
+    for k, result in zip(todo,pool.map(_slave_objfunc,[(stests[k],)+eval_args for k in todo],chunksize=1)):
+        results[k] = result
+        # pre-empted values are only partial objectives, so they are not cached
+        if cache is not None and not result[1]:
+            cache.put(stests[k],result[0])
+    return results
+
+
+def _slave_objfunc(args):
+    # Evaluate one candidate on a pool slave: args = (x,modeldir,objfunc_name,exe_name,
+    # threshold,to_max,pre_empt_flag,eval_backend); returns (y, preempted, slave index, seconds)
+    x,modeldir,objfunc_name,exe_name,threshold,to_max,pre_empt_flag,eval_backend = args
+    t_0 = time.perf_counter()
+    y, preempted = util.get_evaluator(modeldir,objfunc_name,exe_name,_slave_index,eval_backend).preempt(x,threshold,to_max,pre_empt_flag)
+    return y, preempted, _slave_index, time.perf_counter() - t_0
+
+
+def _add_busy(slave_busy,results):
+    # Adds the evaluation times of _slave_map results to the busy time of each slave
+    for result in results:
+        if result[2] > 0:
+            slave_busy[result[2]-1] += result[3]
+
+
+async def _async_evaluate(pool,evaluator,slave,cache,x,threshold,eval_args):
+    # One evaluation of DDS_async: on the pool if there is one, else through
+    # the evaluator of slave number slave (asyncio subprocess). eval_args = (modeldir,objfunc_name,
+    # exe_name,to_max,pre_empt_flag,eval_backend); returns (y, preempted,
+    # slave index, seconds) as _slave_map
+    if cache is not None:
+        y = cache.get(x)
+        if y is not None:
+            return y, False, 0, 0.0
+    modeldir,objfunc_name,exe_name,to_max,pre_empt_flag,eval_backend = eval_args
+    if pool is None:
+        t_0 = time.perf_counter()
+        y, preempted = await evaluator.preempt_async(x,threshold,to_max,pre_empt_flag)
+        result = (y, preempted, slave, time.perf_counter() - t_0)
+    else:
+        future = concurrent.futures.Future()
+        pool.apply_async(_slave_objfunc,((x,modeldir,objfunc_name,exe_name,threshold,to_max,pre_empt_flag,eval_backend),),
+                         callback=future.set_result,error_callback=future.set_exception)
+        result = await asyncio.wrap_future(future)
+    # pre-empted values are only partial objectives, so they are not cached
+    if cache is not None and not result[1]:
+        cache.put(x,result[0])
+    return result
+
+
+def initial_solution(DV,sinitial,rng=np.random):
+    # ==========================================================================
+    # Returns one initial solution: random samples unless a user supplied
+    # initial solution is given
+    # ==========================================================================
+    if np.size(sinitial) == 0:
+        if DV['Discrete_flag'].all() == 0:# handling continuous variables
+            # return continuous uniform random samples
+            stest = DV['S_min'] + (DV['S_max'] - DV['S_min'])*rng.random(DV['S_min'].shape[0])
+        else: # handling discrete case
+            # return random integers from the discrete uniform dist'n
+            stest = np.floor(DV['S_min'] + (DV['S_max'] - DV['S_min'] + 1)*rng.random(DV['S_min'].shape[0]))
+    else: # its=1, using a user supplied initial solution.
+        # get initial solution from the input file
+        stest = np.array(sinitial,dtype=float)
+    return stest
+
+
+def neighbours(sbest,DV,Pn,num,rng=np.random):
+    # ==========================================================================
+    # Returns num DDS neighbours of sbest (rows), drawn together as in 
+    # DDS_lockstep
+    # ==========================================================================
+    num_dec = sbest.shape[0]
+    selected = rng.random((num,num_dec)) < Pn
+    # rows with no DVs selected at random get exactly ONE
+    empty = np.flatnonzero(~selected.any(axis=1))
+    selected[empty,np.floor(num_dec*rng.random(empty.shape[0])).astype(int)] = True
+    stests = np.tile(sbest,(num,1))
+    cols = np.nonzero(selected)[1]
+    stests[selected] = nval.perturb_array(stests[selected],DV['S_min'][cols],DV['S_max'][cols],DV['Discrete_flag'][cols],rng)
+    return stests
+
+
+def neighbour(sbest,DV,Pn,rng=np.random):
+    # ==========================================================================
+    # Returns a DDS neighbour of sbest: each DV is perturbed with probability
+    # Pn, and if none are selected exactly one DV is perturbed
+    # ==========================================================================
+    num_dec = sbest.shape[0]
+    # define stest initially as current (sbest for greedy)
+    stest = sbest.copy()
+    # Generate array of random uniformly distributed numbers for neighborhood inclusion
+    selected = rng.random(num_dec) < Pn
+    # no DVs selected at random, so select ONE
+    if not selected.any():
+        selected[int(m.floor(num_dec*rng.random()))] = True
+    idx = np.flatnonzero(selected)
+    if idx.shape[0] <= SCALAR_PERTURB_MAX:
+        # few DVs selected (typical late in a run): the scalar functions are cheaper
+        for j in idx:
+            stest[j] = nval.perturb_type(sbest[j], DV['S_min'][j], DV['S_max'][j],DV['Discrete_flag'][j],rng)
+    else:
+        # perturb all selected DVs at once
+        stest[idx] = nval.perturb_array(sbest[idx], DV['S_min'][idx], DV['S_max'][idx], DV['Discrete_flag'][idx], rng)
+    return stest
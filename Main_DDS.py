@@ -1,8 +1,10 @@
 ﻿import DDS                  
 import toolkit as util
-import os, glob, shutil
+import surrogate as surr
+import pareto
+import os, glob
+import multiprocessing as mp
 import numpy as np
-import math as m
 import time
 
 
@@ -37,203 +39,614 @@ import time
 # modeldir         - Subdirectory name where model files are stored
 # obj_flag         -   Flag for optimisation problem type: -1 = max problem, 1 = min problem
 # num_slaves       - Number of parallel processing slaves used
-# pre_empt_flag    - Flag to enable model preemption (0 = disabled, 1 = enabled)
+# pre_empt_flag    - Flag to enable model preemption (0 = disabled, 1 = Python monitors and kills the model,
+#                    2 = model pre-empts itself using the threshold it is given)
+# batch_size       - Number of candidates generated and evaluated per objective call (1 = one at a time)
+# trial_procs      - Number of trials run concurrently on a process pool (1 = one after another, 0 = auto,
+#                    -1 = all trials advance together as array lanes (lock-step))
+# eval_backend     - How external models are run (0 = once per evaluation via text files, 1 = persistent model
+#                    over pipes with line protocol, 2 = persistent model over pipes with binary protocol)
+# cache_size       - Max number of cached objective function values for repeated candidates (0 = no cache)
+# cache_file       - File the evaluation cache is loaded from and saved to (0 = not persisted)
+# cache_resolution - Candidates whose DVs round to the same multiple of this value share a cache entry (0 = exact values)
+# checkpoint_evals - Checkpoint the trial in progress every n evaluations (0 = disabled)
+# checkpoint_secs  - Checkpoint the trial in progress every n seconds of wall-clock time (0 = disabled)
+# resume           - Flag to continue from the last checkpoint of this runname (0 = new run, 1 = resume)
+# out_format       - Output file format (0 = text .out files, 1 = binary archive of .npy files, see util.RunArchive)
+# record_mode      - Solution recording (0 = full Master matrix, 1 = compact: Master columns 0-2 for every evaluation,
+#                    DVs only for new best and sampled evaluations, 2 = compact with DVs stored as float32)
+# record_sample    - Compact recording also keeps the DVs of every n-th evaluation (0 = only new best solutions)
+# memory_mb        - Memory budget in MB per solution array, larger arrays are backed by a temporary file (0 = no budget)
+# stat_quantiles   - Quantiles of Jbest per iteration over all trials written to '_trial_stats.out' (i.e. 0.25,0.5,0.75)
+# profile          - Flag to time the phases of every DDS iteration and print a summary per trial (0 = off, 1 = on)
+# metrics_secs     - Seconds between progress records in the live metrics stream '<runname>_metrics.ndjson' (0 = off)
+# parallel_mode    - Parallel DDS variant (0 = synchronous steps of one candidate per slave, 1 = asynchronous:
+#                    every slave gets a new candidate as soon as it returns a result)
+# surrogate_candidates - Neighbours screened on an RBF surrogate of the evaluated candidates per evaluation,
+#                    only the most promising one is evaluated (0 = no screening)
+# portfolio        - Early termination of trials that stall or fall behind the completed trials (0 = off,
+#                    2 = cut and restart from a random solution, 3 = cut and restart from the best solution so far)
+# portfolio_stall  - Fraction of num_iters without improvement after which a trial counts as stalled
+# rng_mode         - Random numbers (0 = global numpy stream seeded with user_seed, 1 = block-buffered streams
+#                    (util.RandomStream), one substream of user_seed per trial whatever the number of trial_procs)
+# model_writes     - Files the model writes (patterns, i.e. params.txt,output/*): copied to every slave model directory,
+#                    all other model files are linked to the base model (0 = copy every file)
+# model_workdir    - Directory the slave model directories are placed in, i.e. a tmpfs such as /dev/shm (0 = next to modeldir)
+# num_objectives   - Number of objectives returned by the objective function (1 = DDS, > 1 = PA-DDS: Master columns
+#                    are iter #, archive size, objectives, DVs and the Pareto front is written to '_pareto.out'
+#                    instead of '_trial_avgs.out' and '_trial_stats.out')
+# warm_start       - Output directory (or binary archive) of an earlier run to continue from: trial j starts from its best
+#                    solution projected onto the current bounds and its Pn schedule goes on from the evaluations used (0 = off)
+
+# Slave index of a trial-pool worker (0 when trials run in this process)
+_trial_slave = 0
+
+def _init_trial_worker(counter):
+    # Gives every trial-pool worker its own slave index (and model directory)
+    global _trial_slave
+    with counter.get_lock():
+        counter.value += 1
+        _trial_slave = counter.value
+    # shut down this worker's persistent models when it exits
+    mp.util.Finalize(None,util.close_pipe_models,exitpriority=10)
+
+def run_trial(j,seed,sinitial,DDS_inp,exe_name,Modeldir,DV_bounds,its,parallel_run,cache,checkpoint=None,resume=None,archive=None,metrics=None,portfolio=None,rng=None,pn_offset=0):
+    # ==========================================================================
+    # Runs optimisation trial j. seed = None continues the current random 
+    # stream, else the trial's own substream is seeded first. With rng (a
+    # util.RandomStream of the trial) DDS draws from it instead. checkpoint and
+    # resume (saved trial state) are passed on to DDS_serial, the Master rows 
+    # are stored straight into archive (util.RunArchive) if one is given.
+    # Compact recording keeps DVs for selected rows only (util.CompactRecord).
+    # With profiling the phase timings (util.Profiler) are returned in output['Profile'].
+    # Parallel runs use DDS_MPI (synchronous) or DDS_async (parallel_mode = 1).
+    # With surrogate screening every trial fits its own surrogate.RBF.
+    # In portfolio mode (util.Portfolio) the trial runs through DDS_portfolio.
+    # Objective functions with several objectives run through DDS_pareto.
+    # Progress is reported to metrics (util.MetricsStream) if one is given.
+    # A warm started trial continues the Pn schedule after pn_offset evaluations.
+    # ==========================================================================
+    # Output to console:
+    if DDS_inp['verbose']:
+        print('Trial number %s executing ... '%(j+1))
 
-#===============================================================================
-# 1.0   Read DDS Input Files ( 1- main control file, 2 - decision variable bounds)
+    # Start timer:
+    t_0 = time.time()
 
-DDS_inp = util.read_DDS_inp('DDS_inp.txt')          # read 1
+    if seed is not None:
+        np.random.seed(seed)
+    out = None if archive is None else archive.trial(j)
+    num_dec = DV_bounds['S_min'].shape[0]
+    spill_dir = DDS_inp['workdir']
+    record = None
+    if DDS_inp['record_mode'] > 0:
+        trace = out if out is not None else util.alloc_array((DDS_inp['num_iters'],3+(DDS_inp['pre_empt_flag']>0)),float,DDS_inp['memory_mb'],spill_dir)
+        record = util.CompactRecord(trace,num_dec,DDS_inp['record_sample'],np.float32 if DDS_inp['record_mode'] == 2 else float,DDS_inp['memory_mb'],spill_dir)
+    elif out is None and DDS_inp['memory_mb'] > 0:
+        out = util.alloc_array((DDS_inp['num_iters'],num_dec+3+(DDS_inp['pre_empt_flag']>0)),float,DDS_inp['memory_mb'],spill_dir)
+    profiler = util.Profiler() if DDS_inp['profile'] == 1 else None
+    if metrics is not None:
+        metrics.trial = j+1
+    surrogate = surr.RBF(DV_bounds['S_min'],DV_bounds['S_max'],1000,DDS_inp['memory_mb'],spill_dir) if DDS_inp['surrogate_candidates'] > 0 else None
 
-bounds_file = DDS_inp['objfunc_name'] + '.txt'
-DV_bounds = util.read_param_file(bounds_file)       # read 2
-num_dec = DV_bounds['S_min'].shape[0]               # number of dec variables
-#===============================================================================
-# 2.0   Input verification
-
-# Ensure valid entry for parallel processing slaves 
-# n= 1: serial run, n = 0: optimised auto slaves, n > 1 = 'n' user specified slaves       
-assert DDS_inp['num_slaves'] >= 0, 'For a parallel run, please enter a valid number (> 1) of processing slaves! Try program again.'
-
-# Determine if Parallel or serial execution:
-if DDS_inp['num_slaves'] > 1:
-    # parallel run with 'n' user specified slaves
-    parallel_run = True
-    # total iters = n slaves * evaluations per slave                                                         
-    DDS_inp['num_iters'] = DDS_inp['num_iters']*DDS_inp['num_slaves']
-    # number of initial solution iters = number of slaves (each slave gets one eval)           
-    its = DDS_inp['num_slaves']                                                 
-elif DDS_inp['num_slaves'] == 0:
-    parallel_run = True
-    # total iters = n slaves * evaluations per slave 
-    DDS_inp['num_iters'] = DDS_inp['num_iters']*DDS_inp['num_slaves']
-    # number of initial solution iters = number of slaves (each slave gets one eval) 
-    its = DDS_inp['num_slaves']
-elif DDS_inp['num_slaves'] == 1:
-    parallel_run = False
-    # number of initial solution iters = max of 5 and 0.5% of total iterations
-    its=max(5,np.around(0.005*DDS_inp['num_iters']))
-
-
-assert DDS_inp['obj_flag'] == -1 or DDS_inp['obj_flag'] == 1, 'Please enter -1 or 1 for objective function flag!  Try program again.'
-
-assert DDS_inp['num_trials'] >= 1 and DDS_inp['num_trials'] <= 1000, 'Please enter 1 to 1000 optimization trials!  Try program again.'
-
-assert DDS_inp['num_iters'] >= 7 and DDS_inp['num_iters'] <= 1000000, 'Please enter 7 to 1000000 for max # function evaluations!  Try program again.'
-
-assert DDS_inp['out_print'] ==0 or DDS_inp['out_print'] ==1, 'Please enter 0 or 1 for output printing flag! Try program again.'
-
-# Set random seed
-np.random.seed(DDS_inp['user_seed'])
-
-# Initial Solution Set-up
-if DDS_inp['ini_name'] != '0':      # Case where initial sols file is provided
-    its = 1
-    Init_Mat = np.loadtxt(DDS_inp['ini_name'],dtype=float,comments = '#',skiprows =2)
-    assert DDS_inp['num_trials'] == Init_Mat.shape[0], 'Number of initial solutions does not match # trials selected. Try program again.'
-    assert num_dec == Init_Mat.shape[1], 'Number of dec vars in S_min & initial solution matrix not consistent.'
+    # Call either Serial or MPI DDS Algorithm:
+    if DDS_inp['num_objectives'] > 1:
+        output = DDS.DDS_pareto(DDS_inp['objfunc_name'],exe_name,Modeldir,DDS_inp['obj_flag'],DV_bounds,sinitial,its,DDS_inp['num_iters'],DDS_inp['num_objectives'],_trial_slave,DDS_inp['eval_backend'],metrics,rng)
+    elif portfolio is not None:
+        portfolio.trial = j+1
+        output = DDS.DDS_portfolio(DDS_inp['objfunc_name'],exe_name,Modeldir,DDS_inp['obj_flag'],DV_bounds,sinitial,its,DDS_inp['num_iters'],portfolio,_trial_slave,DDS_inp['pre_empt_flag'],DDS_inp['eval_backend'],cache,out,profiler,metrics,surrogate,DDS_inp['surrogate_candidates'],rng)
+    elif parallel_run == False:
+        output = DDS.DDS_serial(DDS_inp['objfunc_name'],exe_name,Modeldir,DDS_inp['obj_flag'],DV_bounds,sinitial,its,DDS_inp['num_iters'],DDS_inp['batch_size'],_trial_slave,DDS_inp['pre_empt_flag'],DDS_inp['eval_backend'],cache,checkpoint,resume,out,record,profiler,metrics,surrogate,DDS_inp['surrogate_candidates'],None,rng,pn_offset)
+    elif DDS_inp['parallel_mode'] == 1:
+        output = DDS.DDS_async(DDS_inp['objfunc_name'],exe_name,Modeldir,DDS_inp['obj_flag'],DV_bounds,sinitial,its,DDS_inp['num_iters'],DDS_inp['num_slaves'],DDS_inp['pre_empt_flag'],DDS_inp['eval_backend'],cache,out,record,metrics,rng,pn_offset)
+    else:
+        output = DDS.DDS_MPI(DDS_inp['objfunc_name'],exe_name,Modeldir,DDS_inp['obj_flag'],DV_bounds,sinitial,its,DDS_inp['num_iters'],DDS_inp['num_slaves'],DDS_inp['pre_empt_flag'],DDS_inp['eval_backend'],cache,out,record,profiler,metrics,rng,pn_offset)
 
-#===============================================================================
-# 3.0   Definition of directory and model subdirectory structure 
-
-# Set script directory - location of this script
-script_dir = os.path.dirname(__file__)
-os.chdir(script_dir)
-
-# Get objective function file type by splitting ext. (i.e. 'myfunc'.'exe')
-ext_name = DDS_inp['objfunc_name'].split('.')
-
-if len(ext_name) == 1:
-    # Python objective function (*.py)
-    exe_name = np.array([])
-    # sets executable file name variable to null
-else: # case where .exe or .bat file is called
-    exe_name = DDS_inp['objfunc_name']
-    # indicates that toolkit function ext_function will run to handle .exe file
-    DDS_inp['objfunc_name'] ='ext_function'
-
-# If subdirectory for model is not specified:
-if DDS_inp['modeldir'] == '0':
-    Modeldir = script_dir
-# If relative path specified and parallel run
-elif DDS_inp['modeldir'] != 0 and parallel_run is True:
-    # Set Model subdirectory
-    Modeldir = os.path.join(script_dir, DDS_inp['modeldir'])
-    #Generate copies of base-model for slave-acess
-    util.generate_dir(DDS_inp['num_slaves'],Modeldir)
-# Else relative path and serial run
-else:  
-    Modeldir = os.path.join(script_dir, DDS_inp['modeldir'])
-#===============================================================================
-# 4.0   Define Output files and arrays:
-
-filenam1=DDS_inp['runname'] +'_ini.out'         # initial sol'n file name
-filenam2=DDS_inp['runname'] + '_AVG.out'        # avg trial outputs
-filenam3=DDS_inp['runname'] + '_sbest.out'      # output best DV solutions per trial
-filenam4=DDS_inp['runname'] + '_trials.out'     # output Jbest per iteration number per trial
-
-# Master output solution Matrix - Initial iteration = initial solution eval
-master_output = np.empty((DDS_inp['num_iters'] + its, 3 + num_dec),dtype= float)
-initial_sols = np.empty((its, 3 + num_dec),dtype = float)
-output = np.empty((DDS_inp['num_iters'],3),dtype = float)
-# tracks only Jbest but for all trials in one file
-Jbest_trials=np.empty((DDS_inp['num_iters'],DDS_inp['num_trials']),dtype = float) 
-# Matrix holding the best sets of decision variables
-Sbest_trials=np.empty((DDS_inp['num_trials'],num_dec),dtype = float)  
-sum_output = np.empty((DDS_inp['num_iters']-its,3),dtype =float)
-# Matrix holding averages
-MAT_avg = np.empty_like(sum_output)
-#===============================================================================
-# 5.0   Main Algorithm Calling Loop
+    # Stop trial timer
+    output['Runtime'] = time.time() - t_0
+    if profiler is not None:
+        output['Profile'] = profiler
+    return output
+
+def _trial_worker(args):
+    return run_trial(*args)
+
+def _quiet(*args, **kwargs):
+    pass
+
+def run_dds(config,bounds,objective=None,workdir=None,outdir=None,verbose=True,return_master=False):
+    # ==========================================================================
+    # Runs all trials of DDS in this process and returns the results in memory
+    # (the script below is a thin wrapper reading DDS_inp.txt). The working 
+    # directory of the process is never changed, so many runs can follow each
+    # other or run concurrently (i.e. in threads) in one long-lived process.
+    #   config    - settings as returned by util.read_DDS_inp; num_iters and
+    #               user_seed are required, others default to util.DDS_DEFAULTS
+    #   bounds    - DV bounds as returned by util.read_param_file or 
+    #               util.make_bounds, or rows of (S_min, S_max[, Discrete_flag])
+    #   objective - Python objective function f(x) used instead of 
+    #               config['objfunc_name'] (module level, so that it can be
+    #               pickled for parallel slaves and concurrent trials)
+    #   workdir   - directory relative paths in config (ini_name, modeldir,
+    #               cache_file, model_workdir, warm_start) and the checkpoint,
+    #               metrics and memory-mapped files are placed in (default:
+    #               the current directory)
+    #   outdir    - directory the output files are written to (default: no
+    #               output files, binary output needs one)
+    #   verbose   - progress messages to the console
+    #   return_master - keep the Master (and Rows) arrays of each trial in the
+    #               returned results; off by default so that memory stays
+    #               bounded by one trial (memory_mb, binary output)
+    # With rng_mode = 0 all runs draw from the global numpy random stream, so
+    # concurrent runs are only reproducible with rng_mode = 1.
+    # Returns {'trials': output of each trial (Master rows only with
+    # return_master and full output, out_print = 0), 'Sbest': best DVs of 
+    # each trial, 'F_Best', 'Best_iter', 'Runtime': per trial, 'avgs', 
+    # 'stats', 'stats_header': averages and statistics of Jbest per 
+    # iteration over all trials}. Multi-objective runs return the Pareto 
+    # front of all trials ('Pareto_F', 'Pareto_X', 'Pareto_trial') instead
+    # of the averages and statistics.
+    # ==========================================================================
+
+    #===============================================================================
+    # 1.0   Settings of the run
+
+    DDS_inp = dict(util.DDS_DEFAULTS, **config)
+    if objective is not None:
+        DDS_inp['objfunc_name'] = objective
+    workdir = os.getcwd() if workdir is None else os.path.abspath(workdir)
+    # passed on to run_trial with the settings
+    DDS_inp['verbose'] = verbose
+    DDS_inp['workdir'] = workdir
+    say = print if verbose else _quiet
+    outpath = None if outdir is None else os.path.abspath(outdir)
+
+    if getattr(bounds, 'dtype', None) is not None and bounds.dtype.names is not None:
+        DV_bounds = bounds
+    else:
+        rows = np.atleast_2d(np.asarray(bounds, dtype=float))
+        DV_bounds = util.make_bounds(rows[:,0],rows[:,1],rows[:,2] if rows.shape[1] > 2 else None)
+    num_dec = DV_bounds['S_min'].shape[0]               # number of dec variables
+    #===============================================================================
+    # 2.0   Input verification
 
-for j in range(0,DDS_inp['num_trials']):
-    
-    # Output to console:
-    print('Trial number %s executing ... '%(j+1))
-    
-    # Start timer:
-    t_0 = time.time()
-    
-    # Feed initial solutions:
-    if DDS_inp['ini_name'] == '0':
-        sinitial = np.array([])
+    # Ensure valid entry for parallel processing slaves 
+    # n= 1: serial run, n = 0: optimised auto slaves, n > 1 = 'n' user specified slaves       
+    assert DDS_inp['num_slaves'] >= 0, 'For a parallel run, please enter a valid number (> 1) of processing slaves! Try program again.'
+
+    # Determine if Parallel or serial execution:
+    if DDS_inp['num_slaves'] > 1:
+        # parallel run with 'n' user specified slaves
+        parallel_run = True
+        # total iters = n slaves * evaluations per slave                                                         
+        DDS_inp['num_iters'] = DDS_inp['num_iters']*DDS_inp['num_slaves']
+        # number of initial solution iters = number of slaves (each slave gets one eval)           
+        its = DDS_inp['num_slaves']                                                 
+    elif DDS_inp['num_slaves'] == 0:
+        parallel_run = True
+        # optimised auto slaves - one slave per available CPU core
+        DDS_inp['num_slaves'] = mp.cpu_count()
+        # total iters = n slaves * evaluations per slave 
+        DDS_inp['num_iters'] = DDS_inp['num_iters']*DDS_inp['num_slaves']
+        # number of initial solution iters = number of slaves (each slave gets one eval) 
+        its = DDS_inp['num_slaves']
+    elif DDS_inp['num_slaves'] == 1:
+        parallel_run = False
+        # number of initial solution iters = max of 5 and 0.5% of total iterations
+        its=int(max(5,np.around(0.005*DDS_inp['num_iters'])))
+
+
+    assert DDS_inp['obj_flag'] == -1 or DDS_inp['obj_flag'] == 1, 'Please enter -1 or 1 for objective function flag!  Try program again.'
+
+    assert DDS_inp['num_trials'] >= 1 and DDS_inp['num_trials'] <= 1000, 'Please enter 1 to 1000 optimization trials!  Try program again.'
+
+    assert DDS_inp['num_iters'] >= 7 and DDS_inp['num_iters'] <= 1000000, 'Please enter 7 to 1000000 for max # function evaluations!  Try program again.'
+
+    assert DDS_inp['out_print'] ==0 or DDS_inp['out_print'] ==1, 'Please enter 0 or 1 for output printing flag! Try program again.'
+
+    assert DDS_inp['pre_empt_flag'] in (0,1,2), 'Please enter 0, 1 or 2 for model pre-emption! Try program again.'
+
+    assert DDS_inp['pre_empt_flag'] == 0 or (DDS_inp['batch_size'] == 1 and DDS_inp['trial_procs'] != -1), 'Model pre-emption evaluates one candidate at a time, please set the batch size to 1 and do not use lock-step trials! Try program again.'
+
+    assert DDS_inp['eval_backend'] in (0,1,2), 'Please enter 0, 1 or 2 for the external model backend! Try program again.'
+
+    assert DDS_inp['pre_empt_flag'] == 0 or DDS_inp['eval_backend'] == 0, 'Model pre-emption needs one model run per evaluation, please set the external model backend to 0! Try program again.'
+
+    assert DDS_inp['cache_size'] >= 0, 'Please enter 0 (no cache) or a positive evaluation cache size! Try program again.'
+
+    assert DDS_inp['cache_resolution'] >= 0, 'Please enter 0 (exact values) or a positive evaluation cache resolution! Try program again.'
+
+    assert DDS_inp['resume'] == 0 or DDS_inp['resume'] == 1, 'Please enter 0 or 1 for the resume flag! Try program again.'
+
+    assert (DDS_inp['checkpoint_evals'] == 0 and DDS_inp['checkpoint_secs'] == 0 and DDS_inp['resume'] == 0) or DDS_inp['trial_procs'] != -1, 'Checkpoints are not available for lock-step trials! Try program again.'
+
+    assert DDS_inp['out_format'] == 0 or DDS_inp['out_format'] == 1, 'Please enter 0 or 1 for the output file format! Try program again.'
+
+    assert DDS_inp['record_mode'] in (0,1,2), 'Please enter 0, 1 or 2 for the solution recording mode! Try program again.'
+
+    assert DDS_inp['record_mode'] == 0 or DDS_inp['trial_procs'] != -1, 'Compact recording is not available for lock-step trials! Try program again.'
+
+    assert DDS_inp['record_sample'] >= 0 and DDS_inp['memory_mb'] >= 0, 'Please enter 0 or a positive value for the recording sample interval and memory budget! Try program again.'
+
+    assert all(0 < q < 1 for q in DDS_inp['stat_quantiles']), 'Please enter quantiles between 0 and 1 (i.e. 0.25,0.5,0.75) or 0 for none! Try program again.'
+
+    assert DDS_inp['profile'] == 0 or DDS_inp['profile'] == 1, 'Please enter 0 or 1 for the profiling flag! Try program again.'
+
+    assert DDS_inp['profile'] == 0 or DDS_inp['trial_procs'] != -1, 'Profiling is not available for lock-step trials! Try program again.'
+
+    assert DDS_inp['parallel_mode'] == 0 or DDS_inp['parallel_mode'] == 1, 'Please enter 0 or 1 for the parallel mode! Try program again.'
+
+    assert DDS_inp['parallel_mode'] == 0 or DDS_inp['profile'] == 0, 'Profiling is only available for synchronous parallel runs (parallel mode 0)! Try program again.'
+
+    assert DDS_inp['surrogate_candidates'] >= 0, 'Please enter 0 (no screening) or a positive number of surrogate candidates! Try program again.'
+
+    assert DDS_inp['surrogate_candidates'] == 0 or (parallel_run is False and DDS_inp['batch_size'] == 1 and DDS_inp['trial_procs'] != -1), 'Surrogate screening is only available for serial runs evaluating one candidate at a time (1 slave, batch size 1, no lock-step trials)! Try program again.'
+
+    assert DDS_inp['portfolio'] in (0,2,3), 'Please enter 0, 2 or 3 for the portfolio mode (cut trials restart, so their evaluations are not lost)! Try program again.'
+
+    assert DDS_inp['portfolio'] == 0 or 0 < DDS_inp['portfolio_stall'] < 1, 'Please enter a stall fraction between 0 and 1 (i.e. 0.2) for the portfolio mode! Try program again.'
+
+    assert DDS_inp['portfolio'] == 0 or (parallel_run is False and DDS_inp['batch_size'] == 1 and DDS_inp['trial_procs'] == 1), 'Portfolio mode is only available for serial runs with trials one after another and batch size 1! Try program again.'
+
+    assert DDS_inp['portfolio'] == 0 or (DDS_inp['record_mode'] == 0 and DDS_inp['checkpoint_evals'] == 0 and DDS_inp['checkpoint_secs'] == 0 and DDS_inp['resume'] == 0), 'Portfolio mode cannot be combined with compact recording or checkpoints! Try program again.'
+
+    assert DDS_inp['rng_mode'] == 0 or DDS_inp['rng_mode'] == 1, 'Please enter 0 or 1 for the random number mode! Try program again.'
+
+    assert DDS_inp['rng_mode'] == 0 or DDS_inp['trial_procs'] != -1, 'Lock-step trials draw from the global random stream, please set the random number mode to 0! Try program again.'
+
+    assert DDS_inp['num_objectives'] >= 1, 'Please enter 1 or more objectives! Try program again.'
+
+    assert DDS_inp['num_objectives'] == 1 or (parallel_run is False and DDS_inp['batch_size'] == 1 and DDS_inp['trial_procs'] != -1 and DDS_inp['pre_empt_flag'] == 0), 'Multi-objective DDS is only available for serial runs evaluating one candidate at a time (1 slave, batch size 1, no lock-step trials, no pre-emption)! Try program again.'
+
+    assert DDS_inp['num_objectives'] == 1 or (DDS_inp['cache_size'] == 0 and DDS_inp['checkpoint_evals'] == 0 and DDS_inp['checkpoint_secs'] == 0 and DDS_inp['resume'] == 0 and DDS_inp['out_format'] == 0 and DDS_inp['record_mode'] == 0 and DDS_inp['memory_mb'] == 0 and DDS_inp['surrogate_candidates'] == 0 and DDS_inp['portfolio'] == 0), 'Multi-objective DDS cannot be combined with the evaluation cache, checkpoints, binary output, compact recording, a memory budget, surrogate screening or portfolio mode! Try program again.'
+
+    assert DDS_inp['warm_start'] == '0' or DDS_inp['ini_name'] == '0', 'A warm start supplies the initial solutions, please set the initial solutions file to 0! Try program again.'
+
+    assert DDS_inp['warm_start'] == '0' or (DDS_inp['trial_procs'] != -1 and DDS_inp['portfolio'] == 0 and DDS_inp['num_objectives'] == 1), 'A warm start cannot be combined with lock-step trials, portfolio mode or multi-objective DDS! Try program again.'
+
+    assert DDS_inp['out_format'] == 0 or outpath is not None, 'Binary output is written to the output directory, please give one! Try program again.'
+
+    assert DDS_inp['batch_size'] >= 1, 'Please enter a batch size of 1 or more candidates per objective call! Try program again.'
+
+    assert DDS_inp['batch_size'] == 1 or parallel_run is False, 'Batch evaluation is only available for serial runs (1 processing slave)! Try program again.'
+
+    # Concurrent trials: n = 1 one after another, n = 0 auto pool size, n > 1 = 'n' trials at a time,
+    # n = -1 lock-step trials
+    assert DDS_inp['trial_procs'] >= -1, 'Please enter a valid number of concurrent trials (0 = auto, 1 = one after another, -1 = lock-step)! Try program again.'
+    if DDS_inp['trial_procs'] == 0:
+        DDS_inp['trial_procs'] = min(mp.cpu_count(), DDS_inp['num_trials'])
+    assert DDS_inp['trial_procs'] == 1 or parallel_run is False, 'Concurrent trials cannot be combined with parallel processing slaves! Try program again.'
+    assert DDS_inp['trial_procs'] != -1 or DDS_inp['batch_size'] == 1, 'Lock-step trials already evaluate all trials in one call, please set the batch size to 1! Try program again.'
+
+    # Set random seed
+    np.random.seed(DDS_inp['user_seed'])
+
+    # Initial Solution Set-up
+    if DDS_inp['ini_name'] != '0':      # Case where initial sols file is provided
+        its = 1
+        Init_Mat = np.loadtxt(os.path.join(workdir,DDS_inp['ini_name']),dtype=float,comments = '#',skiprows =2)
+        assert DDS_inp['num_trials'] == Init_Mat.shape[0], 'Number of initial solutions does not match # trials selected. Try program again.'
+        assert num_dec == Init_Mat.shape[1], 'Number of dec vars in S_min & initial solution matrix not consistent.'
+    # Pn schedule offset per trial (evaluations of the earlier runs of a warm start)
+    pn_offsets = [0]*DDS_inp['num_trials']
+    if DDS_inp['warm_start'] != '0':    # Case where trials continue from an earlier run
+        its = 1
+        warm = util.read_warm_start(os.path.join(workdir,DDS_inp['warm_start']),num_dec)
+        # trial j continues trial j of the earlier run (cycling if it had fewer trials)
+        prev = [j % warm['sbest'].shape[0] for j in range(DDS_inp['num_trials'])]
+        Init_Mat = np.array([util.project_solution(warm['sbest'][k].copy(),DV_bounds) for k in prev])
+        pn_offsets = [int(warm['evals'][k]) for k in prev]
+        say('Warm start from %s: %i trials, %i to %i evaluations used, %i DV values projected onto the bounds \n'%(DDS_inp['warm_start'],warm['sbest'].shape[0],
+              warm['evals'].min(),warm['evals'].max(),int(np.sum(Init_Mat != warm['sbest'][prev]))))
+
+    #===============================================================================
+    # 3.0   Definition of directory and model subdirectory structure 
+
+    # Get objective function file type by splitting ext. (i.e. 'myfunc'.'exe')
+    if callable(DDS_inp['objfunc_name']) or len(DDS_inp['objfunc_name'].split('.')) == 1:
+        # Python objective function (*.py or the function itself)
+        exe_name = np.array([])
+        # sets executable file name variable to null
+    else: # case where .exe or .bat file is called
+        exe_name = DDS_inp['objfunc_name']
+        # indicates that toolkit function ext_function will run to handle .exe file
+        DDS_inp['objfunc_name'] ='ext_function'
+    # name of the objective function in the evaluation cache and metrics stream
+    objfunc_label = DDS_inp['objfunc_name'] if isinstance(DDS_inp['objfunc_name'],str) else DDS_inp['objfunc_name'].__module__ + '.' + DDS_inp['objfunc_name'].__qualname__
+
+    # If subdirectory for model is not specified:
+    if DDS_inp['modeldir'] == '0':
+        Modeldir = workdir
+    # If relative path specified and parallel run (one model directory per slave) or 
+    # concurrent trials (one model directory per trial worker)
+    elif DDS_inp['modeldir'] != 0 and (parallel_run is True or DDS_inp['trial_procs'] > 1):
+        # Set Model subdirectory
+        Modeldir = os.path.join(workdir, DDS_inp['modeldir'])
+        #Generate (or reuse) copies of base-model for slave-acess
+        num_copies = DDS_inp['num_slaves'] if parallel_run is True else DDS_inp['trial_procs']
+        slave_dir = None if DDS_inp['model_workdir'] == '0' else os.path.join(workdir, DDS_inp['model_workdir'])
+        provision = util.generate_dir(num_copies,Modeldir,DDS_inp['model_writes'],slave_dir)
+        Modeldir = provision['modeldir']
+        say('Model directories of %i slaves ready in %.1f seconds: %i files linked, %i copied, %i reused \n'%(num_copies,provision['seconds'],provision['linked'],provision['copied'],provision['kept']))
+    # Else relative path and serial run
+    else:  
+        Modeldir = os.path.join(workdir, DDS_inp['modeldir'])
+    #===============================================================================
+    # 4.0   Define Output files and arrays:
+
+    filenam1=DDS_inp['runname'] +'_ini.out'         # initial sol'n file name
+    filenam2=DDS_inp['runname'] + '_AVG.out'        # avg trial outputs
+    filenam3=DDS_inp['runname'] + '_sbest.out'      # output best DV solutions per trial
+    filenam4=DDS_inp['runname'] + '_trials.out'     # output Jbest per iteration number per trial
+
+    initial_sols = np.empty((its, 3 + num_dec),dtype = float)
+    output = np.empty((DDS_inp['num_iters'],3),dtype = float)
+    # tracks only Jbest but for all trials in one file (only needed for the text 'Jbest_trial_N.out' files)
+    if DDS_inp['out_print'] == 0 and DDS_inp['out_format'] == 0 and outpath is not None:
+        Jbest_trials=util.alloc_array((DDS_inp['num_iters'],DDS_inp['num_trials']),float,DDS_inp['memory_mb'],workdir) 
     else:
-        sinitial = Init_Mat[j,:]
-    
-    # Call either Serial or MPI DDS Algorithm:
-    if parallel_run == False:
-        output = DDS.DDS_serial(DDS_inp['objfunc_name'],exe_name,Modeldir,DDS_inp['obj_flag'],DV_bounds,sinitial,its,DDS_inp['num_iters'])
-    #else:
-        #output = DDS.DDS_MPI()
+        Jbest_trials = None
+    # Matrix holding the best sets of decision variables
+    Sbest_trials=np.empty((DDS_inp['num_trials'],num_dec),dtype = float)  
+    # Statistics per iteration over all trials, updated as each trial finishes (Jbest and Jtest, so single-objective only)
+    stats = util.TrialStats(DDS_inp['num_iters']-its,DDS_inp['stat_quantiles'],DDS_inp['memory_mb'],workdir) if DDS_inp['num_objectives'] == 1 else None
+    # Evaluation cache for repeated candidates (shared by all trials run in this process)
+    if DDS_inp['cache_size'] > 0:
+        cache = util.EvalCache(DDS_inp['cache_size'],None if DDS_inp['cache_file'] == '0' else os.path.join(workdir,DDS_inp['cache_file']),objfunc_label + str(exe_name),DDS_inp['cache_resolution'])
+    else:
+        cache = None
+    # Checkpoints: completed trials are saved after every trial, the trial in progress 
+    # periodically by DDS_serial (serial execution, trials one after another)
+    checkpoint = None
+    resume_trial = None
+    first_trial = 0
+    if DDS_inp['checkpoint_evals'] > 0 or DDS_inp['checkpoint_secs'] > 0 or DDS_inp['resume'] == 1:
+        checkpoint = util.Checkpoint(os.path.join(workdir,DDS_inp['runname'] + '_checkpoint.pkl'),DDS_inp['checkpoint_evals'],DDS_inp['checkpoint_secs'])
+    if DDS_inp['resume'] == 1:
+        saved = checkpoint.load()
+        if saved is not None:
+            if saved['run'] is not None:
+                # restore completed trials
+                first_trial = saved['run']['num_done']
+                if Jbest_trials is not None:
+                    Jbest_trials[:,:first_trial] = saved['run']['Jbest_trials']
+                Sbest_trials[:first_trial,:] = saved['run']['Sbest_trials']
+                stats = saved['run']['stats']
+                np.random.set_state(saved['run']['rng'])
+                checkpoint.run_state = saved['run']
+            # state of the interrupted trial (DDS_serial continues it)
+            resume_trial = saved['trial']
+            say('Resuming from checkpoint: %i trials completed%s \n'%(first_trial,'' if resume_trial is None else ', trial %i at evaluation %i'%(first_trial+1,resume_trial['solution'].shape[0])))
+    # Output directory: output files of an earlier run are removed, except for a
+    # resumed run, whose completed trials are already there
+    if outpath is not None:
+        if not os.path.exists(outpath):
+            os.makedirs(outpath)
+        elif first_trial == 0 and resume_trial is None:
+            for f in glob.glob(os.path.join(outpath, "*.out")):
+                os.remove(f)
+    # Binary output: one archive in the output directory, filled while the trials run
+    archive = None
+    if DDS_inp['out_format'] == 1:
+        archive_dir = os.path.join(outpath, DDS_inp['runname'] + '_archive')
+        if first_trial > 0 or resume_trial is not None:
+            # resumed run continues its own archive
+            archive = util.RunArchive(archive_dir)
+        else:
+            # compact recording archives the Master columns 0-2 (+ DVs of the kept rows per trial)
+            num_cols = (3 if DDS_inp['record_mode'] > 0 else num_dec + 3) + (DDS_inp['pre_empt_flag'] > 0)
+            archive = util.RunArchive(archive_dir, {'runname':DDS_inp['runname'],'num_trials':DDS_inp['num_trials'],'num_rows':DDS_inp['num_iters'],
+                                                    'num_cols':num_cols,'num_dec':num_dec,'its':its,'full':DDS_inp['out_print'] == 0})
+    # Live metrics stream (a new run starts a new stream, a resumed run appends to it)
+    metrics = None
+    if DDS_inp['metrics_secs'] > 0:
+        metrics_file = os.path.join(workdir,DDS_inp['runname'] + '_metrics.ndjson')
+        if DDS_inp['resume'] == 0 and os.path.exists(metrics_file):
+            os.remove(metrics_file)
+        metrics = util.MetricsStream(metrics_file,DDS_inp['metrics_secs'])
+        metrics.write('run_start',runname=DDS_inp['runname'],objfunc_name=objfunc_label,num_trials=DDS_inp['num_trials'],
+                      num_iters=DDS_inp['num_iters'],num_dec=num_dec,first_trial=first_trial+1)
+    # Portfolio mode: trials are cut against the statistics of the completed trials
+    portfolio = None
+    if DDS_inp['portfolio'] > 0:
+        portfolio = util.Portfolio(DDS_inp['portfolio'],max(1,int(round(DDS_inp['portfolio_stall']*DDS_inp['num_iters']))),DDS_inp['num_iters'],its,DDS_inp['obj_flag'],stats)
+    #===============================================================================
+    # 5.0   Main Algorithm Calling Loop
+
+    # Initial solutions fed to each trial:
+    if DDS_inp['ini_name'] == '0' and DDS_inp['warm_start'] == '0':
+        sinitials = [np.array([])]*DDS_inp['num_trials']
+    else:
+        sinitials = [Init_Mat[j,:] for j in range(DDS_inp['num_trials'])]
+
+    # Block-buffered random streams: every trial draws from its own substream of 
+    # user_seed, so results do not depend on how many trials run at once
+    if DDS_inp['rng_mode'] == 1:
+        trial_streams = util.RandomStream(DDS_inp['user_seed']).spawn(DDS_inp['num_trials'])
+    else:
+        trial_streams = [None]*DDS_inp['num_trials']
+
+    if DDS_inp['trial_procs'] == -1:
+        # All trials advance together as the lanes of one trial-vectorized run
+        say('All %i trials executing in lock-step ... '%DDS_inp['num_trials'])
+        t_0 = time.time()
+        trial_outputs = DDS.DDS_lockstep(DDS_inp['objfunc_name'],exe_name,Modeldir,DDS_inp['obj_flag'],DV_bounds,np.array(sinitials),its,DDS_inp['num_iters'],DDS_inp['num_trials'],DDS_inp['out_print'] == 0,DDS_inp['eval_backend'])
+        for output in trial_outputs:
+            # trials ran together, so each reports the run time of the whole set
+            output['Runtime'] = time.time() - t_0
+    elif DDS_inp['trial_procs'] == 1:
+        # Trials run one after another on the random stream seeded from user_seed
+        trial_args = [(j,None,sinitials[j],DDS_inp,exe_name,Modeldir,DV_bounds,its,parallel_run,cache,checkpoint if parallel_run == False else None,
+                       resume_trial if j == first_trial else None,archive,metrics,portfolio,trial_streams[j],pn_offsets[j]) for j in range(first_trial,DDS_inp['num_trials'])]
+        trial_outputs = map(_trial_worker, trial_args)
+    else:
+        # Trials run concurrently, each on its own reproducible substream derived from user_seed
+        trial_seeds = [int(ss.generate_state(1)[0]) for ss in np.random.SeedSequence(DDS_inp['user_seed']).spawn(DDS_inp['num_trials'])]
+        trial_args = [(j,trial_seeds[j],sinitials[j],DDS_inp,exe_name,Modeldir,DV_bounds,its,parallel_run,cache,None,None,None,metrics,None,trial_streams[j],pn_offsets[j]) for j in range(first_trial,DDS_inp['num_trials'])]
+        trial_pool = mp.Pool(processes=DDS_inp['trial_procs'],initializer=_init_trial_worker,initargs=(mp.Value('i',0),))
+        # results come back in trial order, so they are merged exactly as in a serial run
+        trial_outputs = trial_pool.imap(_trial_worker, trial_args)
+
+    # Non-dominated solutions of all trials (multi-objective DDS)
+    pareto_all = pareto.ParetoArchive(DDS_inp['num_objectives'],num_dec+1)
+    # Results returned in memory (trials restored from a checkpoint are None / nan)
+    results = {'trials':[None]*DDS_inp['num_trials'],'Sbest':Sbest_trials}
+    for key in ('F_Best','Best_iter','Runtime'):
+        results[key] = np.full(DDS_inp['num_trials'],np.nan)
+
+    for j, output in enumerate(trial_outputs,first_trial):
         
-    # store initial solution results
-    initial_sols = output['Master'][0:its,:]
+        # store initial solution results (compact recording keeps all initial solutions in Rows)
+        initial_sols = output['Rows'][0:its,:] if 'Rows' in output else output['Master'][0:its,:]
     
-    # store truncated outputs - Columns: 0 -> iter #; 1 -> Jbest; 2 -> Jtest
-    trunc_out = output['Master'][its:,0:3]
-    output_ALL = output['Master'][its:,:]
-
-    # accumlate only Jbest for each trial:
-    Jbest_trials[:,j]= output['Master'][:,1]
-    # accumulate only Sbest for each trial:
-    Sbest_trials[j,:] = output['Best_sol']
+        output_ALL = output['Master'][its:,:]
+
+        # accumlate only Jbest for each trial:
+        if Jbest_trials is not None:
+            Jbest_trials[:,j]= output['Master'][:,1]
+        # accumulate only Sbest for each trial:
+        Sbest_trials[j,:] = output['Best_sol']
     
-    if DDS_inp['out_print'] == 0:
-        # Write Master Output Matrix at every trial (i.e. - 'Ex1_trial_1.out'):
-        # ---------------------------------------------------------------------
-        master_file = DDS_inp['runname']+'_trial_' + str(j+1) +'.out'
-        np.savetxt(master_file,output['Master']) 
-
-        # Write Dec. Var. best solutions at every trial (i.e. - 'sbest_trial_1.out'):
-        # --------------------------------------------------------------------------
-        sbest_file = 'sbest'+ '_trial_' + str(j+1) +'.out'
-        np.savetxt(sbest_file,output['Best_sol']) 
-
-        # Write Initial Solution to 'Ex1_ini_1.out':
-        # ----------------------------------------
-        ini_file = DDS_inp['runname'] + '_ini_' + str(j+1) + '.out'
-        np.savetxt(ini_file,initial_sols) 
-
-        # Write Jbest compressed output file (i.e. - 'Jbest_trial_1.out'):
-        # ----------------------------------------------------------------
-        Jbest_file = 'Jbest_trial_' + str(j+1) + '.out'
-        np.savetxt(Jbest_file,Jbest_trials) 
+        if archive is not None:
+            # Binary output: Master rows are already in the archive (serial trials)
+            archive.add_trial(j, output)
+        elif DDS_inp['out_print'] == 0 and outpath is not None:
+            # Write Master Output Matrix at every trial (i.e. - 'Ex1_trial_1.out'):
+            # ---------------------------------------------------------------------
+            master_file = os.path.join(outpath,DDS_inp['runname']+'_trial_' + str(j+1) +'.out')
+            np.savetxt(master_file,output['Master']) 
+            if 'Rows' in output:
+                # rows with DVs kept by compact recording (i.e. - 'Ex1_rows_1.out'):
+                np.savetxt(os.path.join(outpath,DDS_inp['runname']+'_rows_' + str(j+1) +'.out'),output['Rows'])
+
+            # Write Dec. Var. best solutions at every trial (i.e. - 'sbest_trial_1.out'):
+            # --------------------------------------------------------------------------
+            sbest_file = os.path.join(outpath,'sbest'+ '_trial_' + str(j+1) +'.out')
+            np.savetxt(sbest_file,output['Best_sol']) 
+
+            # Write Initial Solution to 'Ex1_ini_1.out':
+            # ----------------------------------------
+            ini_file = os.path.join(outpath,DDS_inp['runname'] + '_ini_' + str(j+1) + '.out')
+            np.savetxt(ini_file,initial_sols) 
+
+            # Write Jbest compressed output file (i.e. - 'Jbest_trial_1.out'):
+            # ----------------------------------------------------------------
+            Jbest_file = os.path.join(outpath,'Jbest_trial_' + str(j+1) + '.out')
+            np.savetxt(Jbest_file,Jbest_trials) 
     
-    # Prepare matrix for average performance evaluation:
-    sum_output = sum_output + trunc_out 
+        if 'Pareto_F' in output:
+            # Pareto front of the trial (i.e. - 'Ex1_pareto_1.out'), collected for the front of all trials
+            if outpath is not None:
+                np.savetxt(os.path.join(outpath,DDS_inp['runname'] + '_pareto_' + str(j+1) + '.out'),np.column_stack((output['Pareto_iter'],output['Pareto_F'],output['Pareto_X'])),
+                           header='iter ' + ' '.join('f_%i'%(k+1) for k in range(DDS_inp['num_objectives'])) + ' ' + ' '.join(name.decode() for name in DV_bounds['S_name']))
+            for k in range(output['Pareto_F'].shape[0]):
+                pareto_all.add(np.r_[j+1,output['Pareto_X'][k]],DDS_inp['obj_flag']*output['Pareto_F'][k])
+
+        # Update statistics of Jbest and Jtest per iteration (truncated outputs - initial solutions excluded):
+        if stats is not None:
+            stats.add(output['Master'][its:,1],output['Master'][its:,2])
     
-    # Stop trial timer
-    t_1 = time.time() 
-    runtime = t_1 - t_0
+        runtime = output['Runtime']
+        keep = return_master and DDS_inp['out_print'] == 0
+        results['trials'][j] = output if keep else {key: value for key, value in output.items() if key not in ('Master','Rows')}
+        results['F_Best'][j] = output['F_Best']
+        results['Best_iter'][j] = output['Best_iter']
+        results['Runtime'][j] = runtime
     
-    # Output to console
-    print('Best objective function value of %f found at Iteration %i \n'%(output['F_Best'], output['Best_iter']))
-    print('Time of execution for Trial %i was %f seconds or %f hours. \n\n' %(j+1,runtime,runtime/3600))
-#============================================================================
-# 6.0   Post Processing
-
-# Generate average results from all trials
-Jbest_avg = np.divide(sum_output[:,1], DDS_inp['num_trials'])
-Jtest_avg = np.divide(sum_output[:,2], DDS_inp['num_trials'])
-MAT_avg[:,0] = range(DDS_inp['num_iters']-its)
-MAT_avg[:,1] = Jbest_avg
-MAT_avg[:,2] = Jtest_avg
-
-# Write averages to output file
-avg_file = DDS_inp['runname'] + '_trial_avgs' + '.out'
-np.savetxt( avg_file,MAT_avg)
-
-# Generate output directory
-outpath = os.path.join(script_dir,(DDS_inp['runname'] + '_Output'))
-if os.path.exists(outpath):         # If output directory exists - empty it
-    exis_files = glob.glob(os.path.join(outpath, "*.out"))
-    for f in exis_files:
-        os.remove(f)
-else:
-    os.makedirs(outpath)            # Else nonexistent - make new output directory 
-
-# Move output files to a new directory
-out_files = glob.iglob(os.path.join(script_dir, "*.out"))   #return an iterator of files with ext of *.out in script directory
-for file in out_files:
-    if os.path.isfile(file):
-        shutil.move(file, outpath)  # move to output file directory
-#============================================================================
\ No newline at end of file
+        # Output to console
+        if 'Pareto_F' in output:
+            say('Pareto front of %i solutions, last changed at Iteration %i \n'%(output['F_Best'], output['Best_iter']))
+        else:
+            say('Best objective function value of %f found at Iteration %i \n'%(output['F_Best'], output['Best_iter']))
+        if DDS_inp['pre_empt_flag'] > 0:
+            say('%i of %i model evaluations were pre-empted \n'%(np.sum(output['Master'][:,-1]), output['Master'].shape[0]))
+        for cut in output.get('Cuts',[]):
+            say('Trial cut at evaluation %i (%s, Jbest %f), restarted%s \n'%(cut[1],util.Portfolio.REASONS[cut[2]],cut[3],' from the best solution so far' if cut[4] == 3 else ''))
+        if 'Cache_hits' in output:
+            say('Evaluation cache: %i hits, %i misses \n'%(output['Cache_hits'], output['Cache_misses']))
+        say('Time of execution for Trial %i was %f seconds or %f hours. \n' %(j+1,runtime,runtime/3600))
+        if 'Slave_idle' in output:
+            say('Slave idle time: %f seconds per slave on average (%.1f%% of the trial), %f seconds at most \n'%(np.mean(output['Slave_idle']),100*np.mean(output['Slave_idle'])/runtime,np.max(output['Slave_idle'])))
+        if 'Profile' in output:
+            say(output['Profile'].summary(runtime) + '\n')
+        say('')
+        if metrics is not None:
+            metrics.write('trial_end',trial=j+1,evals=int(output['Master'].shape[0]),F_Best=float(output['F_Best']),
+                          Best_iter=int(output['Best_iter']),runtime=output['Runtime'],**({'slave_idle':output['Slave_idle'].tolist()} if 'Slave_idle' in output else {}),
+                          **({'cuts':[list(cut[1:4]) for cut in output['Cuts']]} if 'Cuts' in output else {}))
+
+        # Checkpoint completed trials
+        if checkpoint is not None:
+            checkpoint.run_state = {'num_done':j+1,'Jbest_trials':None if Jbest_trials is None else np.array(Jbest_trials[:,:j+1]),
+                                    'Sbest_trials':Sbest_trials[:j+1,:].copy(),'stats':stats,'rng':np.random.get_state()}
+            checkpoint.save_trial(None)
+    if DDS_inp['trial_procs'] > 1:
+        trial_pool.close()
+        trial_pool.join()
+    if cache is not None:
+        cache.save()
+    if metrics is not None:
+        metrics.write('run_end',num_trials=DDS_inp['num_trials'],**({} if stats is None else dict(F_Best_mean=float(stats.mean[-1]),F_Best_min=float(stats.min[-1]),F_Best_max=float(stats.max[-1]))))
+    #============================================================================
+    # 6.0   Post Processing
+
+    if stats is not None:
+        # Generate average results and statistics from all trials
+        MAT_avg = stats.averages()
+        MAT_stats = stats.table()
+        results.update(avgs=MAT_avg,stats=MAT_stats,stats_header=stats.header())
+
+        # Write averages and statistics to output files
+        if archive is not None:
+            archive.array('avgs')[:] = MAT_avg
+            archive.save_stats(MAT_stats,stats.header())
+        elif outpath is not None:
+            avg_file = os.path.join(outpath,DDS_inp['runname'] + '_trial_avgs' + '.out')
+            np.savetxt( avg_file,MAT_avg)
+            stats_file = os.path.join(outpath,DDS_inp['runname'] + '_trial_stats' + '.out')
+            np.savetxt( stats_file,MAT_stats,header=stats.header())
+    if portfolio is not None:
+        # record of the cut trials (i.e. - 'Ex1_portfolio.out')
+        results['Cuts'] = np.array(portfolio.cuts).reshape(-1,5)
+        if outpath is not None:
+            np.savetxt(os.path.join(outpath,DDS_inp['runname'] + '_portfolio.out'),results['Cuts'],fmt='%i %i %i %.17g %i',
+                       header='trial evaluation reason(1=stalled,2=behind) Jbest mode(2=random restart,3=leader restart)')
+        say('Portfolio mode: %i cuts in %i of %i trials \n'%(len(portfolio.cuts),len(set(cut[0] for cut in portfolio.cuts)),DDS_inp['num_trials']))
+
+    if DDS_inp['num_objectives'] > 1:
+        # Pareto front over all trials (i.e. - 'Ex1_pareto.out')
+        F, X, _ = pareto_all.front()
+        results.update(Pareto_F=DDS_inp['obj_flag']*F,Pareto_X=X[:,1:],Pareto_trial=X[:,0].astype(int))
+        if outpath is not None:
+            np.savetxt(os.path.join(outpath,DDS_inp['runname'] + '_pareto.out'),np.column_stack((X[:,0],DDS_inp['obj_flag']*F,X[:,1:])),
+                       header='trial ' + ' '.join('f_%i'%(k+1) for k in range(DDS_inp['num_objectives'])) + ' ' + ' '.join(name.decode() for name in DV_bounds['S_name']))
+        say('Pareto front of all trials: %i solutions \n'%F.shape[0])
+
+    if DDS_inp['warm_start'] != '0' and outpath is not None:
+        # evaluations used per trial over the chain of runs, read by a later warm start (i.e. - 'Ex1_warm_start.out')
+        np.savetxt(os.path.join(outpath,DDS_inp['runname'] + '_warm_start.out'),np.column_stack((np.arange(1,DDS_inp['num_trials']+1),np.array(pn_offsets) + DDS_inp['num_iters'])),
+                   fmt='%i',header='trial evaluations (all runs of the warm start chain)')
+
+    # Run completed - its checkpoint is no longer needed
+    if checkpoint is not None:
+        checkpoint.remove()
+    if objective is not None:
+        util.release_evaluators(objective)
+
+    return results
+    #============================================================================
+
+# Guard keeps the script from re-running when parallel slave processes are spawned
+if __name__ == '__main__':
+    #===============================================================================
+    # Read DDS Input Files ( 1- main control file, 2 - decision variable bounds)
+    # and run DDS with the output files in '<runname>_Output' next to this script
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    DDS_inp = util.read_DDS_inp('DDS_inp.txt')          # read 1
+
+    bounds_file = DDS_inp['objfunc_name'] + '.txt'
+    DV_bounds = util.read_param_file(bounds_file)       # read 2
+
+    run_dds(DDS_inp,DV_bounds,None,script_dir,os.path.join(script_dir,DDS_inp['runname'] + '_Output'))
@@ -0,0 +1,17 @@
+#==============================================================================
+# Converts the binary output archive of a DDS run (out_format = 1 in
+# DDS_inp.txt) to the text .out files written with out_format = 0.
+#
+# Usage: python archive2txt.py <runname>_Output/<runname>_archive [output folder]
+#        (the text files are written to the current folder by default)
+#==============================================================================
+import os
+import sys
+import toolkit as util
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit('Usage: python archive2txt.py <archive folder> [output folder]')
+    outdir = sys.argv[2] if len(sys.argv) > 2 else os.getcwd()
+    os.makedirs(outdir, exist_ok=True)
+    util.archive_to_text(os.path.abspath(sys.argv[1]), os.path.abspath(outdir))
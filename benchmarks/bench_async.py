@@ -0,0 +1,77 @@
+# =============================================================================
+# Benchmark of synchronous (DDS.DDS_MPI) against asynchronous (DDS.DDS_async)
+# parallel DDS for a model whose run time depends on its parameters: the
+# Griewank function with a run time between t_min and t_min*ratio seconds
+# (t = t_min*ratio**|sin(sum(x))|). The model is run as a Python objective
+# (process pool) and as an external model (one 'python model.py' process
+# per evaluation in the slave model directories). Reported per case: wall-
+# clock time, evaluations per second, mean slave idle time and F_best.
+# Usage: python benchmarks/bench_async.py [--num_evals 200] [--num_slaves 4]
+#        [--t_min 0.01] [--ratio 30] [--seeds 2] [--backends python external]
+# =============================================================================
+import os, sys, argparse, shutil, tempfile, time
+import numpy as np
+
+repo_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, repo_dir)
+import DDS
+
+MODULE = '''import time
+import numpy as np
+
+T_MIN = %r
+RATIO = %r
+
+def Hetero(x):
+    time.sleep(T_MIN*RATIO**abs(np.sin(np.sum(x))))
+    return 1 + np.sum(x**2)/4000 - np.prod(np.cos(x/np.sqrt(np.arange(1, x.shape[0] + 1))))
+
+if __name__ == '__main__':
+    np.savetxt('function_out.txt', [Hetero(np.loadtxt('variables_in.txt', ndmin=1))])
+'''
+
+
+def make_modeldir(settings):
+    # model directory plus one copy per slave (modeldir + '_' + k)
+    modeldir = os.path.join(tempfile.mkdtemp(prefix='dds_async_'), 'model')
+    os.makedirs(modeldir)
+    with open(os.path.join(modeldir, 'Hetero.py'), 'w') as f:
+        f.write(MODULE % (settings.t_min, settings.ratio))
+    shutil.copyfile(os.path.join(modeldir, 'Hetero.py'), os.path.join(modeldir, 'model.py'))
+    for k in range(1, settings.num_slaves + 1):
+        shutil.copytree(modeldir, modeldir + '_' + str(k))
+    return modeldir
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Synchronous against asynchronous parallel DDS')
+    parser.add_argument('--num_evals', type=int, default=200, help='function evaluations per run')
+    parser.add_argument('--num_slaves', type=int, default=4, help='processing slaves')
+    parser.add_argument('--t_min', type=float, default=0.01, help='shortest model run time in seconds')
+    parser.add_argument('--ratio', type=float, default=30, help='longest over shortest model run time')
+    parser.add_argument('--seeds', type=int, default=2, help='number of seeds (0, 1, ...) per case')
+    parser.add_argument('--backends', nargs='+', choices=['python', 'external'], default=['python', 'external'], help='objective types')
+    settings = parser.parse_args()
+    DV = np.empty(10, dtype={'names':('S_name','S_min','S_max','Discrete_flag'),'formats':('S3','f8','f8','i4')})
+    DV['S_name'], DV['S_min'], DV['S_max'], DV['Discrete_flag'] = b'x', -600, 600, 0
+    modeldir = make_modeldir(settings)
+    try:
+        print('%-10s %-7s %10s %10s %12s %12s' % ('objective', 'mode', 'time s', 'evals/s', 'idle %', 'F_best'))
+        for backend in settings.backends:
+            if backend == 'python':
+                objfunc_name, exe_name = 'Hetero', np.array([])
+            else:
+                objfunc_name, exe_name = 'ext_function', '"%s" model.py' % sys.executable
+            for mode, engine in (('sync', DDS.DDS_MPI), ('async', DDS.DDS_async)):
+                runtimes, idle, F_best = [], [], []
+                for seed in range(settings.seeds):
+                    np.random.seed(seed)
+                    t_0 = time.perf_counter()
+                    output = engine(objfunc_name, exe_name, modeldir, 1, DV, np.array([]), settings.num_slaves, settings.num_evals, settings.num_slaves)
+                    runtimes.append(time.perf_counter() - t_0)
+                    idle.append(100*np.mean(output['Slave_idle'])/runtimes[-1])
+                    F_best.append(output['F_Best'])
+                print('%-10s %-7s %10.2f %10.1f %12.1f %12.4g' % (backend, mode, np.median(runtimes), settings.num_evals/np.median(runtimes),
+                                                                 np.median(idle), np.median(F_best)))
+    finally:
+        shutil.rmtree(os.path.dirname(modeldir))
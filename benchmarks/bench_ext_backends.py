@@ -0,0 +1,52 @@
+# =============================================================================
+# Benchmark of the per-evaluation overhead of the external model backends
+# (toolkit.get_objfunc eval_backend 0, 1 and 2) using a trivial Python model
+# (sum of squares), so the measured time is almost entirely overhead.
+# Usage: python benchmarks/bench_ext_backends.py [num_evals] [num_dec]
+# =============================================================================
+import os, sys, shutil, tempfile, time
+import numpy as np
+
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, repo_dir)
+import toolkit as util
+
+MODEL = '''import sys
+import numpy as np
+sys.path.insert(0, %r)
+import toolkit
+
+def objective(x):
+    return float(np.sum(np.asarray(x)**2))
+
+if sys.argv[1:] == ['--line']:
+    toolkit.serve_model(objective)
+elif sys.argv[1:] == ['--binary']:
+    toolkit.serve_model(objective, binary=True)
+else:
+    np.savetxt('function_out.txt', [objective(np.loadtxt('variables_in.txt', ndmin=1))])
+'''
+
+if __name__ == '__main__':
+    num_evals = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    num_dec = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    modeldir = tempfile.mkdtemp(prefix='dds_model_')
+    try:
+        with open(os.path.join(modeldir, 'model.py'), 'w') as f:
+            f.write(MODEL % os.path.abspath(repo_dir))
+        python = '"%s" model.py' % sys.executable
+        X = np.random.random((num_evals, num_dec))
+        print('%-28s %14s %10s' % ('backend', 'ms/evaluation', 'evals/s'))
+        for eval_backend, name, exe_name in ((0, 'file (os.system per eval)', python),
+                                             (1, 'pipe, line protocol', python + ' --line'),
+                                             (2, 'pipe, binary protocol', python + ' --binary')):
+            # first call starts persistent models, so it is not timed
+            util.get_objfunc(X[0], modeldir, 'ext_function', exe_name, 0, eval_backend)
+            t_0 = time.perf_counter()
+            y = [util.get_objfunc(x, modeldir, 'ext_function', exe_name, 0, eval_backend) for x in X]
+            runtime = time.perf_counter() - t_0
+            assert np.allclose(y, np.sum(X**2, axis=1))
+            print('%-28s %14.3f %10.1f' % (name, 1000*runtime/num_evals, num_evals/runtime))
+        util.close_pipe_models()
+    finally:
+        shutil.rmtree(modeldir)
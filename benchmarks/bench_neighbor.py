@@ -0,0 +1,67 @@
+# =============================================================================
+# Benchmark of DDS neighbourhood generation: scalar path (perturb_type per
+# selected DV, as DDS_serial used to do) versus the array-at-a-time path
+# (DDS.neighbour -> neighbor.perturb_array), the latter also drawing from a
+# block-buffered util.RandomStream instead of np.random (rng_mode = 1).
+# Reports DDS iterations/second for neighbour generation only, over the full
+# Pn schedule of a run.
+# Usage: python benchmarks/bench_neighbor.py [num_iters] [dims ...]
+# =============================================================================
+import os, sys, time
+import math as m
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import DDS
+import neighbor as nval
+import toolkit as util
+
+
+def neighbour_scalar(sbest,DV,Pn):
+    # Reference scalar neighbour generation (pre-vectorisation DDS_serial loop)
+    num_dec = sbest.shape[0]
+    dvn_count = 0
+    stest = sbest.copy()
+    randnums = np.random.random(num_dec)
+    for j in range(num_dec):
+        if randnums[j] < Pn:
+            dvn_count = dvn_count + 1
+            stest[j] = nval.perturb_type(sbest[j], DV['S_min'][j], DV['S_max'][j], DV['Discrete_flag'][j])
+    if dvn_count == 0:
+        dec_var = int(m.floor(num_dec*np.random.random()))
+        stest[dec_var] = nval.perturb_type(sbest[dec_var], DV['S_min'][dec_var], DV['S_max'][dec_var], DV['Discrete_flag'][dec_var])
+    return stest
+
+
+def make_bounds(num_dec,discrete):
+    DV = np.empty(num_dec,dtype={'names':('S_name','S_min','S_max','Discrete_flag'),'formats':('S3','f8','f8','i4')})
+    DV['S_min'] = -500.0
+    DV['S_max'] = 700.0
+    DV['Discrete_flag'] = discrete
+    return DV
+
+
+def iters_per_sec(func,DV,num_iters):
+    sbest = DV['S_min'] + (DV['S_max'] - DV['S_min'])*np.random.random(DV.shape[0])
+    if DV['Discrete_flag'].all():
+        sbest = np.around(sbest)
+    t_0 = time.perf_counter()
+    for i in range(num_iters):
+        func(sbest,DV,1.0-m.log1p(i)/m.log(num_iters))
+    return num_iters/(time.perf_counter() - t_0)
+
+
+if __name__ == '__main__':
+    num_iters = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    dims = [int(d) for d in sys.argv[2:]] or [10, 100, 2000, 20000]
+    np.random.seed(9000)
+    rng = util.RandomStream(9000)
+    neighbour_stream = lambda sbest,DV,Pn: DDS.neighbour(sbest,DV,Pn,rng)
+    print('%8s %6s %14s %14s %9s %14s %9s' % ('num_dec', 'type', 'scalar it/s', 'array it/s', 'speed-up', 'stream it/s', 'speed-up'))
+    for num_dec in dims:
+        for discrete in (0, 1):
+            DV = make_bounds(num_dec, discrete)
+            scalar = iters_per_sec(neighbour_scalar, DV, num_iters)
+            vector = iters_per_sec(DDS.neighbour, DV, num_iters)
+            stream = iters_per_sec(neighbour_stream, DV, num_iters)
+            print('%8i %6s %14.1f %14.1f %8.1fx %14.1f %8.1fx' % (num_dec, 'int' if discrete else 'float', scalar, vector, vector/scalar, stream, stream/scalar))
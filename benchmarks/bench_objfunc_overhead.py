@@ -0,0 +1,63 @@
+# =============================================================================
+# Benchmark of the per-call overhead of objective function dispatch for a
+# Python objective: calling the function directly (imported here, without
+# toolkit), through a resolved toolkit.Evaluator (as DDS does) and through
+# toolkit.get_objfunc (evaluator looked up per call), for the script 
+# directory and for a model directory holding a user module 
+# '<objfunc_name>.py'. The overhead column is relative to the direct call.
+# Usage: python benchmarks/bench_objfunc_overhead.py [num_calls] [num_dec]
+# =============================================================================
+import os, sys, shutil, tempfile, time
+import importlib.util
+import numpy as np
+
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, repo_dir)
+import toolkit as util
+import fitness_func
+
+MODULE = '''import numpy as np
+
+def Sum_sq(x):
+    return float(np.dot(x, x))
+'''
+
+def load_function(path, objfunc_name):
+    # objective function of a module file, imported without toolkit
+    spec = importlib.util.spec_from_file_location('bench_' + objfunc_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, objfunc_name)
+
+def time_calls(f, x, num_calls, repeats=5):
+    # microseconds per call (best of repeats)
+    f(x)
+    best = np.inf
+    for _ in range(repeats):
+        t_0 = time.perf_counter()
+        for _ in range(num_calls):
+            f(x)
+        best = min(best, time.perf_counter() - t_0)
+    return 1e6*best/num_calls
+
+if __name__ == '__main__':
+    num_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    num_dec = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    script_dir = os.path.dirname(util.__file__)
+    modeldir = tempfile.mkdtemp(prefix='dds_model_')
+    try:
+        with open(os.path.join(modeldir, 'Sum_sq.py'), 'w') as f:
+            f.write(MODULE)
+        x = np.random.random(num_dec)
+        print('%-40s %12s %12s' % ('objective / dispatch', 'us/call', 'overhead us'))
+        for name, objfunc_name, directory, feval in (('fitness_func.Griewank', 'Griewank', script_dir, fitness_func.Griewank),
+                                                     ('modeldir module Sum_sq', 'Sum_sq', modeldir, load_function(os.path.join(modeldir, 'Sum_sq.py'), 'Sum_sq'))):
+            evaluator = util.Evaluator(directory, objfunc_name, np.array([]))
+            raw = time_calls(feval, x, num_calls)
+            print('%-40s %12.3f %12s' % (name + ', direct call', raw, '-'))
+            for dispatch, f in (('Evaluator', evaluator),
+                                ('get_objfunc', lambda x: util.get_objfunc(x, directory, objfunc_name, np.array([]), 0))):
+                t = time_calls(f, x, num_calls)
+                print('%-40s %12.3f %12.3f' % (name + ', ' + dispatch, t, t - raw))
+    finally:
+        shutil.rmtree(modeldir)
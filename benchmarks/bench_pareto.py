@@ -0,0 +1,54 @@
+# =============================================================================
+# Benchmark of the non-dominated archive of multi-objective DDS
+# (pareto.ParetoArchive) against a plain archive that compares every new
+# point with all members. Points are drawn near a linear (2 objectives) or
+# planar (3 objectives) front, so most of them enter the archive and it
+# grows to tens of thousands of members. Reported per case: microseconds
+# per update and the final archive size.
+# Usage: python benchmarks/bench_pareto.py [--num_points 10000] [--objectives 2 3]
+# =============================================================================
+import os, sys, argparse, time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import pareto
+
+
+class PlainArchive:
+    # reference: members in insertion order, every update scans all of them
+    def __init__(self, num_obj, num_dec):
+        self.F = np.empty((0, num_obj))
+        self.X = np.empty((0, num_dec))
+
+    def add(self, x, f, it=0):
+        if (self.F <= f).all(axis=1).any():
+            return False
+        keep = ~(self.F >= f).all(axis=1)
+        self.F = np.vstack((self.F[keep], f))
+        self.X = np.vstack((self.X[keep], x))
+        return True
+
+
+def points(num_obj, num_points, seed):
+    rng = np.random.RandomState(seed)
+    u = rng.random_sample((num_points, num_obj - 1))
+    F = np.column_stack((u, num_obj - 1 - u.sum(axis=1)))
+    return F + 1e-4*rng.random_sample(F.shape)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Non-dominated archive updates')
+    parser.add_argument('--num_points', type=int, default=10000, help='points offered to the archive')
+    parser.add_argument('--num_dec', type=int, default=30, help='decision variables per point')
+    parser.add_argument('--objectives', nargs='+', type=int, default=[2, 3], help='numbers of objectives')
+    settings = parser.parse_args()
+    x = np.zeros(settings.num_dec)
+    print('%10s %-16s %12s %12s' % ('objectives', 'archive', 'us/update', 'size'))
+    for num_obj in settings.objectives:
+        F = points(num_obj, settings.num_points, 0)
+        for name, archive in (('plain', PlainArchive(num_obj, settings.num_dec)), ('ParetoArchive', pareto.ParetoArchive(num_obj, settings.num_dec))):
+            t_0 = time.perf_counter()
+            for i in range(F.shape[0]):
+                archive.add(x, F[i], i)
+            size = archive.F.shape[0] if name == 'plain' else archive.n
+            print('%10i %-16s %12.1f %12i' % (num_obj, name, 1e6*(time.perf_counter() - t_0)/F.shape[0], size))
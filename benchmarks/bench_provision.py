@@ -0,0 +1,71 @@
+# =============================================================================
+# Benchmark of slave model directory provisioning (toolkit.generate_dir)
+# against full copies (shutil.copytree) for a model directory holding large
+# read-only inputs and a few small files the model writes. Reported per
+# case: seconds for the first set-up, for a second run reusing the slave
+# directories, and the disk space added (MB, linked files count as 0).
+# Usage: python benchmarks/bench_provision.py [--size_mb 500] [--num_files 20]
+#        [--num_slaves 8] [--workdir /dev/shm]
+# =============================================================================
+import os, sys, argparse, shutil, tempfile, time
+
+repo_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, repo_dir)
+import toolkit as util
+
+
+def make_model(root, settings):
+    # base model: num_files read-only inputs of size_mb in total, plus written files
+    modeldir = os.path.join(root, 'Model')
+    os.makedirs(os.path.join(modeldir, 'grids'))
+    block = os.urandom(1 << 20)
+    for n in range(settings.num_files):
+        with open(os.path.join(modeldir, 'grids', 'forcing_%i.bin' % n), 'wb') as f:
+            for _ in range(max(1, settings.size_mb//settings.num_files)):
+                f.write(block)
+    for name in ('params.txt', 'state.txt'):
+        with open(os.path.join(modeldir, name), 'w') as f:
+            f.write('0\n')
+    return modeldir
+
+
+def added_mb(dirs):
+    # disk space of the files in dirs that are not links to other files
+    total = 0
+    for d in dirs:
+        for root, _, names in os.walk(d):
+            for name in names:
+                st = os.lstat(os.path.join(root, name))
+                if not os.path.islink(os.path.join(root, name)) and st.st_nlink == 1:
+                    total += st.st_size
+    return total/2.0**20
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Slave model directory provisioning against full copies')
+    parser.add_argument('--size_mb', type=int, default=500, help='size of the read-only model inputs')
+    parser.add_argument('--num_files', type=int, default=20, help='number of read-only input files')
+    parser.add_argument('--num_slaves', type=int, default=8, help='number of slave model directories')
+    parser.add_argument('--workdir', help='directory for the slave directories (i.e. /dev/shm)')
+    settings = parser.parse_args()
+    root = tempfile.mkdtemp(prefix='dds_provision_')
+    try:
+        modeldir = make_model(root, settings)
+        print('%-16s %12s %12s %12s' % ('method', 'first s', 'reuse s', 'added MB'))
+        # full copies, as every run would need without reuse
+        t_0 = time.perf_counter()
+        for k in range(1, settings.num_slaves + 1):
+            shutil.copytree(modeldir, modeldir + '_copy_' + str(k))
+        first = time.perf_counter() - t_0
+        print('%-16s %12.3f %12.3f %12.1f' % ('copytree', first, first, added_mb([modeldir + '_copy_' + str(k) for k in range(1, settings.num_slaves + 1)])))
+        for k in range(1, settings.num_slaves + 1):
+            shutil.rmtree(modeldir + '_copy_' + str(k))
+        for method, writes in (('copy/reflink', []), ('link inputs', ['params.txt', 'state.txt'])):
+            first = util.generate_dir(settings.num_slaves, modeldir, writes, settings.workdir)
+            reuse = util.generate_dir(settings.num_slaves, modeldir, writes, settings.workdir)
+            slave_dirs = [first['modeldir'] + '_' + str(k) for k in range(1, settings.num_slaves + 1)]
+            print('%-16s %12.3f %12.3f %12.1f' % (method, first['seconds'], reuse['seconds'], added_mb(slave_dirs)))
+            for d in slave_dirs:
+                shutil.rmtree(d)
+    finally:
+        shutil.rmtree(root)
@@ -0,0 +1,171 @@
+# =============================================================================
+# Benchmark suite of DDS throughput and solution quality on the fitness_func
+# test functions. Sweeps test function, dimension, evaluation budget,
+# decision variable type (continuous / integer) and engine:
+#   serial   - DDS.DDS_serial, one candidate per objective call
+#   batch    - DDS.DDS_serial, batch_size candidates per objective call
+#   parallel - DDS.DDS_MPI with num_slaves slaves
+# and runs every case for a number of seeds. Reported per case:
+#   evals/s          - objective evaluations per second of wall-clock time
+#   overhead us/eval - optimizer time per evaluation, i.e. run time minus the
+#                      time the objective needs for the same candidates
+#                      (measured by re-evaluating them; for parallel runs
+#                      divided by the number of slaves)
+#   peak MB          - peak memory allocated by the (master) process during
+#                      one extra run of the case (tracemalloc)
+#   F_best           - final best objective of each seed, median and gap to
+#                      the known optimum (fitness_func.OPTIMA)
+# Results are written as JSON (with the commit, numpy and machine details),
+# and --compare lists the changes against the results of an earlier run.
+# Usage: python benchmarks/bench_suite.py [--full] [--out results.json] [--compare old.json]
+#        (see --help for the individual sweep settings)
+# =============================================================================
+import os, sys, argparse, json, platform, subprocess, time, tracemalloc
+import numpy as np
+
+repo_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, repo_dir)
+import DDS
+import fitness_func as of
+import toolkit as util
+
+QUICK = {'functions':['Griewank', 'Rastrigin'], 'dims':[10, 100, 1000], 'budgets':[1000], 'types':['continuous', 'integer'],
+         'engines':['serial', 'batch', 'parallel'], 'seeds':3}
+FULL = {'functions':['Griewank', 'Rastrigin', 'Rosenbrock', 'Ackley'], 'dims':[10, 100, 1000, 10000], 'budgets':[1000, 10000],
+        'types':['continuous', 'integer'], 'engines':['serial', 'batch', 'parallel'], 'seeds':5}
+
+
+def make_bounds(objfunc_name, num_dec, var_type):
+    # Decision variable bounds of a test function (integer bounds rounded inwards)
+    low, high = of.OPTIMA[objfunc_name][2]
+    DV = np.empty(num_dec, dtype={'names':('S_name','S_min','S_max','Discrete_flag'),'formats':('S3','f8','f8','i4')})
+    DV['S_name'] = b'x'
+    DV['S_min'] = low if var_type == 'continuous' else np.ceil(low)
+    DV['S_max'] = high if var_type == 'continuous' else np.floor(high)
+    DV['Discrete_flag'] = var_type == 'integer'
+    return DV
+
+
+def run_case(case, seed, settings):
+    # One DDS run; returns its output dict and wall-clock time
+    DV = make_bounds(case['function'], case['dim'], case['type'])
+    np.random.seed(seed)
+    t_0 = time.perf_counter()
+    if case['engine'] == 'parallel':
+        num_slaves = settings.num_slaves
+        output = DDS.DDS_MPI(case['function'], np.array([]), repo_dir, 1, DV, np.array([]), num_slaves, case['budget'], num_slaves)
+    else:
+        its = int(max(5, np.around(0.005*case['budget'])))
+        batch_size = settings.batch_size if case['engine'] == 'batch' else 1
+        output = DDS.DDS_serial(case['function'], np.array([]), repo_dir, 1, DV, np.array([]), its, case['budget'], batch_size)
+    return output, time.perf_counter() - t_0
+
+
+def objective_time(case, master, settings):
+    # Time the objective needs for the candidates of a run (same calling convention as the engine)
+    evaluator = util.get_evaluator(repo_dir, case['function'], np.array([]))
+    X = np.ascontiguousarray(master[:, 3:])
+    t_0 = time.perf_counter()
+    if case['engine'] == 'batch':
+        for i in range(0, X.shape[0], settings.batch_size):
+            evaluator.batch(X[i:i + settings.batch_size])
+    else:
+        for x in X:
+            evaluator(x)
+    runtime = time.perf_counter() - t_0
+    return runtime/settings.num_slaves if case['engine'] == 'parallel' else runtime
+
+
+def bench_case(case, settings):
+    F_best, evals_per_s, overhead = [], [], []
+    for seed in range(settings.seeds):
+        output, runtime = run_case(case, seed, settings)
+        evals = output['Master'].shape[0]
+        F_best.append(float(output['F_Best']))
+        evals_per_s.append(evals/runtime)
+        overhead.append(1e6*(runtime - objective_time(case, output['Master'], settings))/evals)
+    result = dict(case, evals_per_s=float(np.median(evals_per_s)), overhead_us_per_eval=float(np.median(overhead)),
+                  F_best=F_best, F_best_median=float(np.median(F_best)),
+                  F_best_gap=float(np.median(F_best) - of.OPTIMA[case['function']][0](case['dim'])))
+    if settings.memory:
+        tracemalloc.start()
+        run_case(case, 0, settings)
+        result['peak_MB'] = tracemalloc.get_traced_memory()[1]/2**20
+        tracemalloc.stop()
+    return result
+
+
+def run_info():
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=repo_dir, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit':commit, 'date':time.strftime('%Y-%m-%d %H:%M:%S'), 'python':platform.python_version(), 'numpy':np.__version__,
+            'machine':platform.platform(), 'processor':platform.processor(), 'cpu_count':os.cpu_count()}
+
+
+def compare(results, old_file, tolerance):
+    # Lists evals/s, overhead and quality changes of the cases also found in old_file
+    with open(old_file) as f:
+        old = {_case_key(r):r for r in json.load(f)['results']}
+    print('\nComparison with %s (changes beyond %g%% marked *)' % (old_file, 100*tolerance))
+    print('%-48s %14s %14s %14s' % ('case', 'evals/s', 'overhead', 'F_best median'))
+    regressions = 0
+    for r in results:
+        o = old.get(_case_key(r))
+        if o is None:
+            continue
+        speed = r['evals_per_s']/o['evals_per_s'] - 1
+        cost = r['overhead_us_per_eval']/o['overhead_us_per_eval'] - 1 if o['overhead_us_per_eval'] > 0 else 0.0
+        quality = r['F_best_median'] - o['F_best_median']
+        flag = speed < -tolerance or cost > tolerance
+        regressions += flag
+        print('%-48s %+13.1f%%%s %+13.1f%%%s %14.4g' % (' '.join(str(k) for k in _case_key(r)), 100*speed, '*' if speed < -tolerance else ' ',
+                                                      100*cost, '*' if cost > tolerance else ' ', quality))
+    print('%i case(s) slower than tolerance' % regressions)
+
+
+def _case_key(r):
+    return (r['function'], r['engine'], r['type'], r['dim'], r['budget'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DDS throughput and solution quality benchmark suite')
+    parser.add_argument('--full', action='store_true', help='full sweep (dimensions up to 10000, budgets up to 10000)')
+    parser.add_argument('--functions', nargs='+', help='fitness_func test functions')
+    parser.add_argument('--dims', nargs='+', type=int, help='numbers of decision variables')
+    parser.add_argument('--budgets', nargs='+', type=int, help='numbers of function evaluations')
+    parser.add_argument('--types', nargs='+', choices=['continuous', 'integer'], help='decision variable types')
+    parser.add_argument('--engines', nargs='+', choices=['serial', 'batch', 'parallel'], help='DDS engines')
+    parser.add_argument('--seeds', type=int, help='number of seeds (0, 1, ...) per case')
+    parser.add_argument('--batch_size', type=int, default=8, help='candidates per objective call of the batch engine')
+    parser.add_argument('--num_slaves', type=int, default=2, help='slaves of the parallel engine')
+    parser.add_argument('--no_memory', dest='memory', action='store_false', help='skip the peak memory run of each case')
+    parser.add_argument('--out', default='bench_results.json', help='JSON results file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='relative change reported as a regression')
+    settings = parser.parse_args()
+    sweep = dict(FULL if settings.full else QUICK)
+    for key in sweep:
+        if getattr(settings, key) is not None:
+            sweep[key] = getattr(settings, key)
+    settings.seeds = sweep['seeds']
+
+    results = []
+    print('%-16s %-9s %-10s %6s %7s %12s %12s %9s %14s' % ('function', 'engine', 'type', 'dim', 'budget', 'evals/s', 'us/eval', 'peak MB', 'F_best median'))
+    for objfunc_name in sweep['functions']:
+        for engine in sweep['engines']:
+            for var_type in sweep['types']:
+                for num_dec in sweep['dims']:
+                    for budget in sweep['budgets']:
+                        case = {'function':objfunc_name, 'engine':engine, 'type':var_type, 'dim':num_dec, 'budget':budget}
+                        r = bench_case(case, settings)
+                        results.append(r)
+                        print('%-16s %-9s %-10s %6i %7i %12.1f %12.2f %9s %14.6g' % (objfunc_name, engine, var_type, num_dec, budget, r['evals_per_s'],
+                              r['overhead_us_per_eval'], '%.1f' % r['peak_MB'] if settings.memory else '-', r['F_best_median']))
+
+    with open(settings.out, 'w') as f:
+        json.dump({'info':run_info(), 'settings':dict(vars(settings), **sweep), 'results':results}, f, indent=1)
+    print('Results written to %s' % settings.out)
+    if settings.compare:
+        compare(results, settings.compare, settings.tolerance)
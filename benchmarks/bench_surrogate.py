@@ -0,0 +1,67 @@
+# =============================================================================
+# Benchmark of surrogate screening (DDS.DDS_serial with a surrogate.RBF)
+# against plain DDS on the fitness_func test functions. For every function
+# and dimension both variants run for a number of seeds; the target is the
+# median final F_best of plain DDS (or --target_gap above the known optimum).
+# Reported per case:
+#   evals to target  - median number of evaluations until Jbest reaches the
+#                      target (runs that never reach it count as budget + 1)
+#   reached          - runs that reached the target
+#   F_best median    - median final best objective
+#   ms/eval          - run time per evaluation, i.e. the screening cost for
+#                      cheap test functions
+# Usage: python benchmarks/bench_surrogate.py [--functions Griewank Ackley]
+#        [--dims 10 30] [--budget 500] [--seeds 5] [--num_candidates 500]
+# =============================================================================
+import os, sys, argparse, time
+import numpy as np
+
+repo_dir = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+sys.path.insert(0, repo_dir)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import DDS
+import fitness_func as of
+import surrogate as surr
+from bench_suite import make_bounds
+
+
+def run(objfunc_name, DV, budget, seed, num_candidates):
+    # One DDS run; returns its Jbest per evaluation and run time
+    np.random.seed(seed)
+    its = int(max(5, np.around(0.005*budget)))
+    surrogate = surr.RBF(DV['S_min'], DV['S_max']) if num_candidates > 0 else None
+    t_0 = time.perf_counter()
+    output = DDS.DDS_serial(objfunc_name, np.array([]), repo_dir, 1, DV, np.array([]), its, budget, surrogate=surrogate, num_candidates=num_candidates)
+    return output['Master'][:, 1], time.perf_counter() - t_0
+
+
+def evals_to_target(Jbest, target):
+    reached = np.flatnonzero(Jbest <= target)
+    return reached[0] + 1 if reached.shape[0] > 0 else Jbest.shape[0] + 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Surrogate screening against plain DDS')
+    parser.add_argument('--functions', nargs='+', default=['Griewank', 'Rastrigin', 'Rosenbrock', 'Ackley'], help='fitness_func test functions')
+    parser.add_argument('--dims', nargs='+', type=int, default=[10, 30], help='numbers of decision variables')
+    parser.add_argument('--budget', type=int, default=500, help='function evaluations per run')
+    parser.add_argument('--seeds', type=int, default=5, help='number of seeds (0, 1, ...) per case')
+    parser.add_argument('--num_candidates', type=int, default=500, help='neighbours screened per evaluation')
+    parser.add_argument('--target_gap', type=float, help='target = optimum + target_gap instead of the plain DDS median')
+    settings = parser.parse_args()
+    print('%-12s %5s %-10s %16s %8s %14s %9s' % ('function', 'dim', 'variant', 'evals to target', 'reached', 'F_best median', 'ms/eval'))
+    for objfunc_name in settings.functions:
+        for num_dec in settings.dims:
+            DV = make_bounds(objfunc_name, num_dec, 'continuous')
+            runs = {}
+            for variant, num_candidates in (('plain', 0), ('surrogate', settings.num_candidates)):
+                runs[variant] = [run(objfunc_name, DV, settings.budget, seed, num_candidates) for seed in range(settings.seeds)]
+            if settings.target_gap is not None:
+                target = of.OPTIMA[objfunc_name][0](num_dec) + settings.target_gap
+            else:
+                target = np.median([Jbest[-1] for Jbest, _ in runs['plain']])
+            for variant in runs:
+                evals = [evals_to_target(Jbest, target) for Jbest, _ in runs[variant]]
+                print('%-12s %5i %-10s %16i %8s %14.6g %9.3f' % (objfunc_name, num_dec, variant, np.median(evals),
+                      '%i/%i' % (sum(e <= settings.budget for e in evals), settings.seeds), np.median([Jbest[-1] for Jbest, _ in runs[variant]]),
+                      1e3*np.median([runtime for _, runtime in runs[variant]])/settings.budget))
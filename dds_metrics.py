@@ -0,0 +1,100 @@
+#==============================================================================
+# Reads the live metrics stream of a DDS run (metrics_secs > 0 in DDS_inp.txt,
+# '<runname>_metrics.ndjson', see toolkit.MetricsStream).
+#
+# Usage: python dds_metrics.py <runname>_metrics.ndjson            (summary)
+#        python dds_metrics.py <runname>_metrics.ndjson --follow   (tail the stream)
+#==============================================================================
+import argparse
+import json
+import time
+
+
+def read_records(f):
+    # Complete records from the current position of f (a partly written last line is left for later)
+    records = []
+    while True:
+        pos = f.tell()
+        line = f.readline()
+        if not line.endswith('\n'):
+            f.seek(pos)
+            return records
+        if line.strip():
+            records.append(json.loads(line))
+
+
+def format_record(r):
+    stamp = time.strftime('%H:%M:%S', time.localtime(r['time']))
+    if r['event'] == 'progress':
+        line = '%s trial %i: %i/%i evals, %.1f evals/s, ETA %s, Jbest %.6g (iter %i)' % (stamp, r['trial'], r['evals'], r['max_evals'],
+               r['evals_per_s'], format_secs(r['eta_s']), r['Jbest'], r['best_iter'])
+        if 'slave_utilisation' in r:
+            line += ', slaves busy ' + ' '.join('%.0f%%' % (100*u) for u in r['slave_utilisation'])
+        return line
+    if r['event'] == 'trial_end':
+        return '%s trial %i finished: F_Best %.6g at iter %i, %s' % (stamp, r['trial'], r['F_Best'], r['Best_iter'], format_secs(r['runtime']))
+    if r['event'] == 'trial_start':
+        return '%s trial %i started%s' % (stamp, r['trial'], ' (resumed at eval %i)' % r['evals'] if r['evals'] > 0 else '')
+    if r['event'] == 'run_start':
+        return '%s run %s started: %s, %i trials x %i evals, %i DVs' % (stamp, r['runname'], r['objfunc_name'], r['num_trials'], r['num_iters'], r['num_dec'])
+    if r['event'] == 'run_end':
+        if 'F_Best_mean' not in r:
+            # multi-objective run: no F_Best statistics
+            return '%s run finished: %i trials' % (stamp, r['num_trials'])
+        return '%s run finished: F_Best mean %.6g, min %.6g, max %.6g' % (stamp, r['F_Best_mean'], r['F_Best_min'], r['F_Best_max'])
+    return '%s %s' % (stamp, json.dumps(r))
+
+
+def format_secs(secs):
+    if secs is None:
+        return '-'
+    return '%i:%02i:%02i' % (secs//3600, secs % 3600//60, secs % 60)
+
+
+def summary(records):
+    # Latest state of every trial and an estimate of the remaining run time
+    run = None
+    trials = {}
+    for r in records:
+        if r['event'] == 'run_start':
+            run = r
+            trials = {}
+        elif 'trial' in r:
+            trials.setdefault(r['trial'], {}).update(r, status='done' if r['event'] == 'trial_end' else 'running')
+    if run is not None:
+        print(format_record(run))
+    print('%6s %8s %17s %12s %12s %10s %10s' % ('trial', 'status', 'evals', 'Jbest', 'best iter', 'evals/s', 'ETA'))
+    for trial in sorted(trials):
+        t = trials[trial]
+        done = t['status'] == 'done'
+        print('%6i %8s %17s %12.6g %12s %10s %10s' % (trial, t['status'], '%i/%i' % (t.get('evals', 0), t.get('max_evals', t.get('evals', 0))),
+              t['F_Best'] if done else t.get('Jbest', float('nan')), t['Best_iter'] if done else t.get('best_iter', '-'),
+              '-' if done else '%.1f' % t.get('evals_per_s', 0), '-' if done else format_secs(t.get('eta_s'))))
+    if run is not None:
+        finished = [t for t in trials.values() if t['status'] == 'done']
+        print('%i of %i trials finished' % (len(finished), run['num_trials']))
+        if finished and len(finished) < run['num_trials'] and records[-1]['event'] != 'run_end':
+            # remaining trials at the mean trial run time so far
+            mean_runtime = sum(t['runtime'] for t in finished)/len(finished)
+            print('Estimated time to finish the run: %s (trials one after another)' % format_secs(mean_runtime*(run['num_trials'] - len(finished))))
+    if records and records[-1]['event'] == 'run_end':
+        print(format_record(records[-1]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Summary or live view of a DDS metrics stream')
+    parser.add_argument('filename', help='metrics stream, i.e. Gr10_metrics.ndjson')
+    parser.add_argument('--follow', action='store_true', help='print records as they arrive until the run ends')
+    parser.add_argument('--poll', type=float, default=1.0, help='seconds between checks for new records with --follow')
+    args = parser.parse_args()
+    with open(args.filename) as f:
+        if not args.follow:
+            summary(read_records(f))
+        else:
+            while True:
+                records = read_records(f)
+                for r in records:
+                    print(format_record(r), flush=True)
+                if records and records[-1]['event'] == 'run_end':
+                    break
+                time.sleep(args.poll)
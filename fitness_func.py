@@ -2,55 +2,184 @@
 # =========================================================================================================================
 # This module contains a catalogue of generalised D- dimensional well-known, cited optimisation benchmark fitness functions
 # to evaluate the optimizer algorithm performance.
+# All functions are vectorized: the input is either one vector of Decision Variable values (returns a float) or a matrix
+# with one candidate per row, shape (n_candidates, n_dims) (returns an array of n_candidates values).
+# Known optima are listed in the OPTIMA table at the bottom of this module.
 # =========================================================================================================================
+import functools
 import math
+import numpy as np
 
 
-def Rastrigin(param_space):
+def vectorized(func):
+	# =====================================================================================================================
+	# Decorator: func is written for a 2-D matrix (one candidate per row). The wrapper also accepts a single vector and
+	# then returns a scalar. Flags the function as vectorized so toolkit.get_objfunc_batch passes whole matrices.
+	# =====================================================================================================================
+	@functools.wraps(func)
+	def wrapper(param_space):
+		X = np.asarray(param_space, dtype=float)
+		fitness = func(np.atleast_2d(X))
+		if X.ndim == 1:
+			return float(fitness[0])
+		return fitness
+	wrapper.vectorized = True
+	return wrapper
+
+
+@vectorized
+def Rastrigin(X):
 	# =====================================================================================================================
 	# The Rastrigin function is a multimodal, non-convex function used as a performance test problem for optimisation 
 	# algorithms. 
 	# It was first proposed by Rastrigin as a 2-dimensional function and has been generalized by Muhlenbein et al.
-	# INPUT: param_space = vector of current Decision Variable values; TYPE = list
+	# This is the DDS-Py form without the 10*(D + cos) scaling: sum(x^2 - cos(2*pi*x)), minimum -D at x = 0
+	# INPUT: X = vector or matrix of current Decision Variable values; TYPE = numpy array
 	# =====================================================================================================================
-	fitness = 0
-	for x in param_space:
-		fitness += float(x**2) - (math.cos(2*math.pi*float(x)))
-
-	return fitness
+	return np.sum(X**2 - np.cos(2*math.pi*X), axis=1)
 
-def Griewank(x):
+@vectorized
+def Griewank(X):
 	# =====================================================================================================================
 	# The Griewank function [1981] is a non-linear multimodal function widely used to test the convergence of optimisation 
-	# functions
-	# INPUT: param_space = vector of current Decision Variable values; TYPE = list
+	# functions. Minimum 0 at x = 0
+	# INPUT: X = vector or matrix of current Decision Variable values; TYPE = numpy array
 	# =====================================================================================================================
-	dimens=len(x)
-	term1 = 0
-	term2 = 1
+	term1 = np.sum(X**2, axis=1)
+	term2 = np.prod(np.cos(X/np.sqrt(np.arange(1, X.shape[1] + 1))), axis=1)
 	term3 = 1
-	for i in range(dimens):
-	   term1 += x[i]**2
-    	   term2 *= math.cos(x[i]/math.sqrt(i+1))
+	return term1/4000.0 - term2 + term3
 
-	fitness = (float(term1)/4000.0)- float(term2) + term3
-	return fitness
-
-def Ackley(param_space):
+@vectorized
+def Ackley(X):
 	# =====================================================================================================================
 	# The Ackley function [1987] is a non-linear multimodal function widely used to test the convergence of optimisation 
-	# functions
-	# INPUT: param_space = vector of current Decision Variable values; TYPE = list
+	# functions. This is the DDS-Py form without the 20 + e offset: minimum -20 - e at x = 0
+	# INPUT: X = vector or matrix of current Decision Variable values; TYPE = numpy array
+	# =====================================================================================================================
+	dimens = X.shape[1]
+	sum1 = np.sum(X**2, axis=1)
+	sum2 = np.sum(np.cos(2*math.pi*X), axis=1)
+	return -20*np.exp(-0.2*np.sqrt(sum1/float(dimens))) - np.exp(sum2/dimens)
+
+@vectorized
+def Sphere(X):
+	# =====================================================================================================================
+	# The Sphere (De Jong F1) function is a continuous, convex, unimodal function. Minimum 0 at x = 0
+	# INPUT: X = vector or matrix of current Decision Variable values; TYPE = numpy array
+	# =====================================================================================================================
+	return np.sum(X**2, axis=1)
+
+@vectorized
+def Sum_Squares(X):
+	# =====================================================================================================================
+	# The Sum Squares (axis parallel hyper-ellipsoid) function is a convex, unimodal, badly scaled function. 
+	# Minimum 0 at x = 0
+	# INPUT: X = vector or matrix of current Decision Variable values; TYPE = numpy array
 	# =====================================================================================================================
-	dimens = len(param_space)
+	return np.sum(np.arange(1, X.shape[1] + 1)*X**2, axis=1)
 
-	sum1 = 0
-	sum2 = 0
+@vectorized
+def Rosenbrock(X):
+	# =====================================================================================================================
+	# The Rosenbrock function [1960] is a non-convex, unimodal valley-shaped function (multimodal for D > 3). 
+	# Minimum 0 at x = 1
+	# INPUT: X = vector or matrix of current Decision Variable values; TYPE = numpy array
+	# =====================================================================================================================
+	return np.sum(100.0*(X[:, 1:] - X[:, :-1]**2)**2 + (X[:, :-1] - 1)**2, axis=1)
 
-	for x in param_space:
-		sum1 += x**2
-		sum2 += math.cos(2*math.pi*float(x))
-	fitness = -20*math.exp(-0.2*math.sqrt(sum1/float(dimens)))-math.exp(sum2/dimens)
-	return fitness
+@vectorized
+def Schwefel(X):
+	# =====================================================================================================================
+	# The Schwefel function [1981] is a multimodal function whose global minimum is far from the next best local minima.
+	# Minimum 0 at x = 420.9687 (bounds -500 to 500)
+	# INPUT: X = vector or matrix of current Decision Variable values; TYPE = numpy array
+	# =====================================================================================================================
+	return 418.9828872724339*X.shape[1] - np.sum(X*np.sin(np.sqrt(np.abs(X))), axis=1)
 
+@vectorized
+def Levy(X):
+	# =====================================================================================================================
+	# The Levy function is a multimodal function with a large number of local minima. Minimum 0 at x = 1
+	# INPUT: X = vector or matrix of current Decision Variable values; TYPE = numpy array
+	# =====================================================================================================================
+	W = 1 + (X - 1)/4.0
+	term1 = np.sin(math.pi*W[:, 0])**2
+	term2 = np.sum((W[:, :-1] - 1)**2*(1 + 10*np.sin(math.pi*W[:, :-1] + 1)**2), axis=1)
+	term3 = (W[:, -1] - 1)**2*(1 + np.sin(2*math.pi*W[:, -1])**2)
+	return term1 + term2 + term3
 
+@vectorized
+def Zakharov(X):
+	# =====================================================================================================================
+	# The Zakharov function is a plate-shaped unimodal function with no local minima except the global one.
+	# Minimum 0 at x = 0
+	# INPUT: X = vector or matrix of current Decision Variable values; TYPE = numpy array
+	# =====================================================================================================================
+	term1 = np.sum(X**2, axis=1)
+	term2 = np.sum(0.5*np.arange(1, X.shape[1] + 1)*X, axis=1)
+	return term1 + term2**2 + term2**4
+
+@vectorized
+def Styblinski_Tang(X):
+	# =====================================================================================================================
+	# The Styblinski-Tang function is a multimodal function with 2^D local minima. 
+	# Minimum -39.16616570377142*D at x = -2.903534 (bounds -5 to 5)
+	# INPUT: X = vector or matrix of current Decision Variable values; TYPE = numpy array
+	# =====================================================================================================================
+	return 0.5*np.sum(X**4 - 16*X**2 + 5*X, axis=1)
+
+@vectorized
+def Dixon_Price(X):
+	# =====================================================================================================================
+	# The Dixon-Price function is a valley-shaped unimodal function. 
+	# Minimum 0 at x_i = 2^(-(2^i - 2)/2^i), i = 1..D
+	# INPUT: X = vector or matrix of current Decision Variable values; TYPE = numpy array
+	# =====================================================================================================================
+	i = np.arange(2, X.shape[1] + 1)
+	return (X[:, 0] - 1)**2 + np.sum(i*(2*X[:, 1:]**2 - X[:, :-1])**2, axis=1)
+
+
+# =========================================================================================================================
+# Multi-objective test functions (num_objectives > 1 in DDS_inp.txt): the input is one vector of Decision Variable values,
+# the output an array with one value per objective (all minimised).
+# =========================================================================================================================
+def ZDT1(X):
+	# =====================================================================================================================
+	# The ZDT1 function has 2 objectives and a convex Pareto front f_2 = 1 - sqrt(f_1), 0 <= f_1 <= 1, at x_1 in [0, 1] 
+	# and x_i = 0 for i > 1 (bounds 0 to 1)
+	# INPUT: X = vector of current Decision Variable values; TYPE = numpy array
+	# =====================================================================================================================
+	X = np.asarray(X, dtype=float)
+	g = 1 + 9*np.sum(X[1:])/(X.shape[0] - 1)
+	return np.array([X[0], g*(1 - np.sqrt(X[0]/g))])
+
+def DTLZ2(X):
+	# =====================================================================================================================
+	# The DTLZ2 function with 3 objectives has a spherical Pareto front (f_1^2 + f_2^2 + f_3^2 = 1, all f_i >= 0) at 
+	# x_i = 0.5 for i > 2 (bounds 0 to 1)
+	# INPUT: X = vector of current Decision Variable values; TYPE = numpy array
+	# =====================================================================================================================
+	X = np.asarray(X, dtype=float)
+	g = np.sum((X[2:] - 0.5)**2)
+	a, b = 0.5*np.pi*X[0], 0.5*np.pi*X[1]
+	return (1 + g)*np.array([np.cos(a)*np.cos(b), np.cos(a)*np.sin(b), np.sin(a)])
+
+
+# =========================================================================================================================
+# Known optima of the benchmark functions: name -> (function of D returning the minimum value, function of D returning 
+# the minimiser, typical symmetric search bounds)
+# =========================================================================================================================
+OPTIMA = {
+	'Rastrigin':       (lambda D: -float(D),                  lambda D: np.zeros(D),                   (-5.12, 5.12)),
+	'Griewank':        (lambda D: 0.0,                        lambda D: np.zeros(D),                   (-600.0, 600.0)),
+	'Ackley':          (lambda D: -20.0 - math.e,             lambda D: np.zeros(D),                   (-32.768, 32.768)),
+	'Sphere':          (lambda D: 0.0,                        lambda D: np.zeros(D),                   (-5.12, 5.12)),
+	'Sum_Squares':     (lambda D: 0.0,                        lambda D: np.zeros(D),                   (-10.0, 10.0)),
+	'Rosenbrock':      (lambda D: 0.0,                        lambda D: np.ones(D),                    (-5.0, 10.0)),
+	'Schwefel':        (lambda D: 0.0,                        lambda D: np.full(D, 420.9687463),       (-500.0, 500.0)),
+	'Levy':            (lambda D: 0.0,                        lambda D: np.ones(D),                    (-10.0, 10.0)),
+	'Zakharov':        (lambda D: 0.0,                        lambda D: np.zeros(D),                   (-5.0, 10.0)),
+	'Styblinski_Tang': (lambda D: -39.16616570377142*D,       lambda D: np.full(D, -2.903534027771178),(-5.0, 5.0)),
+	'Dixon_Price':     (lambda D: 0.0,                        lambda D: 2.0**(-(2.0**np.arange(1, D + 1) - 2)/2.0**np.arange(1, D + 1)), (-10.0, 10.0)),
+}
@@ -2,21 +2,23 @@
 # Functions to perturb neighborhoud of decision variables to generate 
 # new candidate solutions. Perturbation magnitudes are randomly sampled 
 # from the standard normal distribution (mean = zero) 
+# All functions draw their random numbers from rng: the np.random module 
+# (default) or a toolkit.RandomStream (rng_mode = 1 in DDS_inp.txt)
 # ======================================================================
 import numpy as np
 import math as m
 
-def perturb_type(s,s_min,s_max,discrete_flag):
+def perturb_type(s,s_min,s_max,discrete_flag,rng=np.random):
     
     if discrete_flag == 0:
         # perturb continuous variable
-        s_new = perturb_cont(s,s_min,s_max)
+        s_new = perturb_cont(s,s_min,s_max,rng)
     else:
         # perturb discrete variable
-        s_new = perturb_disc(s,s_min,s_max)
+        s_new = perturb_disc(s,s_min,s_max,rng)
     return s_new
 
-def perturb_cont(s,s_min,s_max):
+def perturb_cont(s,s_min,s_max,rng=np.random):
         
         # Define parameter range
         s_range = s_max - s_min
@@ -24,7 +26,7 @@ def perturb_cont(s,s_min,s_max):
         # NOTE: this value is proven to be robust. **DO NOT CHANGE**
         r = 0.2
         # Perturb variable
-        z_value = stand_norm() 
+        z_value = stand_norm(rng) 
         delta = s_range*r*z_value 
         #delta = s_range*r*np.random.randn(1)
         s_new = s + delta
@@ -33,33 +35,33 @@ def perturb_cont(s,s_min,s_max):
         # Reflect and absorb decision variable at bounds
         
         # probability of absorbing or reflecting at boundary
-        P_Abs_or_Ref = np.random.random()
+        P_Abs_or_Ref = rng.random()
         
         # Case 1) New variable is below lower bound
         if s_new < s_min: # works for any pos or neg s_min
             if P_Abs_or_Ref <= 0.5: # with 50% chance reflect
                 s_new = s_min + (s_min - s_new) 
             else: # with 50% chance absorb
-                np.copy(s_new,s_min)           
+                s_new = s_min           
             # if reflection goes past s_max then value should be s_min since without reflection
             # the approach goes way past lower bound.  This keeps X close to lower bound when X current
             # is close to lower bound:
             if s_new > s_max:
-                np.copy(s_new,s_min) 
+                s_new = s_min 
 
         # Case 2) New variable is above upper bound
         elif s_new > s_max:  #works for any pos or neg s_max
             if P_Abs_or_Ref <= 0.5:  #with 50% chance reflect
                 s_new = s_max - (s_new - s_max) 
             else:  # with 50% chance absorb
-                np.copy(s_new,s_max)
+                s_new = s_max
             # if reflection goes past s_min then value should be s_max for same reasons as above
             if s_new < s_min:
-                np.copy(s_new,s_max)
+                s_new = s_max
 
         return s_new
 
-def perturb_disc(s,s_min,s_max):
+def perturb_disc(s,s_min,s_max,rng=np.random):
     # ==================================================== 
     # Function for discrete decision variable perturbation
     # ====================================================        
@@ -69,7 +71,7 @@ def perturb_disc(s,s_min,s_max):
     # NOTE: this value is proven to be robust. **DO NOT CHANGE**
     r = 0.2;
     # Perturb variable
-    z_value = stand_norm 
+    z_value = stand_norm(rng) 
     delta = s_range*r*z_value
     s_new = s + delta
     
@@ -77,7 +79,7 @@ def perturb_disc(s,s_min,s_max):
     # Reflect and absorb decision variable at bounds
     
     # probability of absorbing or reflecting at boundary
-    P_Abs_or_Ref = np.random.rand(1)
+    P_Abs_or_Ref = rng.random()
     
     # Case 1) New variable is below lower bound
     if s_new < s_min - 0.5: # works for any pos or neg s_min
@@ -105,9 +107,9 @@ def perturb_disc(s,s_min,s_max):
     s_new = np.around(s_new)
     
     # Handle case where new value is the same as current: sample from 
-    # uniform distribution
-    if s_new == s:
-        samp = s_min - 1 + np.ceil(s_range)*np.random.rand()
+    # uniform distribution of the remaining integers (none if s_min == s_max)
+    if s_new == s and s_range > 0:
+        samp = s_min - 1 + np.ceil(s_range*rng.random())
         if samp < s:
             s_new = samp
         else:
@@ -115,16 +117,20 @@ def perturb_disc(s,s_min,s_max):
 
     return s_new  
 
-def stand_norm():
+def stand_norm(rng=np.random):
     # Function returns a standard Gaussian random number (zvalue)  
-    # based upon Numerical recipes gasdev and Marsagalia-Bray Algorithm
+    # based upon Numerical recipes gasdev and Marsagalia-Bray Algorithm.
+    # A RandomStream has its own buffered normals; the polar method below 
+    # is kept for np.random so that seeded runs reproduce earlier results
+    if rng is not np.random:
+        return rng.standard_normal()
     Work3=2.0 
     while( (Work3>=1.0) or (Work3==0.0) ):
     # call random_number(ranval) # get one uniform random number
-        ranval = np.random.random() #harvest(ign)
+        ranval = rng.random() #harvest(ign)
         Work1 = 2.0 * ranval - 1.0  #2.0 * DBLE(ranval) - 1.0
     # call random_number(ranval) # get one uniform random number
-        ranval = np.random.random() #harvest(ign+1)
+        ranval = rng.random() #harvest(ign+1)
         Work2 = 2.0 * ranval - 1.0 # 2.0 * DBLE(ranval) - 1.0
         Work3 = Work1 * Work1 + Work2 * Work2
         # ign = ign + 2
@@ -133,7 +139,7 @@ def stand_norm():
         
     # pick one of two deviates at random (don't worry about trying to use both):
     # call random_number(ranval) # get one uniform random number
-    ranval = np.random.random() #harvest(ign)
+    ranval = rng.random() #harvest(ign)
     # ign = ign + 1
 
     if (ranval < 0.5) : 
@@ -142,4 +148,87 @@ def stand_norm():
         zvalue = Work2 * Work3
 
     return zvalue
-    
\ No newline at end of file
+    
+
+# ======================================================================
+# Array-at-a-time versions of the functions above. Each call perturbs a
+# whole vector of decision variables with the same reflect/absorb and
+# integer rounding rules as the scalar functions.
+# ======================================================================
+def perturb_array(s,s_min,s_max,discrete_flag,rng=np.random):
+    
+    disc = discrete_flag != 0
+    if not disc.any():
+        # all continuous - no splitting needed
+        return perturb_cont_array(s,s_min,s_max,rng)
+    s_new = np.empty_like(s)
+    # perturb continuous variables
+    s_new[~disc] = perturb_cont_array(s[~disc],s_min[~disc],s_max[~disc],rng)
+    # perturb discrete variables
+    s_new[disc] = perturb_disc_array(s[disc],s_min[disc],s_max[disc],rng)
+    return s_new
+
+def perturb_cont_array(s,s_min,s_max,rng=np.random):
+    
+    # Define parameter range
+    s_range = s_max - s_min
+    # Scalar neighbourhood size perturbation parameter (r) 
+    # NOTE: this value is proven to be robust. **DO NOT CHANGE**
+    r = 0.2
+    # Perturb variables
+    s_new = s + s_range*r*stand_norm_array(s.shape[0],rng)
+    
+    # probability of absorbing or reflecting at boundary
+    P_Abs_or_Ref = rng.random(s.shape[0])
+    reflect = P_Abs_or_Ref <= 0.5
+    below = s_new < s_min
+    above = s_new > s_max
+    
+    # Case 1) New variable is below lower bound: reflect or absorb, and 
+    # reset to s_min if the reflection goes past s_max
+    s_new = np.where(below, np.where(reflect, s_min + (s_min - s_new), s_min), s_new)
+    s_new = np.where(below & (s_new > s_max), s_min, s_new)
+    # Case 2) New variable is above upper bound: reflect or absorb, and 
+    # reset to s_max if the reflection goes past s_min
+    s_new = np.where(above, np.where(reflect, s_max - (s_new - s_max), s_max), s_new)
+    s_new = np.where(above & (s_new < s_min), s_max, s_new)
+    return s_new
+
+def perturb_disc_array(s,s_min,s_max,rng=np.random):
+    
+    # Define parameter range
+    s_range = s_max - s_min
+    # Scalar neighbourhood size perturbation parameter (r) 
+    # NOTE: this value is proven to be robust. **DO NOT CHANGE**
+    r = 0.2
+    # Perturb variables
+    s_new = s + s_range*r*stand_norm_array(s.shape[0],rng)
+    
+    # probability of absorbing or reflecting at boundary
+    P_Abs_or_Ref = rng.random(s.shape[0])
+    reflect = P_Abs_or_Ref <= 0.5
+    below = s_new < s_min - 0.5
+    above = s_new > s_max + 0.5
+    
+    # Case 1) New variable is below lower bound
+    s_new = np.where(below, np.where(reflect, (s_min-0.5) + ((s_min-0.5) - s_new), s_min), s_new)
+    s_new = np.where(below & (s_new > s_max + 0.5), s_min, s_new)
+    # Case 2) New variable is above upper bound
+    s_new = np.where(above, np.where(reflect, (s_max+0.5) - (s_new - (s_max+0.5)), s_max), s_new)
+    s_new = np.where(above & (s_new < s_min - 0.5), s_max, s_new)
+    
+    # Round new values to nearest integer
+    s_new = np.around(s_new)
+    
+    # Handle case where new value is the same as current: sample from 
+    # uniform distribution of the remaining integers
+    same = (s_new == s) & (s_range > 0)
+    if same.any():
+        samp = s_min[same] - 1 + np.ceil(s_range[same]*rng.random(np.count_nonzero(same)))
+        s_new[same] = np.where(samp < s[same], samp, samp + 1)
+    return s_new
+
+def stand_norm_array(n,rng=np.random):
+    # Function returns n standard Gaussian random numbers (same distribution 
+    # as stand_norm, drawn in one call)
+    return rng.standard_normal(n)
@@ -0,0 +1,155 @@
+# =============================================================================
+# Non-dominated archive of the multi-objective DDS mode (PA-DDS, see
+# DDS.DDS_pareto and num_objectives in DDS_inp.txt)
+# =============================================================================
+import numpy as np
+
+class ParetoArchive:
+#============================================================================
+# Archive of the mutually non-dominated solutions found so far (objectives
+# are minimised). Members are kept sorted on the first objective, so for an
+# update only the members that can dominate the new point (first objective
+# not larger) or be dominated by it (not smaller) are compared with it:
+#   2 objectives: along the sorted front the second objective decreases,
+#       so the dominance check is one binary search and the members the new
+#       point dominates are a contiguous run after it - O(log n) plus the
+#       members removed.
+#   more objectives: the candidates of either half are narrowed down one
+#       objective at a time (objectives are stored column by column).
+# Only the objective vectors are moved when the order changes; the DVs stay
+# in a slot store (freed slots are reused). A point equal to a member is
+# not added. The selection metric (hypervolume contribution for 2
+# objectives, crowding distance else) is recomputed only after a change.
+#============================================================================
+    def __init__(self, num_obj, num_dec, capacity=1024):
+        self.num_obj = num_obj
+        self.num_dec = num_dec
+        self.n = 0
+        self.F = np.empty((capacity, num_obj), order='F')      # objectives of the members, sorted on column 0
+        self.slot = np.empty(capacity, dtype=int)              # slot of each member in X / it
+        self.X = np.empty((capacity, num_dec))                 # DVs by slot
+        self.it = np.empty(capacity, dtype=int)                # iteration each member was found by slot
+        self.free = list(range(capacity - 1, -1, -1))          # unused slots
+        self.metric = None
+
+    def dominated(self, f):
+        # True if a member is at least as good as f in every objective
+        hi = np.searchsorted(self.F[:self.n, 0], f[0], side='right')
+        if hi == 0:
+            return False
+        if self.num_obj == 2:
+            # the member with the smallest second objective among those with F[0] <= f[0]
+            return self.F[hi-1, 1] <= f[1]
+        return self._narrow(0, hi, f, np.less_equal).shape[0] > 0
+
+    def add(self, x, f, it=0):
+        # Adds solution x with objectives f unless it is dominated; members it
+        # dominates are removed. Returns True if x was added.
+        f = np.asarray(f, dtype=float)
+        if self.dominated(f):
+            return False
+        n = self.n
+        lo = np.searchsorted(self.F[:n, 0], f[0], side='left')
+        if self.num_obj == 2:
+            end = lo
+            while end < n and self.F[end, 1] >= f[1]:
+                end += 1
+            removed = np.arange(lo, end)
+        else:
+            removed = self._narrow(lo, n, f, np.greater_equal)
+        self.free += self.slot[removed].tolist()
+        if not self.free:
+            self._grow()
+        if removed.shape[0] == 0 or removed[-1] - lo + 1 == removed.shape[0]:
+            # no member or the run right after the insertion point removed: move the members behind it
+            end = lo + removed.shape[0]
+            self.F[lo+1:n-end+lo+1] = self.F[end:n]
+            self.slot[lo+1:n-end+lo+1] = self.slot[end:n]
+        else:
+            keep = np.ones(n - lo, dtype=bool)
+            keep[removed - lo] = False
+            self.F[lo+1:n-removed.shape[0]+1] = self.F[lo:n][keep]
+            self.slot[lo+1:n-removed.shape[0]+1] = self.slot[lo:n][keep]
+        self.n = n - removed.shape[0] + 1
+        self.F[lo] = f
+        self.slot[lo] = k = self.free.pop()
+        self.X[k] = x
+        self.it[k] = it
+        self.metric = None
+        return True
+
+    def front(self):
+        # (objectives, DVs, iterations found) of the members, sorted on the first objective
+        slots = self.slot[:self.n]
+        return self.F[:self.n].copy(), self.X[slots], self.it[slots]
+
+    def member(self, index):
+        # DVs of member index (in sorted order)
+        return self.X[self.slot[index]].copy()
+
+    def select(self, rng=np.random):
+        # Member index drawn with probability proportional to the selection metric
+        # (roulette wheel as in PA-DDS), favouring sparse parts of the front
+        if self.metric is None:
+            self.metric = np.cumsum(self._hv_contribution() if self.num_obj == 2 else self._crowding_distance())
+        return min(int(np.searchsorted(self.metric, rng.random()*self.metric[-1], side='right')), self.n - 1)
+
+    def compromise(self):
+        # Member index nearest to the ideal point, objectives scaled to the range of the front
+        F = self.F[:self.n]
+        span = F.max(axis=0) - F.min(axis=0)
+        span[span == 0] = 1.0
+        return int(np.argmin((((F - F.min(axis=0))/span)**2).sum(axis=1)))
+
+    def _narrow(self, lo, hi, f, compare):
+        # indices of the members lo..hi-1 with compare(F, f) true in every objective
+        # but the first (which the sort order already settles)
+        cand = lo + np.flatnonzero(compare(self.F[lo:hi, 1], f[1]))
+        for j in range(2, self.num_obj):
+            if cand.shape[0] == 0:
+                break
+            cand = cand[compare(self.F[cand, j], f[j])]
+        return cand
+
+    def _grow(self):
+        # doubles the capacity
+        capacity = self.F.shape[0]
+        self.F = np.asfortranarray(np.concatenate((self.F, np.empty_like(self.F))))
+        self.slot = np.concatenate((self.slot, np.empty_like(self.slot)))
+        self.X = np.concatenate((self.X, np.empty_like(self.X)))
+        self.it = np.concatenate((self.it, np.empty_like(self.it)))
+        self.free += range(2*capacity - 1, capacity - 1, -1)
+
+    def _hv_contribution(self):
+        # hypervolume only dominated by each member (2 objectives); the end
+        # members get the largest contribution of the others
+        F = self.F[:self.n]
+        hvc = np.empty(self.n)
+        if self.n < 3:
+            hvc[:] = 1.0
+            return hvc
+        hvc[1:-1] = (F[2:, 0] - F[1:-1, 0])*(F[:-2, 1] - F[1:-1, 1])
+        hvc[0] = hvc[-1] = hvc[1:-1].max()
+        if hvc[0] == 0:
+            hvc[:] = 1.0
+        return hvc
+
+    def _crowding_distance(self):
+        # crowding distance (NSGA-II) of each member; end members of any
+        # objective get the largest distance of the others
+        F = self.F[:self.n]
+        cd = np.zeros(self.n)
+        ends = np.zeros(self.n, dtype=bool)
+        if self.n < 3:
+            cd[:] = 1.0
+            return cd
+        for j in range(self.num_obj):
+            order = np.argsort(F[:, j], kind='stable')
+            span = F[order[-1], j] - F[order[0], j]
+            if span > 0:
+                cd[order[1:-1]] += (F[order[2:], j] - F[order[:-2], j])/span
+            ends[order[[0, -1]]] = True
+        cd[ends] = cd[~ends].max() if (~ends).any() else 1.0
+        if cd.max() == 0:
+            cd[:] = 1.0
+        return cd
@@ -0,0 +1,121 @@
+# =============================================================================
+# Surrogate model used to screen DDS candidates before they are evaluated
+# (DDS.DDS_serial, surrogate_candidates in DDS_inp.txt)
+# =============================================================================
+import numpy as np
+import toolkit as util
+
+class RBF:
+#============================================================================
+# Cubic radial basis function interpolant with a linear tail,
+#   s(x) = sum_i lambda_i*|x - x_i|^3 + c_0 + c^T x,
+# as used by DYCORS (Regis and Shoemaker, 2013), fitted to the evaluated
+# candidates with DVs scaled to the unit cube. Points are added one at a
+# time by bordering the inverse of the interpolation matrix, O(n^2) per
+# point instead of O(n^3) for a new fit. A small ridge on both blocks keeps
+# the matrix non-singular for repeated points and for points that do not
+# (yet) span the DV space. Once max_points are held the oldest half is
+# dropped and the inverse recomputed.
+# Storage grows with the number of points held (doubling up to max_points)
+# and arrays larger than budget_mb spill to disk (util.alloc_array). With
+# as many DVs as max_points or more the points can never determine a linear
+# tail, so only its constant is fitted and the inverse stays at most 
+# (max_points+1)^2 instead of (num_dec+1+max_points)^2 (i.e. 3.5 GB for 
+# 20000 DVs).
+#============================================================================
+    RIDGE = 1e-8          # added to the diagonal of the kernel block
+    TAIL_RIDGE = 1e-3     # subtracted from the diagonal of the linear tail block
+    MIN_CAPACITY = 64     # points the storage is first allocated for
+
+    def __init__(self, S_min, S_max, max_points=1000, budget_mb=0, spill_dir=None):
+        self.S_min = np.asarray(S_min, dtype=float)
+        self.S_range = np.asarray(S_max, dtype=float) - self.S_min
+        self.S_range[self.S_range == 0] = 1.0
+        self.num_dec = self.S_min.shape[0]
+        self.max_points = max_points
+        self.budget_mb = budget_mb
+        self.spill_dir = spill_dir
+        # tail coefficients: c_0 and c (linear tail), or c_0 only
+        self.tail = self.num_dec + 1 if self.num_dec < max_points else 1
+        self.n = 0
+        self.capacity = 0
+        self._grow(min(self.MIN_CAPACITY, max_points))
+        self._refit()
+
+    def _grow(self, capacity):
+        # storage for capacity points; the points held and the inverse are kept
+        k = self.tail
+        m = k + self.n
+        X = util.alloc_array((capacity, self.num_dec), float, self.budget_mb, self.spill_dir)
+        y = np.empty(capacity)
+        # inverse of [[-TAIL_RIDGE*I, P^T], [P, Phi + RIDGE*I]] (tail first, points in order of arrival)
+        Minv = util.alloc_array((k + capacity, k + capacity), float, self.budget_mb, self.spill_dir)
+        if self.capacity > 0:
+            X[:self.n] = self.X[:self.n]
+            y[:self.n] = self.y[:self.n]
+            Minv[:m, :m] = self.Minv[:m, :m]
+        self.X, self.y, self.Minv = X, y, Minv
+        self.capacity = capacity
+
+    def add(self, x, y):
+        # Adds the evaluated point (x, y) and updates the interpolant
+        if self.n == self.max_points:
+            keep = self.max_points//2
+            self.X[:keep] = self.X[self.n-keep:self.n]
+            self.y[:keep] = self.y[self.n-keep:self.n]
+            self.n = keep
+            self._refit()
+        elif self.n == self.capacity:
+            self._grow(min(2*self.capacity, self.max_points))
+        x = (np.asarray(x, dtype=float) - self.S_min)/self.S_range
+        m = self.tail + self.n
+        b = np.empty(m)
+        b[0] = 1.0
+        b[1:self.tail] = x[:self.tail-1]
+        b[self.tail:] = self._dist(x[None, :])[0]**3
+        self.X[self.n] = x
+        self.y[self.n] = y
+        self.n += 1
+        # bordering: inverse of [[M, b], [b^T, RIDGE]] from the inverse of M
+        u = self.Minv[:m, :m] @ b
+        s = self.RIDGE - b @ u
+        if abs(s) < 1e-12:
+            self._refit()
+            return
+        self.Minv[:m, :m] += np.outer(u, u)/s
+        self.Minv[:m, m] = self.Minv[m, :m] = -u/s
+        self.Minv[m, m] = 1.0/s
+        self._coefficients()
+
+    def predict(self, X):
+        # Surrogate values of the rows of X and their distances to the nearest data point
+        X = (np.atleast_2d(X) - self.S_min)/self.S_range
+        if self.n == 0:
+            return np.zeros(X.shape[0]), np.full(X.shape[0], np.inf)
+        d = self._dist(X)
+        tail = self.coef[0] + X[:, :self.tail-1] @ self.coef[1:self.tail]
+        return d**3 @ self.coef[self.tail:] + tail, d.min(axis=1)
+
+    def _dist(self, X):
+        # distances between the (scaled) rows of X and the data points
+        D = (X**2).sum(axis=1)[:, None] + (self.X[:self.n]**2).sum(axis=1)[None, :] - 2*X @ self.X[:self.n].T
+        return np.sqrt(np.maximum(D, 0.0))
+
+    def _refit(self):
+        # inverse of the interpolation matrix of the points held, computed from scratch
+        k = self.tail
+        m = k + self.n
+        M = np.empty((m, m))
+        M[:k, :k] = -self.TAIL_RIDGE*np.eye(k)
+        M[k:, 0] = M[0, k:] = 1.0
+        M[k:, 1:k] = self.X[:self.n, :k-1]
+        M[1:k, k:] = self.X[:self.n, :k-1].T
+        M[k:, k:] = self._dist(self.X[:self.n])**3 + self.RIDGE*np.eye(self.n)
+        self.Minv[:m, :m] = np.linalg.inv(M)
+        self._coefficients()
+
+    def _coefficients(self):
+        # tail and kernel coefficients interpolating the data
+        k = self.tail
+        m = k + self.n
+        self.coef = self.Minv[:m, k:m] @ self.y[:self.n]
@@ -4,8 +4,41 @@
 # =============================================================================
 
 import numpy as np
+import asyncio
+import atexit
+import collections
+import concurrent.futures
+import fnmatch
+import glob
+import importlib.util
+import inspect
+import json
+import math
 import os
+import pickle
+import re
+import shutil
+import signal
+import struct
+import subprocess
+import sys
+import tempfile
+import time
 import fitness_func as of
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Seconds between checks of a running model's partial objective (pre-emption mode 1)
+PREEMPT_POLL = 0.5
+
+# Files DDS writes in a model directory, never linked to the base model (see generate_dir)
+DDS_MODEL_FILES = ('variables_in.txt','function_out.txt','function_partial.txt','preempt_threshold.txt')
+# Record of the files of a slave model directory (see generate_dir)
+SLAVE_MANIFEST = '.dds_manifest.json'
+# Linux ioctl cloning a file as a reflink (copy-on-write, i.e. btrfs or XFS)
+FICLONE = 0x40049409
 
 def read_param_file(filename):
 #===========================================================================
@@ -14,22 +47,191 @@ def read_param_file(filename):
 # This file should contain 4 columns
 # column 0: name of parameter; col 1: lower bound; col 2: upper bound 
 # column 3: discrete dec variable? 0 = no; 1 = yes
+# A relative filename is read from the DDS directory.
+#===========================================================================
+    filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    bounds_dat = np.loadtxt(filename,dtype={'names':('S_name','S_min','S_max','Discrete_flag'),'formats':('S3','f8','f8','i4')},skiprows = 1)
+    return bounds_dat
+
+def make_bounds(S_min, S_max, discrete=None, names=None):
+#===========================================================================
+# Decision variable bounds in the format of read_param_file, built from
+# arrays of the lower and upper bounds (i.e. for Main_DDS.run_dds).
+# discrete = flags of the integer DVs (default none), names = DV names
+# (default 1, 2, ...)
 #===========================================================================
-    script_dir = os.path.dirname(__file__)
-    os.chdir(script_dir)
-    bounds_dat = np.loadtxt(filename,dtype={'names':('S_name','S_min','S_max','Discrete_flag'),'formats':('S3','f12','f12','i4')},skiprows = 1)
+    S_min = np.atleast_1d(np.asarray(S_min, dtype=float))
+    S_max = np.atleast_1d(np.asarray(S_max, dtype=float))
+    names = np.array([str(k + 1) for k in range(S_min.shape[0])] if names is None else [str(name) for name in names], dtype='S')
+    bounds_dat = np.zeros(S_min.shape[0], dtype=[('S_name',names.dtype),('S_min','f8'),('S_max','f8'),('Discrete_flag','i4')])
+    bounds_dat['S_name'] = names
+    bounds_dat['S_min'] = S_min
+    bounds_dat['S_max'] = S_max
+    if discrete is not None:
+        bounds_dat['Discrete_flag'] = discrete
     return bounds_dat
 
+# Settings of the DDS Main Input Control File that may be left out: defaults of
+# the optional lines (12 onwards) and of the settings run_dds does not require
+DDS_DEFAULTS = {'runname':'DDS','num_trials':1,'out_print':0,'ini_name':'0','modeldir':'0','obj_flag':1,'num_slaves':1,'pre_empt_flag':0,
+    'batch_size':1,'trial_procs':1,'eval_backend':0,'cache_size':0,'cache_file':'0','checkpoint_evals':0,'checkpoint_secs':0,'resume':0,
+    'out_format':0,'record_mode':0,'record_sample':0,'memory_mb':0,'stat_quantiles':[0.25,0.5,0.75],'profile':0,'metrics_secs':0,
+    'parallel_mode':0,'surrogate_candidates':0,'portfolio':0,'portfolio_stall':0.2,'rng_mode':0,'model_writes':[],'model_workdir':'0',
+    'num_objectives':1,'warm_start':'0','cache_resolution':0.0}
+
 def read_DDS_inp(filename):
 #===========================================================================
 # This function will read the DDS Main Input Control File - see file for
-# instructions on how to populate
+# instructions on how to populate. A relative filename is read from the 
+# DDS directory.
 #===========================================================================    
-    script_dir = os.path.dirname(__file__)
-    os.chdir(script_dir)
+    filename = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
     A = np.loadtxt(filename, dtype='str', comments = '#',skiprows =2)
-    return {'objfunc_name':A[0],'runname':A[1],'num_trials':int(A[2]),'num_iters':int(A[3]),'user_seed':int(A[4]), \
+    DDS_inp = {'objfunc_name':A[0],'runname':A[1],'num_trials':int(A[2]),'num_iters':int(A[3]),'user_seed':int(A[4]), \
     'out_print':int(A[5]),'ini_name':A[6],'modeldir':A[7],'obj_flag':int(A[8]),'num_slaves':int(A[9]),'pre_empt_flag':int(A[10])}
+    # Optional settings - input files written before these were added stop at
+    # line 11, so missing entries take their default value (DDS_DEFAULTS)
+    DDS_inp['batch_size'] = int(A[11]) if len(A) > 11 else DDS_DEFAULTS['batch_size']
+    DDS_inp['trial_procs'] = int(A[12]) if len(A) > 12 else DDS_DEFAULTS['trial_procs']
+    DDS_inp['eval_backend'] = int(A[13]) if len(A) > 13 else DDS_DEFAULTS['eval_backend']
+    DDS_inp['cache_size'] = int(A[14]) if len(A) > 14 else DDS_DEFAULTS['cache_size']
+    DDS_inp['cache_file'] = A[15] if len(A) > 15 else DDS_DEFAULTS['cache_file']
+    DDS_inp['checkpoint_evals'] = int(A[16]) if len(A) > 16 else DDS_DEFAULTS['checkpoint_evals']
+    DDS_inp['checkpoint_secs'] = float(A[17]) if len(A) > 17 else DDS_DEFAULTS['checkpoint_secs']
+    DDS_inp['resume'] = int(A[18]) if len(A) > 18 else DDS_DEFAULTS['resume']
+    DDS_inp['out_format'] = int(A[19]) if len(A) > 19 else DDS_DEFAULTS['out_format']
+    DDS_inp['record_mode'] = int(A[20]) if len(A) > 20 else DDS_DEFAULTS['record_mode']
+    DDS_inp['record_sample'] = int(A[21]) if len(A) > 21 else DDS_DEFAULTS['record_sample']
+    DDS_inp['memory_mb'] = float(A[22]) if len(A) > 22 else DDS_DEFAULTS['memory_mb']
+    DDS_inp['stat_quantiles'] = ([] if A[23] == '0' else [float(q) for q in A[23].split(',')]) if len(A) > 23 else DDS_DEFAULTS['stat_quantiles']
+    DDS_inp['profile'] = int(A[24]) if len(A) > 24 else DDS_DEFAULTS['profile']
+    DDS_inp['metrics_secs'] = float(A[25]) if len(A) > 25 else DDS_DEFAULTS['metrics_secs']
+    DDS_inp['parallel_mode'] = int(A[26]) if len(A) > 26 else DDS_DEFAULTS['parallel_mode']
+    DDS_inp['surrogate_candidates'] = int(A[27]) if len(A) > 27 else DDS_DEFAULTS['surrogate_candidates']
+    DDS_inp['portfolio'] = int(A[28]) if len(A) > 28 else DDS_DEFAULTS['portfolio']
+    DDS_inp['portfolio_stall'] = float(A[29]) if len(A) > 29 else DDS_DEFAULTS['portfolio_stall']
+    DDS_inp['rng_mode'] = int(A[30]) if len(A) > 30 else DDS_DEFAULTS['rng_mode']
+    DDS_inp['model_writes'] = ([] if A[31] == '0' else A[31].split(',')) if len(A) > 31 else DDS_DEFAULTS['model_writes']
+    DDS_inp['model_workdir'] = A[32] if len(A) > 32 else DDS_DEFAULTS['model_workdir']
+    DDS_inp['num_objectives'] = int(A[33]) if len(A) > 33 else DDS_DEFAULTS['num_objectives']
+    DDS_inp['warm_start'] = A[34] if len(A) > 34 else DDS_DEFAULTS['warm_start']
+    DDS_inp['cache_resolution'] = float(A[35]) if len(A) > 35 else DDS_DEFAULTS['cache_resolution']
+    return DDS_inp
+
+
+def generate_dir(num_slaves,modeldir,writes=(),workdir=None,max_threads=8):
+#===========================================================================
+# Provisions the model directories of slaves 1..num_slaves (modeldir + '_'
+# + k, see Evaluator) from the base model directory without copying data 
+# the model only reads:
+#   - files matching one of the patterns in writes (i.e. 'params.txt' or
+#     'output/*', matched against the path relative to modeldir, or the
+#     file name for patterns without '/') and the files DDS writes are
+#     copied, all other files are hard-linked to the base model (symbolic
+#     links across file systems). With no patterns every file is copied.
+#   - copies are reflinks where the file system supports them.
+# Existing slave directories are reused: each holds a manifest of its files
+# and a file is only provisioned again if it or its base file has changed.
+# Files that are not in the base model (i.e. model outputs) are left alone.
+# With workdir (i.e. a tmpfs such as /dev/shm) the slave directories are 
+# placed there instead of next to modeldir. Slaves are set up in parallel
+# threads. Returns {'modeldir': base path of the slave directories (pass it
+# to DDS), 'linked'/'copied'/'kept': file counts over all slaves, 'seconds'}
+#===========================================================================
+    t_0 = time.time()
+    base = modeldir if workdir is None else os.path.join(workdir, os.path.basename(os.path.normpath(modeldir)))
+    dirs, files = _model_files(modeldir, list(writes))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(num_slaves, max_threads))) as pool:
+        counts = list(pool.map(lambda k: _provision_slave(modeldir, base + '_' + str(k), dirs, files), range(1, num_slaves + 1)))
+    summary = {key: sum(count[key] for count in counts) for key in ('linked', 'copied', 'kept')}
+    summary.update(modeldir=base, seconds=time.time() - t_0)
+    return summary
+
+def _model_files(modeldir,writes):
+    # Sub-directories and files of the base model directory: files as 
+    # (relative path, 'copy' or 'link', [size, mtime_ns])
+    dirs, files = [], []
+    for root, subdirs, names in os.walk(modeldir):
+        rel_root = os.path.relpath(root, modeldir)
+        dirs += [os.path.normpath(os.path.join(rel_root, d)).replace(os.sep, '/') for d in subdirs]
+        for name in names:
+            rel = os.path.normpath(os.path.join(rel_root, name)).replace(os.sep, '/')
+            if rel == SLAVE_MANIFEST:
+                continue
+            written = not writes or name in DDS_MODEL_FILES or any(fnmatch.fnmatch(rel if '/' in p else name, p) for p in writes)
+            files.append((rel, 'copy' if written else 'link', _stat_key(os.path.join(root, name))))
+    return dirs, files
+
+def _provision_slave(modeldir,slave_dir,dirs,files):
+    # Brings one slave model directory up to date with the base model (see generate_dir)
+    old = {}
+    try:
+        with open(os.path.join(slave_dir, SLAVE_MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest['source'] == os.path.abspath(modeldir):
+            old = manifest['files']
+    except (OSError, ValueError, KeyError):
+        pass
+    os.makedirs(slave_dir, exist_ok=True)
+    for d in dirs:
+        os.makedirs(os.path.join(slave_dir, d), exist_ok=True)
+    new = {}
+    counts = {'linked': 0, 'copied': 0, 'kept': 0}
+    for rel, kind, base_stat in files:
+        dst = os.path.join(slave_dir, rel)
+        entry = old.pop(rel, None)
+        if entry is not None and entry[0] == kind and entry[1] == base_stat and entry[2] == _stat_key(dst):
+            counts['kept'] += 1
+        else:
+            # never write through an old link into the base model
+            if os.path.lexists(dst):
+                os.remove(dst)
+            if kind == 'link':
+                _link_file(os.path.join(modeldir, rel), dst)
+                counts['linked'] += 1
+            else:
+                _clone_file(os.path.join(modeldir, rel), dst)
+                counts['copied'] += 1
+        new[rel] = [kind, base_stat, _stat_key(dst)]
+    # files no longer in the base model
+    for rel in old:
+        if os.path.lexists(os.path.join(slave_dir, rel)):
+            os.remove(os.path.join(slave_dir, rel))
+    tmp_file = os.path.join(slave_dir, SLAVE_MANIFEST + '.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump({'source': os.path.abspath(modeldir), 'files': new}, f)
+    os.replace(tmp_file, os.path.join(slave_dir, SLAVE_MANIFEST))
+    return counts
+
+def _stat_key(path):
+    # [size, mtime_ns] of a file (of its target for links), None if it does not exist
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+def _link_file(src,dst):
+    # Hard link, else symbolic link (i.e. across file systems), else copy of src
+    try:
+        os.link(src, dst)
+    except OSError:
+        try:
+            os.symlink(os.path.abspath(src), dst)
+        except OSError:
+            _clone_file(src, dst)
+
+def _clone_file(src,dst):
+    # Copy of src as a reflink (copy-on-write clone) where the file system supports it
+    if fcntl is not None and sys.platform.startswith('linux'):
+        try:
+            with open(src, 'rb') as f_src, open(dst, 'wb') as f_dst:
+                fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
 
 
 def ext_function(x,modeldir,exe_name):
@@ -39,61 +241,1083 @@ def ext_function(x,modeldir,exe_name):
 # Follow this coding framework to link DDS with any general *.exe file OR a
 # batch file (*.bat) needed to compute your objective function.
 #============================================================================
-    # STEP 1: switch to model directory
-    os.chdir(modeldir)
+    # STEP 1: write model input file with current decision variables to the model directory
+    np.savetxt(os.path.join(modeldir,'variables_in.txt'), x)
     
-    # STEP 2: write model input file with current decision variables
-    np.savetxt('variables_in.txt', x)
+    # STEP 2: execute model in the model directory (the DDS process stays in its own directory)
+    subprocess.call(exe_name, shell=True, cwd=modeldir)
     
-    # STEP 3: execute model 
-    os.system(exe_name)
-    
-    # STEP 4: read model output
+    # STEP 3: read model output
     #  - assumes that model reads 'variables_in', runs and 
     #  - then outputs objective function value to 'function_out'
-    y = np.loadtxt('function_out.txt')
-    
-    # STEP 5: return back to main code directory
-    script_dir = os.path.dirname(__file__)
-    os.chdir(script_dir)
+    y = np.loadtxt(os.path.join(modeldir,'function_out.txt'))
     
     return y
 
-def get_objfunc(x,modeldir,objfunc_name,exe_name,slave_index):
+class PipeModel:
+#============================================================================
+# Persistent external model: the executable is launched once (in modeldir)
+# and then evaluates one parameter vector per request over its stdin/stdout
+# pipes, avoiding a shell spawn and text-file round trip per evaluation.
+#   line protocol   (binary = False): DDS writes one line of space separated
+#       decision variable values, the model answers with one line holding 
+#       the objective function value.
+#   binary protocol (binary = True): DDS writes a little-endian uint32 count
+#       n followed by n float64 values, the model answers with one float64.
+# The model must exit when its stdin is closed and must not write anything
+# else to stdout. See serve_model for a Python implementation of the model side.
+#============================================================================
+    def __init__(self, exe_name, modeldir, binary=False):
+        self.binary = binary
+        self.proc = subprocess.Popen(exe_name, shell=True, cwd=modeldir, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def evaluate(self, x):
+        x = np.asarray(x, dtype='<f8')
+        if self.binary:
+            self.proc.stdin.write(struct.pack('<I', x.shape[0]) + x.tobytes())
+            self.proc.stdin.flush()
+            reply = self.proc.stdout.read(8)
+            if len(reply) < 8:
+                raise RuntimeError('External model exited (code %s) without returning an objective function value' % self.proc.poll())
+            return struct.unpack('<d', reply)[0]
+        self.proc.stdin.write((' '.join(repr(v) for v in x.tolist()) + '\n').encode())
+        self.proc.stdin.flush()
+        reply = self.proc.stdout.readline()
+        if not reply:
+            raise RuntimeError('External model exited (code %s) without returning an objective function value' % self.proc.poll())
+        return float(reply)
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.stdin.close()
+            self.proc.wait()
+
+# Persistent models of this process, one per (exe_name, model directory, protocol)
+_pipe_models = {}
+
+def close_pipe_models():
+    # Shut down all persistent models started by this process
+    for model in _pipe_models.values():
+        model.close()
+    _pipe_models.clear()
+
+atexit.register(close_pipe_models)
+
+def ext_function_pipe(x,modeldir,exe_name,binary):
+#============================================================================ 
+# Persistent-worker version of ext_function: the model in modeldir is 
+# started on first use and kept running for all later evaluations
+#============================================================================
+    key = (exe_name, modeldir, binary)
+    if key not in _pipe_models:
+        _pipe_models[key] = PipeModel(exe_name, modeldir, binary)
+    return _pipe_models[key].evaluate(x)
+
+def serve_model(feval, binary=False):
+#============================================================================
+# Model side of the PipeModel protocol for Python models: answers requests
+# on stdin with feval(x) on stdout until stdin is closed
+#============================================================================
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    while True:
+        if binary:
+            header = stdin.read(4)
+            if len(header) < 4:
+                break
+            n = struct.unpack('<I', header)[0]
+            x = np.frombuffer(stdin.read(8*n), dtype='<f8')
+            stdout.write(struct.pack('<d', feval(x)))
+        else:
+            line = stdin.readline()
+            if not line:
+                break
+            x = np.array(line.split(), dtype=float)
+            stdout.write(('%r\n' % float(feval(x))).encode())
+        stdout.flush()
+
+class Evaluator:
+#============================================================================
+# Objective function of a run, resolved once (per slave) instead of on every
+# evaluation: holds the callable or executable and its model directory, and
+# never changes the working directory of the process.
+#   Python functions: objfunc_name from a module '<objfunc_name>.py' in the
+#       model directory if there is one, else from fitness_func. They run in
+#       the DDS directory, so a module in modeldir should open its files 
+#       relative to its own location (os.path.dirname(__file__)). 
+#       objfunc_name may also be the function itself (see run_dds).
+#   External models (exe_name): run in the model directory, see get_objfunc
+#       for eval_backend.
+# Slaves (slave_index > 0) use their own model directory modeldir + '_' + k.
+#============================================================================
+    def __init__(self, modeldir, objfunc_name, exe_name, slave_index=0, eval_backend=0):
+        script_dir = os.path.dirname(__file__)
+        if slave_index != 0 and script_dir != modeldir:
+            modeldir = modeldir + '_' + str(slave_index)
+        self.modeldir = modeldir
+        self.exe_name = exe_name
+        self.eval_backend = eval_backend
+        self.feval = None
+        if np.size(exe_name) == 0:
+            self.feval = resolve_objfunc(objfunc_name, modeldir)
+            self.vectorized = getattr(self.feval, 'vectorized', False)
+            self.takes_threshold = _takes_threshold(self.feval)
+
+    def __call__(self, x):
+        if self.feval is not None:
+            return self.feval(x)
+        if self.eval_backend == 0:
+            return ext_function(x,self.modeldir,self.exe_name)
+        return ext_function_pipe(x,self.modeldir,self.exe_name,self.eval_backend == 2)
+
+    def batch(self, X):
+        # One objective function value per row of X (see get_objfunc_batch)
+        if self.feval is not None:
+            if self.vectorized:
+                y = np.asarray(self.feval(X), dtype=float)
+            else:
+                y = np.array([self.feval(x) for x in X], dtype=float)
+        elif self.eval_backend == 0:
+            y = ext_function_batch(X,self.modeldir,self.exe_name)
+        else:
+            # persistent models evaluate one candidate per request
+            y = np.array([ext_function_pipe(x,self.modeldir,self.exe_name,self.eval_backend == 2) for x in X], dtype=float)
+        assert y.shape == (X.shape[0],), 'Objective function returned %s values for a batch of %i candidates.' % (y.shape, X.shape[0])
+        return y
+
+    def preempt(self, x, threshold, to_max, pre_empt_flag):
+        # (y, preempted), see get_objfunc_preempt. External models of a run 
+        # with pre-emption always go through ext_function_preempt, so that a
+        # stale threshold file is removed and 'function_out.txt' is read with
+        # its optional pre-emption flag.
+        if pre_empt_flag == 0:
+            return self(x), False
+        if self.feval is not None:
+            if threshold is None or not self.takes_threshold:
+                return self(x), False
+            y = self.feval(x, threshold)
+            if np.size(y) == 2:
+                return float(y[0]), bool(y[1])
+            return y, False
+        return ext_function_preempt(x,self.modeldir,self.exe_name,threshold,to_max,pre_empt_flag)
+
+    async def preempt_async(self, x, threshold, to_max, pre_empt_flag):
+        # Coroutine version of preempt for external models run once per evaluation
+        # (eval_backend = 0), see ext_function_async
+        return await ext_function_async(x,self.modeldir,self.exe_name,None if pre_empt_flag == 0 else threshold,to_max,pre_empt_flag)
+
+def _takes_threshold(feval):
+    # True if the Python objective can be called as feval(x, threshold)
+    try:
+        inspect.signature(feval).bind(None, None)
+    except TypeError:
+        return False
+    except ValueError:
+        # no signature available (i.e. some builtins): assume a plain f(x)
+        return False
+    return True
+
+def resolve_objfunc(objfunc_name, modeldir):
+    # Python objective function objfunc_name: from '<objfunc_name>.py' in a model directory if present, else from fitness_func
+    if callable(objfunc_name):
+        return objfunc_name
+    module_file = os.path.join(modeldir, objfunc_name + '.py')
+    if modeldir != os.path.dirname(__file__) and os.path.isfile(module_file):
+        spec = importlib.util.spec_from_file_location('dds_objfunc_' + str(abs(hash(module_file))), module_file)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return getattr(module, objfunc_name)
+    return getattr(of, objfunc_name)
+
+# Evaluators of this process resolved by get_evaluator
+_evaluators = {}
+
+def get_evaluator(modeldir,objfunc_name,exe_name,slave_index=0,eval_backend=0):
+    # Evaluator for these settings, resolved on first use and reused afterwards
+    key = (modeldir, objfunc_name, exe_name if isinstance(exe_name, str) else None, slave_index, eval_backend)
+    if key not in _evaluators:
+        _evaluators[key] = Evaluator(modeldir,objfunc_name,exe_name,slave_index,eval_backend)
+    return _evaluators[key]
+
+def release_evaluators(objfunc_name):
+    # Drops the evaluators of objfunc_name (i.e. a function passed to run_dds
+    # once its run is done), they are resolved again if used later
+    for key in [key for key in list(_evaluators) if key[1] is objfunc_name]:
+        _evaluators.pop(key, None)
+
+def get_objfunc(x,modeldir,objfunc_name,exe_name,slave_index,eval_backend=0):
 #============================================================================
 # Function to handle calls to external objective functions
+# eval_backend selects how external models are run: 0 = once per evaluation 
+# through 'variables_in.txt'/'function_out.txt' (ext_function), 1 = 
+# persistent model with the line protocol, 2 = persistent model with the 
+# binary protocol (ext_function_pipe)
+# The objective is resolved once (get_evaluator); DDS keeps its Evaluator
+# and calls it directly.
 #============================================================================    
-    # Establish script directory
-    script_dir = os.path.dirname(__file__)
-    os.chdir(script_dir)
-    # Determine if model subdirectory is available
-    if script_dir == modeldir:
-        # if objective function is in script directory
-        feval = getattr(of, objfunc_name)
-        y = feval(x)
+    return get_evaluator(modeldir,objfunc_name,exe_name,slave_index,eval_backend)(x)
+
+
+
+def ext_function_batch(X,modeldir,exe_name):
+#============================================================================ 
+# Batch version of ext_function: writes all candidates to 'variables_in.txt'
+# (one parameter set per row), runs the model once and reads one objective 
+# function value per row back from 'function_out.txt'
+#============================================================================
+    np.savetxt(os.path.join(modeldir,'variables_in.txt'), X)
+    subprocess.call(exe_name, shell=True, cwd=modeldir)
+    return np.loadtxt(os.path.join(modeldir,'function_out.txt'), ndmin=1)
+
+def get_objfunc_batch(X,modeldir,objfunc_name,exe_name,slave_index,eval_backend=0):
+#============================================================================
+# Batch-aware variant of get_objfunc: X is a 2-D array with one candidate 
+# per row and one objective function value per row is returned. Python 
+# functions flagged as vectorized (func.vectorized = True) get the whole
+# matrix in one call, other functions are called row by row.
+#============================================================================
+    return get_evaluator(modeldir,objfunc_name,exe_name,slave_index,eval_backend).batch(X)
+
+
+def ext_function_preempt(x,modeldir,exe_name,threshold,to_max,pre_empt_flag):
+#============================================================================ 
+# Pre-emptive version of ext_function. Returns (y, preempted). DDS is greedy,
+# so a candidate is useless as soon as its partial objective is worse than
+# threshold (the current best, in model units). Pre-emption assumes the 
+# objective only gets worse as the simulation proceeds (e.g. a sum of errors).
+#   pre_empt_flag = 1: the model writes its running objective value to 
+#       'function_partial.txt'; it is polled every PREEMPT_POLL seconds and 
+#       the model is killed once the value is worse than threshold.
+#   pre_empt_flag = 2: threshold is written to 'preempt_threshold.txt' for 
+#       models that stop themselves. Such a model writes its partial value 
+#       followed by a 1 to 'function_out.txt' when it stops early.
+# threshold = None (no best solution yet, i.e. initial solutions): the model
+# runs to the end, the threshold file of an earlier evaluation is removed.
+#============================================================================
+    np.savetxt(os.path.join(modeldir,'variables_in.txt'), x)
+    partial_file = os.path.join(modeldir,'function_partial.txt')
+    if pre_empt_flag == 2 or threshold is None:
+        _write_threshold(modeldir, threshold)
+        subprocess.call(exe_name, shell=True, cwd=modeldir)
+        return _read_preempt_out(os.path.join(modeldir,'function_out.txt'))
+
+    # pre_empt_flag = 1: launch the model and monitor its partial objective
+    if os.path.exists(partial_file):
+        os.remove(partial_file)
+    if os.name == 'nt':
+        proc = subprocess.Popen(exe_name, shell=True, cwd=modeldir)
     else:
-        # else - check if serial or parallel code is running
-        if slave_index == 0:   # serial code
-            os.chdir(modeldir)
-        else:# if parallel code - launch slave directory
-            modeldir = modeldir + '_' + str(slave_index)
-            os.chdir(modeldir)
-        # if objective function is .py script
-        if exe_name.size == 0:
-            feval = getattr(of, objfunc_name)
-            y = feval(x)
-            os.chdir(script_dir)
-            # else - launch ext_function to handle *.exe/*.bat
+        proc = subprocess.Popen(exe_name, shell=True, cwd=modeldir, start_new_session=True)
+    while True:
+        try:
+            proc.wait(timeout=PREEMPT_POLL)
+            break
+        except subprocess.TimeoutExpired:
+            partial = _read_partial(partial_file)
+            if partial is not None and to_max*(partial - threshold) > 0:
+                _kill_model(proc)
+                return partial, True
+    return _read_preempt_out(os.path.join(modeldir,'function_out.txt'))
+
+async def ext_function_async(x,modeldir,exe_name,threshold=None,to_max=1,pre_empt_flag=0):
+#============================================================================ 
+# asyncio version of ext_function (threshold = None) and ext_function_preempt,
+# returns (y, preempted). The model runs as an asyncio subprocess, so one 
+# event loop can keep the models of all slaves running at once (see 
+# DDS.DDS_async). Model files and pre-emption modes are those of 
+# ext_function_preempt. A cancelled evaluation kills its model.
+#============================================================================
+    np.savetxt(os.path.join(modeldir,'variables_in.txt'), x)
+    partial_file = os.path.join(modeldir,'function_partial.txt')
+    monitor = threshold is not None and pre_empt_flag == 1
+    if pre_empt_flag > 0:
+        _write_threshold(modeldir, threshold if pre_empt_flag == 2 else None)
+    if monitor and os.path.exists(partial_file):
+        os.remove(partial_file)
+    if os.name == 'nt':
+        proc = await asyncio.create_subprocess_shell(exe_name, cwd=modeldir)
+    else:
+        proc = await asyncio.create_subprocess_shell(exe_name, cwd=modeldir, start_new_session=True)
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(proc.wait(), PREEMPT_POLL if monitor else None)
+                break
+            except asyncio.TimeoutError:
+                partial = _read_partial(partial_file)
+                if partial is not None and to_max*(partial - threshold) > 0:
+                    _kill_tree(proc.pid)
+                    await proc.wait()
+                    return partial, True
+    except asyncio.CancelledError:
+        if proc.returncode is None:
+            _kill_tree(proc.pid)
+        raise
+    if pre_empt_flag == 0:
+        return float(np.loadtxt(os.path.join(modeldir,'function_out.txt'))), False
+    return _read_preempt_out(os.path.join(modeldir,'function_out.txt'))
+
+def _write_threshold(modeldir, threshold):
+    # Threshold file of pre_empt_flag = 2 models: threshold = None removes it
+    # (the model then runs to the end), so no stale threshold is left behind
+    threshold_file = os.path.join(modeldir,'preempt_threshold.txt')
+    if threshold is not None:
+        np.savetxt(threshold_file, [threshold])
+    elif os.path.exists(threshold_file):
+        os.remove(threshold_file)
+
+def _read_partial(filename):
+    # Last value in a model's running objective file (None if not available yet)
+    try:
+        with open(filename) as f:
+            return float(f.read().split()[-1])
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+
+def _read_preempt_out(filename):
+    # Objective value and pre-emption flag (optional 2nd value) from 'function_out.txt'
+    y = np.loadtxt(filename, ndmin=1)
+    return float(y[0]), bool(y.shape[0] > 1 and y[1] != 0)
+
+def _kill_model(proc):
+    # Kill a model launched through the shell, including its child processes
+    _kill_tree(proc.pid)
+    proc.wait()
+
+def _kill_tree(pid):
+    # Kill the process pid (a shell started in its own session) and its children
+    if os.name == 'nt':
+        subprocess.call(['taskkill','/F','/T','/PID',str(pid)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        os.killpg(pid, signal.SIGKILL)
+
+def get_objfunc_preempt(x,modeldir,objfunc_name,exe_name,slave_index,threshold,to_max,pre_empt_flag,eval_backend=0):
+#============================================================================
+# Pre-emptive variant of get_objfunc: the current best objective value 
+# (threshold, in model units) is passed to the objective and (y, preempted)
+# is returned. External models are handled by ext_function_preempt. Python 
+# functions that take a second argument are called as feval(x, threshold)
+# and return either y or (y, preempted) when they stopped early; others are
+# called as feval(x) and never pre-empted.
+#============================================================================
+    return get_evaluator(modeldir,objfunc_name,exe_name,slave_index,eval_backend).preempt(x,threshold,to_max,pre_empt_flag)
+
+
+class EvalCache:
+#============================================================================
+# Memoization of objective function values. DDS regularly proposes candidates
+# it has already evaluated (integer DVs, single-DV perturbations late in a 
+# run), so repeats are answered from the cache instead of re-running the 
+# model. Keys are the candidate vectors quantized to multiples of resolution
+# (0 = exact values). At most max_size entries are kept, evicting the least
+# recently used one. With a filename the cache is loaded from and saved to 
+# disk so it can be reused across trials and reruns of the same objective.
+#============================================================================
+    def __init__(self, max_size, filename=None, objfunc_name=None, resolution=0.0):
+        self.max_size = max_size
+        self.filename = filename
+        self.objfunc_name = objfunc_name
+        self.resolution = resolution
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if filename is not None and os.path.exists(filename):
+            self.load()
+
+    def key(self, x):
+        # + 0.0 turns -0.0 into 0.0, which has different bytes
+        x = np.asarray(x, dtype=float) + 0.0
+        if self.resolution > 0:
+            return np.round(x/self.resolution).astype(np.int64).tobytes()
+        return x.tobytes()
+
+    def get(self, x):
+        # Cached objective function value of x, or None
+        k = self.key(x)
+        y = self.entries.get(k)
+        if y is None:
+            self.misses += 1
         else:
-            y = ext_function(x,modeldir,exe_name)
-    return y 
+            self.hits += 1
+            self.entries.move_to_end(k)
+        return y
+
+    def put(self, x, y):
+        k = self.key(x)
+        self.entries[k] = y
+        self.entries.move_to_end(k)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
 
+    def load(self):
+        with open(self.filename, 'rb') as f:
+            saved = pickle.load(f)
+        # only reuse values of the same objective function and quantization
+        if saved['objfunc_name'] == self.objfunc_name and saved['resolution'] == self.resolution:
+            for k, y in saved['entries']:
+                self.entries[k] = y
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def save(self):
+        if self.filename is None:
+            return
+        tmp_file = self.filename + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            pickle.dump({'objfunc_name':self.objfunc_name, 'resolution':self.resolution, 'entries':list(self.entries.items())}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self.filename)
+
+
+class Checkpoint:
+#============================================================================
+# Periodic checkpoint file of a DDS run, so a run can continue after an 
+# interruption. The file holds the run state of Main_DDS.py (completed 
+# trials, set in run_state) and the state of the trial in progress (saved 
+# by DDS_serial: filled part of the Master matrix, sbest/Jbest and the 
+# random number generator state). A trial checkpoint is due every 
+# every_evals evaluations and/or every every_secs seconds (0 = not used).
+#============================================================================
+    def __init__(self, filename, every_evals=0, every_secs=0):
+        self.filename = filename
+        self.every_evals = every_evals
+        self.every_secs = every_secs
+        self.run_state = None
+        self.last_evals = 0
+        self.last_time = time.time()
+
+    def due(self, evals):
+        # True if a trial checkpoint is due after evals evaluations of the current trial
+        return (self.every_evals > 0 and evals - self.last_evals >= self.every_evals) or \
+               (self.every_secs > 0 and time.time() - self.last_time >= self.every_secs)
+
+    def save_trial(self, trial_state, evals=0):
+        # Writes the run state plus the state of the trial in progress (None between trials)
+        tmp_file = self.filename + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            pickle.dump({'run':self.run_state, 'trial':trial_state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # replace in one step, so an interruption never leaves a partial checkpoint
+        os.replace(tmp_file, self.filename)
+        self.last_evals = evals
+        self.last_time = time.time()
+
+    def load(self):
+        # Saved {'run': run state, 'trial': trial state}, or None without a checkpoint file
+        if not os.path.exists(self.filename):
+            return None
+        with open(self.filename, 'rb') as f:
+            return pickle.load(f)
+
+    def remove(self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+
+class Profiler:
+#============================================================================
+# Opt-in instrumentation of the DDS main loop. With a Profiler, DDS_serial 
+# and DDS_MPI time the phases of every iteration:
+#   neighbour   - neighbour generation
+#   objective   - objective function evaluation, incl. cache look-ups and 
+#                 the model's file I/O (waiting for the slaves in DDS_MPI)
+#   bookkeeping - best solution update, Master matrix, checkpoints
+# and pass them to record. Each hook in hooks is then called as 
+# hook(i, Jtest, Jbest, timings) with the iteration number, the objective
+# function values and a dict of the phase times in seconds. Batch and 
+# parallel steps are split evenly over their candidates. summary formats 
+# the phase totals of a trial as a table.
+#============================================================================
+    PHASES = ('neighbour', 'objective', 'bookkeeping')
+
+    def __init__(self, hooks=()):
+        self.hooks = list(hooks)
+        self.iterations = 0
+        self.totals = [0.0, 0.0, 0.0]
+        self.maxima = [0.0, 0.0, 0.0]
+
+    def record(self, i, Jtest, Jbest, t_neighbour, t_objective, t_bookkeeping):
+        self.iterations += 1
+        times = (t_neighbour, t_objective, t_bookkeeping)
+        for k in range(3):
+            self.totals[k] += times[k]
+            if times[k] > self.maxima[k]:
+                self.maxima[k] = times[k]
+        if self.hooks:
+            timings = dict(zip(self.PHASES, times))
+            for hook in self.hooks:
+                hook(i, Jtest, Jbest, timings)
+
+    def summary(self, runtime):
+        # Table of the time per phase; 'other' is the rest of runtime (initial solutions, set-up)
+        lines = ['%-12s %11s %8s %16s %10s' % ('Phase', 'Total (s)', 'Share', 'Mean (us/iter)', 'Max (ms)')]
+        for k, phase in enumerate(self.PHASES):
+            lines.append('%-12s %11.4f %7.1f%% %16.2f %10.3f' % (phase, self.totals[k], 100*self.totals[k]/runtime,
+                         1e6*self.totals[k]/max(self.iterations, 1), 1e3*self.maxima[k]))
+        other = runtime - sum(self.totals)
+        lines.append('%-12s %11.4f %7.1f%%' % ('other', other, 100*other/runtime))
+        return '\n'.join(lines)
+
+
+class RandomStream:
+#============================================================================
+# Block-buffered random number stream (rng_mode = 1): a numpy Generator
+# (PCG64) whose uniforms and standard normals are drawn block_size at a
+# time and handed out from buffers, so the many scalar draws of DDS and 
+# neighbor cost a list look-up instead of a call into numpy. It has the 
+# random / standard_normal / get_state / set_state interface of np.random,
+# which the DDS and neighbor functions use when they are given no stream.
+# Draws of more than BUFFER_MAX values gain nothing from the buffers and 
+# come straight from the generator. Streams come from a SeedSequence: 
+# spawn(n) gives n independent substreams (one per trial, one per slave), 
+# so the draws of a trial do not depend on which worker runs it or how 
+# many there are.
+#============================================================================
+    BUFFER_MAX = 256
+
+    def __init__(self, seed, block_size=4096):
+        self.seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.gen = np.random.Generator(np.random.PCG64(self.seed_seq))
+        self.block_size = block_size
+        # buffers (array and list views) and positions of the next value
+        self.uniforms, self.normals = np.empty(0), np.empty(0)
+        self.uniform_list, self.normal_list = [], []
+        self.u, self.n = 0, 0
+
+    def spawn(self, n):
+        # n independent child streams
+        return [RandomStream(child, self.block_size) for child in self.seed_seq.spawn(n)]
+
+    def seeds(self, n):
+        # n independent integer seeds (i.e. for np.random.seed in pool workers)
+        return [int(child.generate_state(1)[0]) for child in self.seed_seq.spawn(n)]
+
+    def random(self, size=None):
+        # Uniform value(s) in [0, 1)
+        if size is None:
+            if self.u == len(self.uniform_list):
+                self.uniforms = self.gen.random(self.block_size)
+                self.uniform_list = self.uniforms.tolist()
+                self.u = 0
+            self.u += 1
+            return self.uniform_list[self.u - 1]
+        num = int(size) if isinstance(size, (int, np.integer)) else math.prod(size)
+        if num > self.BUFFER_MAX:
+            return self.gen.random(size)
+        if self.u + num > len(self.uniform_list):
+            self.uniforms = self.gen.random(self.block_size)
+            self.uniform_list = self.uniforms.tolist()
+            self.u = 0
+        self.u += num
+        values = self.uniforms[self.u - num:self.u]
+        return values if isinstance(size, (int, np.integer)) else values.reshape(size)
+
+    def standard_normal(self, size=None):
+        # Standard normal value(s)
+        if size is None:
+            if self.n == len(self.normal_list):
+                self.normals = self.gen.standard_normal(self.block_size)
+                self.normal_list = self.normals.tolist()
+                self.n = 0
+            self.n += 1
+            return self.normal_list[self.n - 1]
+        num = int(size) if isinstance(size, (int, np.integer)) else math.prod(size)
+        if num > self.BUFFER_MAX:
+            return self.gen.standard_normal(size)
+        if self.n + num > len(self.normal_list):
+            self.normals = self.gen.standard_normal(self.block_size)
+            self.normal_list = self.normals.tolist()
+            self.n = 0
+        self.n += num
+        values = self.normals[self.n - num:self.n]
+        return values if isinstance(size, (int, np.integer)) else values.reshape(size)
+
+    def get_state(self):
+        return {'bit_generator':self.gen.bit_generator.state, 'uniforms':self.uniforms.copy(), 'u':self.u,
+                'normals':self.normals.copy(), 'n':self.n}
+
+    def set_state(self, state):
+        self.gen.bit_generator.state = state['bit_generator']
+        self.uniforms, self.u = state['uniforms'].copy(), state['u']
+        self.normals, self.n = state['normals'].copy(), state['n']
+        self.uniform_list, self.normal_list = self.uniforms.tolist(), self.normals.tolist()
+
+
+class Portfolio:
+#============================================================================
+# Early termination of DDS trials (portfolio mode, see DDS.DDS_portfolio).
+# DDS_serial asks cut() after every evaluation; a trial is cut when
+#   stalled - its Jbest has not improved for stall_evals evaluations, or
+#   behind  - after stall_evals evaluations (of the trial or of a restart)
+#             its Jbest is worse than that of every completed trial after
+#             as many evaluations by more than BEHIND_MARGIN of their spread
+#             (stats, the TrialStats of the run, once it holds at least
+#             BEHIND_TRIALS trials). A restart is judged on its own Jbest
+#             and evaluations, not on those of the segments before it.
+# The rest of the trial's budget is then spent on a restart from a random 
+# solution (mode 2) or from the best solution found so far by any trial 
+# (mode 3, leader), so no evaluations are given up. Trials are only cut
+# with at least stall_evals (and 10) evaluations left; in mode 2 only 
+# once stats can tell that a restart is expected to end up better. Every cut is added
+# to cuts as (trial, evaluation, reason (1 = stalled, 2 = behind), Jbest, mode).
+#============================================================================
+    REASONS = {1:'stalled', 2:'behind'}
+    BEHIND_TRIALS = 5
+    BEHIND_MARGIN = 0.5
+
+    def __init__(self, mode, stall_evals, maxiter, its, to_max, stats=None):
+        self.mode = mode
+        self.stall_evals = stall_evals
+        self.maxiter = maxiter
+        self.its = its
+        self.to_max = to_max
+        self.stats = stats
+        self.cuts = []
+        self.trial = 0
+        self.leader = None
+        self.leader_J = np.inf
+
+    def start(self, offset, Jbest=np.inf):
+        # A trial segment starts after offset evaluations of the trial, Jbest of the segments before
+        self.offset = offset
+        self.Jbest = Jbest
+
+    def cut(self, evals, Jbest, it_sbest):
+        # True if the segment should stop after evals evaluations (Jbest, it_sbest of the segment)
+        total = self.offset + evals
+        left = self.maxiter - total
+        if left < max(self.stall_evals, 10):
+            return False
+        judged = self.stats is not None and self.stats.count >= self.BEHIND_TRIALS
+        reason = 0
+        if evals - 1 - it_sbest >= self.stall_evals:
+            reason = 1
+        elif judged and evals >= self.stall_evals and evals > self.its:
+            # the segment against the completed trials after as many evaluations as it made
+            worst, best = self._range(evals - 1 - self.its)
+            if Jbest > worst + self.BEHIND_MARGIN*(worst - best):
+                reason = 2
+        if reason == 0:
+            return False
+        Jbest = min(Jbest, self.Jbest)
+        if self.mode == 2:
+            # a random restart only pays if even the worst completed trial got further with the evaluations 
+            # left than the trial is expected to get (Jbest less what the worst trial still gained from here)
+            if not judged or left <= self.its or total <= self.its:
+                return False
+            if self._range(left - 1 - self.its)[0] >= Jbest - (self._range(total - 1 - self.its)[0] - self._range(-1)[0]):
+                return False
+        self.cuts.append((self.trial, total, reason, self.to_max*Jbest, self.mode))
+        return True
+
+    def _range(self, row):
+        # worst and best Jbest of the completed trials at row of stats (which holds model units)
+        return sorted((self.to_max*self.stats.max[row], self.to_max*self.stats.min[row]), reverse=True)
+
+    def offer(self, sbest, Jbest):
+        # Best solution of a finished segment, kept if it is the new leader
+        if Jbest <= self.leader_J:
+            self.leader = sbest.copy()
+            self.leader_J = Jbest
+
+
+class MetricsStream:
+#============================================================================
+# Live progress of a run as newline-delimited JSON (one object per line)
+# appended to filename, so it can be followed while the run is going (see
+# dds_metrics.py). Every record has an 'event' and a 'time' (seconds since
+# the epoch):
+#   run_start / run_end      - written by Main_DDS.py
+#   trial_start / trial_end  - trial number, evaluations, results
+#   progress                 - trial, evals, max_evals, evals_per_s (since 
+#       the last record), eta_s, Jbest, best_iter and for parallel runs the
+#       slave_utilisation (busy fraction of each slave since the trial start)
+# DDS_serial and DDS_MPI write a progress record at most every every_secs
+# seconds, so the loop only pays for a clock check per iteration. Every 
+# record is one O_APPEND write, so trials running in several processes can
+# share the stream.
+#============================================================================
+    def __init__(self, filename, every_secs=10.0):
+        self.filename = filename
+        self.every_secs = every_secs
+        self.trial = 0
+        self.fd = None
+
+    def __getstate__(self):
+        # the file is reopened by every process that writes
+        state = self.__dict__.copy()
+        state['fd'] = None
+        return state
+
+    def write(self, event, **fields):
+        record = dict(event=event, time=time.time(), **fields)
+        if self.fd is None:
+            self.fd = os.open(self.filename, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        os.write(self.fd, (json.dumps(record) + '\n').encode())
+
+    def start_trial(self, max_evals, evals=0):
+        # Called by DDS at the start of trial self.trial (evals > 0 when resumed)
+        self.max_evals = max_evals
+        self.t_start = self.last_time = time.time()
+        self.last_evals = evals
+        self.next_time = self.t_start + self.every_secs
+        self.write('trial_start', trial=self.trial, evals=evals, max_evals=max_evals)
+
+    def due(self):
+        return time.time() >= self.next_time
+
+    def progress(self, evals, Jbest, best_iter, slave_busy=None):
+        now = time.time()
+        rate = (evals - self.last_evals)/max(now - self.last_time, 1e-9)
+        fields = {'trial':self.trial, 'evals':evals, 'max_evals':self.max_evals, 'evals_per_s':rate,
+                  'eta_s':(self.max_evals - evals)/rate if rate > 0 else None, 'Jbest':float(Jbest), 'best_iter':int(best_iter)}
+        if slave_busy is not None:
+            fields['slave_utilisation'] = [b/max(now - self.t_start, 1e-9) for b in slave_busy]
+        self.write('progress', **fields)
+        self.last_time = now
+        self.last_evals = evals
+        self.next_time = now + self.every_secs
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def alloc_array(shape, dtype=float, budget_mb=0, spill_dir=None):
+#============================================================================
+# Uninitialised array like np.empty, but arrays larger than budget_mb 
+# megabytes (0 = no budget) are backed by a temporary file in spill_dir, 
+# so the operating system pages them to disk instead of holding them in memory.
+# The file is deleted when the array is released.
+#============================================================================
+    nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    if budget_mb <= 0 or nbytes <= budget_mb * 2**20:
+        return np.empty(shape, dtype=dtype)
+    spill_file = tempfile.TemporaryFile(suffix='.spill', dir=spill_dir)
+    spill_file.truncate(max(nbytes, 1))
+    a = np.memmap(spill_file, dtype=dtype, mode='r+', shape=shape)
+    a.spill_file = spill_file          # keeps the file open as long as the array lives
+    return a
+
+
+class CompactRecord:
+#============================================================================
+# Bounded-memory alternative to the full Master matrix of a trial. Every 
+# evaluation still gets a row in trace (columns iter #, Jbest, Jtest and the
+# pre-emption flag if enabled), which is all the run statistics need, but 
+# decision variable values are only kept for the initial solutions, for 
+# every new best solution and for every sample_every-th evaluation 
+# (0 = none). Kept values are stored as dtype (float or np.float32) in an
+# array that grows as needed and spills to disk beyond budget_mb (see 
+# alloc_array). rows() returns the kept evaluations in the Master layout.
+#============================================================================
+    def __init__(self, trace, num_dec, sample_every=0, dtype=float, budget_mb=0, spill_dir=None):
+        self.trace = trace
+        self.sample_every = sample_every
+        self.dtype = dtype
+        self.budget_mb = budget_mb
+        self.spill_dir = spill_dir
+        self.num_kept = 0
+        self.iters = np.empty(64, dtype=np.int64)
+        self.dvs = alloc_array((64, num_dec), dtype, budget_mb, spill_dir)
+
+    def store(self, i, x, keep=False):
+        # Decision variables x of evaluation i, kept if keep (new best) or sampled
+        if not (keep or (self.sample_every > 0 and i % self.sample_every == 0)):
+            return
+        if self.num_kept == self.iters.shape[0]:
+            # double the capacity
+            iters = np.empty(2*self.num_kept, dtype=np.int64)
+            iters[:self.num_kept] = self.iters
+            dvs = alloc_array((2*self.num_kept, self.dvs.shape[1]), self.dtype, self.budget_mb, self.spill_dir)
+            dvs[:self.num_kept] = self.dvs
+            self.iters, self.dvs = iters, dvs
+        self.iters[self.num_kept] = i
+        self.dvs[self.num_kept] = x
+        self.num_kept += 1
+
+    def rows(self):
+        # Kept evaluations as Master rows (iter #, Jbest, Jtest, DVs, [pre-emption flag])
+        trace = self.trace[self.iters[:self.num_kept]]
+        return np.hstack((trace[:, 0:3], self.dvs[:self.num_kept], trace[:, 3:]))
+
+    def get_state(self):
+        return {'iters':self.iters[:self.num_kept].copy(), 'dvs':np.array(self.dvs[:self.num_kept])}
+
+    def set_state(self, state):
+        # Restores kept rows saved by get_state (checkpoint resume)
+        self.num_kept = 0
+        for i, x in zip(state['iters'], state['dvs']):
+            self.store(i, x, True)
+
+
+class TrialStats:
+#============================================================================
+# Streaming statistics per iteration over the trials of a run, updated as 
+# each trial finishes (add) so the trial histories need not be kept:
+#   sums of Jbest and Jtest (the averages of '_trial_avgs.out'), 
+#   mean and variance of Jbest (Welford's algorithm), its min and max and
+#   approximate quantiles of Jbest (P-square algorithm, Jain & Chlamtac 1985:
+#   five markers per quantile and iteration, updated for all iterations at once).
+# Arrays are allocated with alloc_array, i.e. spill to disk beyond budget_mb.
+#============================================================================
+    def __init__(self, num_rows, quantiles=(0.25, 0.5, 0.75), budget_mb=0, spill_dir=None):
+        self.count = 0
+        self.quantiles = list(quantiles)
+        self.sums = np.zeros((num_rows, 2))                # Jbest, Jtest
+        self.mean = np.zeros(num_rows)                     # Welford mean / sum of squared deviations of Jbest
+        self.m2 = np.zeros(num_rows)
+        self.min = np.full(num_rows, np.inf)
+        self.max = np.full(num_rows, -np.inf)
+        # P-square marker heights and positions (1..count) per quantile and iteration
+        self.heights = alloc_array((len(self.quantiles), num_rows, 5), float, budget_mb, spill_dir)
+        self.positions = alloc_array((len(self.quantiles), num_rows, 5), np.int32, budget_mb, spill_dir)
+        p = np.array(self.quantiles).reshape(-1, 1)
+        self.desired = np.hstack((1 + 0*p, 1 + 2*p, 1 + 4*p, 3 + 2*p, 5 + 0*p))
+        self.increments = np.hstack((0*p, p/2, p, (1 + p)/2, 1 + 0*p))
+
+    def add(self, Jbest, Jtest):
+        # Adds the Jbest and Jtest columns (one value per iteration) of a finished trial
+        self.count += 1
+        self.sums[:, 0] += Jbest
+        self.sums[:, 1] += Jtest
+        delta = Jbest - self.mean
+        self.mean += delta/self.count
+        self.m2 += delta*(Jbest - self.mean)
+        np.minimum(self.min, Jbest, out=self.min)
+        np.maximum(self.max, Jbest, out=self.max)
+        if len(self.quantiles) == 0:
+            return
+        if self.count <= 5:
+            # the first five values are the initial markers
+            self.heights[:, :, self.count - 1] = Jbest
+            if self.count == 5:
+                self.heights.sort(axis=2)
+                self.positions[:] = np.arange(1, 6)
+            return
+        self._p2_update(Jbest)
+
+    def _p2_update(self, x):
+        q = self.heights
+        n = self.positions
+        # extend the outer markers and find the cell k (q[k] <= x < q[k+1]) of x
+        np.minimum(q[:, :, 0], x, out=q[:, :, 0])
+        np.maximum(q[:, :, 4], x, out=q[:, :, 4])
+        k = (q[:, :, 1:4] <= x[:, None]).sum(axis=2)
+        n += (np.arange(5) > k[:, :, None])
+        self.desired += self.increments
+        # move the inner markers that are off their desired position by one or more
+        for i in (1, 2, 3):
+            d = self.desired[:, i, None] - n[:, :, i]
+            move = ((d >= 1) & (n[:, :, i+1] - n[:, :, i] > 1)) | ((d <= -1) & (n[:, :, i-1] - n[:, :, i] < -1))
+            if not move.any():
+                continue
+            s = np.where(move, np.sign(d), 0)
+            qi, qlo, qhi = q[:, :, i], q[:, :, i-1], q[:, :, i+1]
+            ni, nlo, nhi = n[:, :, i], n[:, :, i-1], n[:, :, i+1]
+            parabolic = qi + s/(nhi - nlo)*((ni - nlo + s)*(qhi - qi)/(nhi - ni) + (nhi - ni - s)*(qi - qlo)/(ni - nlo))
+            linear = np.where(s > 0, qi + (qhi - qi)/(nhi - ni), qi - (qlo - qi)/(nlo - ni))
+            new = np.where((qlo < parabolic) & (parabolic < qhi), parabolic, linear)
+            q[:, :, i] = np.where(move, new, qi)
+            n[:, :, i] += s.astype(np.int32)
+
+    def quantile(self, j):
+        # Approximate quantile self.quantiles[j] of Jbest per iteration
+        if self.count >= 5:
+            return np.array(self.heights[j, :, 2])
+        # exact from the values stored so far
+        return np.quantile(self.heights[j, :, :self.count], self.quantiles[j], axis=1)
+
+    def averages(self):
+        # Columns 0 -> iter #; 1 -> average Jbest; 2 -> average Jtest
+        return np.column_stack((np.arange(self.sums.shape[0]), self.sums/self.count))
+
+    def header(self):
+        return 'iter Jbest_mean Jbest_std Jbest_min ' + ' '.join('Jbest_q%g' % q for q in self.quantiles) + ' Jbest_max Jtest_mean'
+
+    def table(self):
+        # Per-iteration statistics, columns as in header()
+        std = np.sqrt(self.m2/(self.count - 1)) if self.count > 1 else np.zeros_like(self.m2)
+        return np.column_stack([np.arange(self.sums.shape[0]), self.sums[:, 0]/self.count, std, self.min] + 
+                               [self.quantile(j) for j in range(len(self.quantiles))] + [self.max, self.averages()[:, 2]])
+
+
+class RunArchive:
+#============================================================================
+# Binary output archive of a DDS run (out_format = 1): one directory of .npy
+# files written in place through memory maps while the run progresses, 
+# instead of a set of text .out files per trial.
+#   master.npy  (num_trials, num_rows, num_cols)  Master matrix of each trial
+#   jbest.npy   (num_rows, num_trials)            Jbest per iteration of each trial
+#   sbest.npy   (num_trials, num_dec)             best DVs of each trial
+#   avgs.npy    (num_rows - its, 3)               averages over all trials
+#   stats.npy   (num_rows - its, ...)             statistics over all trials (TrialStats)
+#   rows_N.npy  DV rows kept in trial N by compact recording (CompactRecord)
+#   meta.json   run settings, number of completed trials, per-trial summary
+# Only the first meta['trials_done'] trials of master, jbest and sbest are 
+# valid, the rest of the arrays is unset.
+# master, jbest and sbest are only stored for full output (out_print = 0).
+# DDS_serial and DDS_MPI can fill a trial's block of master.npy directly 
+# (see trial), so its rows reach the file as they are produced. 
+# archive_to_text converts an archive to the text files of out_format = 0.
+#============================================================================
+    def __init__(self, dirname, meta=None):
+        # meta = None opens an existing archive, else a new one is created 
+        # from meta (runname, num_trials, num_rows, num_cols, num_dec, its, full)
+        self.dirname = dirname
+        self.arrays = {}
+        if meta is None:
+            with open(os.path.join(dirname, 'meta.json')) as f:
+                self.meta = json.load(f)
+            return
+        self.meta = dict(meta, trials_done=0, trials=[])
+        os.makedirs(dirname, exist_ok=True)
+        for name in os.listdir(dirname):
+            # drop arrays of an earlier run in the same folder
+            if name.endswith('.npy'):
+                os.remove(os.path.join(dirname, name))
+        shapes = {'avgs':(meta['num_rows'] - meta['its'], 3)}
+        if meta['full']:
+            shapes['master'] = (meta['num_trials'], meta['num_rows'], meta['num_cols'])
+            shapes['jbest'] = (meta['num_rows'], meta['num_trials'])
+            shapes['sbest'] = (meta['num_trials'], meta['num_dec'])
+        for name, shape in shapes.items():
+            # left unfilled, so the files stay sparse until rows are written: 
+            # only the first trials_done trials hold results
+            self.arrays[name] = np.lib.format.open_memmap(os.path.join(dirname, name + '.npy'), mode='w+', dtype=float, shape=shape)
+        self.save_meta()
+
+    def array(self, name):
+        # Memory map of one of the archive's arrays
+        if name not in self.arrays:
+            self.arrays[name] = np.load(os.path.join(self.dirname, name + '.npy'), mmap_mode='r+')
+        return self.arrays[name]
+
+    def trial(self, j):
+        # Storage for the Master matrix of trial j (None if not archived)
+        return self.array('master')[j] if self.meta['full'] else None
+
+    def add_trial(self, j, output):
+        # Records the results of completed trial j
+        if self.meta['full']:
+            master = self.array('master')
+            if not np.may_share_memory(output['Master'], master):
+                master[j] = output['Master']
+            self.array('jbest')[:, j] = output['Master'][:, 1]
+            self.array('sbest')[j] = output['Best_sol']
+            if 'Rows' in output:
+                np.save(os.path.join(self.dirname, 'rows_' + str(j+1) + '.npy'), output['Rows'])
+        self.meta['trials'].append({'trial':j + 1, 'F_Best':float(output['F_Best']), 'Best_iter':int(output['Best_iter']), 'Runtime':output['Runtime']})
+        self.meta['trials_done'] = j + 1
+        self.flush()
+
+    def save_stats(self, table, header):
+        # Writes the statistics over all trials (TrialStats.table) when the run is complete
+        np.save(os.path.join(self.dirname, 'stats.npy'), table)
+        self.meta['stats_columns'] = header
+        self.flush()
+
+    def flush(self):
+        for a in self.arrays.values():
+            a.flush()
+        self.save_meta()
+
+    def save_meta(self):
+        tmp_file = os.path.join(self.dirname, 'meta.json.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(self.meta, f, indent=1)
+        os.replace(tmp_file, os.path.join(self.dirname, 'meta.json'))
+
+
+def archive_to_text(dirname, outdir='.'):
+#============================================================================
+# Converts a binary output archive (RunArchive) to the text output files a
+# run with out_format = 0 writes, e.g. 'Ex1_trial_1.out', 'sbest_trial_1.out'
+# 'Ex1_ini_1.out', 'Jbest_trial_1.out', 'Ex1_trial_avgs.out' and 'Ex1_trial_stats.out'.
+#============================================================================
+    archive = RunArchive(dirname)
+    meta = archive.meta
+    runname = meta['runname']
+    if meta['full']:
+        master = archive.array('master')
+        jbest = archive.array('jbest')
+        sbest = archive.array('sbest')
+        for j in range(meta['trials_done']):
+            np.savetxt(os.path.join(outdir, runname + '_trial_' + str(j+1) + '.out'), master[j])
+            np.savetxt(os.path.join(outdir, 'sbest_trial_' + str(j+1) + '.out'), sbest[j])
+            rows_file = os.path.join(dirname, 'rows_' + str(j+1) + '.npy')
+            if os.path.exists(rows_file):
+                # compact recording: initial solutions are the first kept rows
+                rows = np.load(rows_file)
+                np.savetxt(os.path.join(outdir, runname + '_rows_' + str(j+1) + '.out'), rows)
+                np.savetxt(os.path.join(outdir, runname + '_ini_' + str(j+1) + '.out'), rows[0:meta['its']])
+            else:
+                np.savetxt(os.path.join(outdir, runname + '_ini_' + str(j+1) + '.out'), master[j, 0:meta['its']])
+            # Jbest of all trials as it stood after trial j (later trials are nan)
+            jbest_j = np.array(jbest)
+            jbest_j[:, j+1:] = np.nan
+            np.savetxt(os.path.join(outdir, 'Jbest_trial_' + str(j+1) + '.out'), jbest_j)
+    if meta['trials_done'] == meta['num_trials']:
+        np.savetxt(os.path.join(outdir, runname + '_trial_avgs.out'), archive.array('avgs'))
+    if os.path.exists(os.path.join(dirname, 'stats.npy')):
+        np.savetxt(os.path.join(outdir, runname + '_trial_stats.out'), np.load(os.path.join(dirname, 'stats.npy')), header=meta['stats_columns'])
+
+
+def read_warm_start(dirname, num_dec):
+#============================================================================
+# Reads the results of an earlier run to continue from (warm start): either
+# its output directory (i.e. 'Ex1_Output') or its binary archive (RunArchive,
+# also found as the '*_archive' subdirectory of an output directory). Both
+# need full output (out_print = 0). Returns {'sbest': best DVs of each
+# completed trial, 'evals': evaluations each trial has used}. The evaluation
+# counts of a run that was itself warm started are taken from its
+# '<runname>_warm_start.out', so the counts add up over a chain of runs.
+#============================================================================
+    archives = [dirname] if os.path.exists(os.path.join(dirname, 'meta.json')) else sorted(glob.glob(os.path.join(dirname, '*_archive')))
+    if archives:
+        archive = RunArchive(archives[0])
+        assert archive.meta['full'], 'Warm start needs the best solutions of the earlier run, which are only archived for full output (out_print = 0)!'
+        num_done = archive.meta['trials_done']
+        sbest = np.array(archive.array('sbest')[:num_done])
+        evals = np.full(num_done, archive.meta['num_rows'], dtype=int)
+        outdir = os.path.dirname(os.path.normpath(archives[0]))
+    else:
+        sbest_files = {int(re.search(r'_(\d+)\.out$', f).group(1)): f for f in glob.glob(os.path.join(dirname, 'sbest_trial_*.out'))}
+        assert sbest_files, 'No sbest_trial_N.out files or binary archive found in ' + dirname + ' for the warm start (the earlier run needs full output, out_print = 0)!'
+        trials = sorted(sbest_files)
+        sbest = np.array([np.atleast_1d(np.loadtxt(sbest_files[t])) for t in trials])
+        evals = np.zeros(len(trials), dtype=int)
+        for f in glob.glob(os.path.join(dirname, '*_trial_*.out')):
+            match = re.search(r'^(?!sbest_|Jbest_)(.+)_trial_(\d+)\.out$', os.path.basename(f))
+            if match is not None and int(match.group(2)) in sbest_files:
+                with open(f) as rows:
+                    evals[trials.index(int(match.group(2)))] = sum(1 for line in rows if line.strip())
+        outdir = dirname
+    assert sbest.shape[1] == num_dec, 'Number of dec vars of the warm start solutions does not match the bounds file.'
+    for f in glob.glob(os.path.join(outdir, '*_warm_start.out')):
+        # earlier run was warm started itself: total evaluations per trial
+        totals = np.atleast_2d(np.loadtxt(f))
+        evals[:] = totals[:evals.shape[0], 1]
+    return {'sbest':sbest, 'evals':evals}
+
+
+def project_solution(s, DV):
+#============================================================================
+# Projects solution s onto the bounds in DV (i.e. changed bounds of a warm
+# start): values are clipped to [S_min, S_max], discrete DVs are rounded
+# to the nearest integer within the bounds
+#============================================================================
+    s = np.clip(s, DV['S_min'], DV['S_max'])
+    discrete = DV['Discrete_flag'] == 1
+    s[discrete] = np.clip(np.around(s[discrete]), np.ceil(DV['S_min'][discrete]), np.floor(DV['S_max'][discrete]))
+    return s
 
 
 class solution:
+    # Record of one solution: decision variables (dv) and objective values (f),
+    # i.e. a member of a multi-objective front (see pareto.ParetoArchive)
     def __init__(self, decnum, objnum):
-        self.dv = zeros(decnum,float)
-        self.f = zeros(objnum,float)
+        self.dv = np.zeros(decnum,float)
+        self.f = np.zeros(objnum,float)
         self.z = 0
 
    
\ No newline at end of file